@@ -3,7 +3,7 @@ Cuenca Eventos - Backend API
 Configuración centralizada usando pydantic-settings
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from functools import lru_cache
 
 
@@ -31,6 +31,79 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Catálogo de eventos en memoria (recarga completa periódica)
+    EVENT_CATALOG_MAX_AGE_SECONDS: int = 300
+    
+    # Cache de respuestas pre-serializadas (alertas, rutas)
+    FRAGMENT_CACHE_MAX_AGE_SECONDS: int = 300
+    
+    # Feed "para ti" (ranking de eventos)
+    FEED_SNAPSHOT_TTL_SECONDS: int = 60
+    FEED_WEIGHT_PREFERENCE: float = 0.4
+    FEED_WEIGHT_DISTANCE: float = 0.25
+    FEED_WEIGHT_TIME: float = 0.2
+    FEED_WEIGHT_POPULARITY: float = 0.15
+    
+    # Imágenes: tamaños permitidos para variantes (?w= / ?h=)
+    IMAGE_VARIANT_SIZES: List[int] = [80, 160, 320, 480, 640, 960, 1280, 1920]
+    # Imágenes: tamaño máximo de subida (se corta en cuanto se supera)
+    IMAGE_MAX_UPLOAD_BYTES: int = 5 * 1024 * 1024
+    # Imágenes: subida múltiple (archivos por petición y guardados en paralelo)
+    IMAGE_BATCH_MAX_FILES: int = 20
+    IMAGE_BATCH_CONCURRENCY: int = 4
+    # Imágenes: procesos para redimensionar y cola de derivados al subir
+    IMAGE_PROCESS_WORKERS: int = 2
+    # Píxeles máximos que se decodifican por imagen (más -> 413); acota la
+    # memoria de cada worker (límite del pod: 512Mi)
+    IMAGE_MAX_PIXELS: int = 16_000_000
+    IMAGE_PIPELINE_QUEUE_SIZE: int = 1000
+    # Imágenes: cache local en disco por pod (directorio vacío = desactivado)
+    IMAGE_DISK_CACHE_DIR: str = "/tmp/cuenca-image-cache"
+    IMAGE_DISK_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    IMAGE_DISK_CACHE_MAX_ENTRY_BYTES: int = 10 * 1024 * 1024
+    # Imágenes: backend de los bytes ("gridfs" | "filesystem" | "s3")
+    IMAGE_STORAGE_BACKEND: str = "gridfs"
+    IMAGE_STORAGE_DIR: str = "/data/images"
+    S3_BUCKET: str = "cuenca-eventos-images"
+    S3_PREFIX: str = "images/"
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO / R2 / etc.
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    # Imágenes: antigüedad mínima para que el GC borre una imagen sin referencias
+    IMAGE_GC_GRACE_HOURS: int = 24
+    # Imágenes: vida del snapshot del manifiesto de precarga (/images/manifest)
+    IMAGE_MANIFEST_TTL_SECONDS: int = 60
+    # Imágenes: placeholders en memoria y segundos hasta volver a consultar
+    # una imagen sin placeholder (puede calcularlo otra réplica o una migración)
+    PLACEHOLDER_CACHE_MAX_ENTRIES: int = 20000
+    PLACEHOLDER_MISS_TTL_SECONDS: int = 60
+    
+    # SSE: frames pendientes por cliente y política al llenarse
+    # ("drop_oldest" | "coalesce" | "disconnect")
+    SSE_CLIENT_BUFFER_SIZE: int = 100
+    SSE_SLOW_CONSUMER_POLICY: str = "coalesce"
+    # SSE: mensajes guardados para reenviar tras reconectar (Last-Event-ID)
+    # y segundos entre heartbeats a clientes ociosos
+    SSE_REPLAY_BUFFER_SIZE: int = 1000
+    SSE_HEARTBEAT_SECONDS: float = 15
+    # SSE: celdas (en grados, ~1.1 km) del índice espacial de suscripciones
+    # con región; las regiones de más celdas se comprueban aparte
+    SSE_GEO_CELL_DEGREES: float = 0.01
+    SSE_GEO_MAX_CELLS: int = 1024
+    # WebSocket /realtime/ws: mensajes pendientes por conexión (todos sus
+    # topics); al llenarse se aplica la misma política que en SSE
+    WS_CONNECTION_BUFFER_SIZE: int = 256
+    # WebSocket: topics por conexión y mensajes inválidos tolerados antes
+    # de cerrarla (1008)
+    WS_MAX_TOPICS_PER_CONNECTION: int = 50
+    WS_MAX_INVALID_MESSAGES: int = 20
+    # Broadcast entre réplicas: "memory" (un proceso) | "mongodb" (change
+    # stream sobre una colección de log; requiere replica set)
+    BROADCAST_TRANSPORT: str = "memory"
+    BROADCAST_LOG_COLLECTION: str = "broadcast_log"
+    BROADCAST_LOG_TTL_SECONDS: int = 3600
+    
     # CORS
     CORS_ORIGINS: List[str] = [
         "http://localhost:5173",
@@ -1,100 +1,603 @@
 """
 Core Broadcast - Sistema de broadcasting en memoria para SSE
-Reemplaza Redis Pub/Sub con un sistema simple basado en asyncio.Queue
+Reemplaza Redis Pub/Sub con un sistema simple en memoria
+
+Cada mensaje se codifica una sola vez como frame SSE (bytes) y se reparte a
+los suscriptores sin lock: el conjunto de clientes es inmutable y se
+reemplaza entero al suscribir/desuscribir (copy-on-write), así que el
+reparto itera una foto consistente aunque cambien los clientes.
+
+Cada suscriptor tiene un deque de frames pendientes y un future de espera
+que solo existe mientras está ocioso: encolar es un append y, como mucho,
+un set_result (más barato que asyncio.Queue.put_nowait).
+
+Cuando el buffer de un cliente lento se llena se aplica su política
+(SlowConsumerPolicy): descartar el más viejo, fusionar por clave (id de la
+alerta) o desconectarlo con un frame de cierre.
+
+Cada mensaje lleva un id creciente y queda en un ring buffer acotado: al
+reconectar con Last-Event-ID se reenvían solo los mensajes perdidos (o un
+{"type": "reset"} si el hueco ya no está en el buffer). El id tiene que ser
+uno emitido por este broadcaster: con el transporte memory cada réplica
+numera por su cuenta, así que un id de otra réplica (o inventado) también
+recibe reset aunque caiga dentro del rango. Los clientes ociosos
+reciben un comentario periódico para que los proxies no corten el stream.
+
+Los suscriptores pueden limitar los mensajes a una región (círculo o bbox):
+los mensajes con coordenadas solo se reparten a los clientes sin región y a
+los que la indexación espacial (app.core.geo_index) encuentra en la celda
+del punto; los mensajes sin coordenadas (p.ej. borrados) llegan a todos.
+
+Además de los clientes SSE, una conexión WebSocket puede suscribirse a
+varios broadcasters a la vez (TopicSubscription): cada mensaje se codifica
+una vez por topic y todos los topics comparten el buffer acotado de la
+conexión. Un topic puede filtrar por clave (p.ej. event:<id>).
+
+broadcast() no reparte directamente: publica en el transporte (ver
+app.core.broadcast_transport), que entrega el mensaje a publish() del
+broadcaster del mismo canal en cada réplica.
 """
 import asyncio
-import json
-from typing import AsyncGenerator, Set
-from contextlib import asynccontextmanager
+import time
+from collections import deque
+from enum import Enum
+from itertools import chain
+from typing import AsyncGenerator, Deque, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from app.config import settings
+from app.core.broadcast_transport import BroadcastTransport, broadcast_transport
+from app.core.geo_index import GeoRegion, Point, SubscriptionGrid
+from app.core.responses import dumps
+
+
+def encode_sse(data: bytes, event_id: Optional[int] = None) -> bytes:
+    """Frame SSE para un payload JSON ya serializado (sin saltos de línea)"""
+    if event_id is None:
+        return b"data: " + data + b"\n\n"
+    return b"id: %d\ndata: " % event_id + data + b"\n\n"
+
+
+def encode_topic(topic: str, data: bytes, event_id: Optional[int] = None) -> str:
+    """
+    Mensaje WebSocket (texto) de un topic: {"topic", "id", "message"}
+
+    El id va como string: con el transporte mongodb supera 2^53 y en
+    JavaScript perdería precisión como número.
+    """
+    return '{"topic":%s,"id":%s,"message":%s}' % (
+        dumps(topic).decode(), "null" if event_id is None else '"%d"' % event_id, data.decode()
+    )
+
+
+def encode_frame(topic: Optional[str], data: bytes, event_id: Optional[int] = None) -> Union[bytes, str]:
+    """Frame SSE (sin topic) o mensaje WebSocket del topic"""
+    if topic is None:
+        return encode_sse(data, event_id)
+    return encode_topic(topic, data, event_id)
+
+
+CONNECTED_PAYLOAD = dumps({"type": "connected"})
+# El cliente perdió más mensajes de los que guarda el ring buffer
+RESET_PAYLOAD = dumps({"type": "reset"})
+# Último frame de un cliente desconectado por lento: debe recargar el estado
+SLOW_CONSUMER_PAYLOAD = dumps({"type": "disconnected", "reason": "slow_consumer"})
+SLOW_CONSUMER_FRAME = encode_sse(SLOW_CONSUMER_PAYLOAD)
+# Comentario SSE (lo ignora EventSource): mantiene viva la conexión
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+class SlowConsumerPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest"  # Descartar el frame pendiente más viejo
+    COALESCE = "coalesce"        # Reemplazar el pendiente con la misma clave
+    DISCONNECT = "disconnect"    # Cerrar el stream con SLOW_CONSUMER_FRAME
+
+
+# Resultado de encolar cuando el buffer está lleno (contadores por política)
+DROPPED = "dropped"
+COALESCED = "coalesced"
+DISCONNECTED = "disconnected"
+
+
+class FanoutStats:
+    """Latencia del reparto de mensajes (tiempo de encolar en todos los clientes)"""
+
+    __slots__ = ("messages", "deliveries", "total_us", "max_us", "last_us", "last_clients", "policies")
+
+    def __init__(self):
+        self.messages = 0
+        self.deliveries = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.last_us = 0.0
+        self.last_clients = 0
+        # política -> resultado (dropped / coalesced / disconnected) -> veces
+        self.policies: Dict[str, Dict[str, int]] = {
+            policy.value: {DROPPED: 0, COALESCED: 0, DISCONNECTED: 0}
+            for policy in SlowConsumerPolicy
+        }
+
+    def record_overflow(self, policy: SlowConsumerPolicy, outcome: str):
+        self.policies[policy.value][outcome] += 1
+
+    def record(self, elapsed_us: float, clients: int, delivered: int):
+        self.messages += 1
+        self.deliveries += delivered
+        self.total_us += elapsed_us
+        self.last_us = elapsed_us
+        self.last_clients = clients
+        if elapsed_us > self.max_us:
+            self.max_us = elapsed_us
+
+    def snapshot(self) -> dict:
+        return {
+            "messages": self.messages,
+            "deliveries": self.deliveries,
+            "avg_fanout_us": round(self.total_us / self.messages, 2) if self.messages else 0.0,
+            "max_fanout_us": round(self.max_us, 2),
+            "last_fanout_us": round(self.last_us, 2),
+            "last_clients": self.last_clients,
+            "slow_consumers": {policy: dict(counts) for policy, counts in self.policies.items()},
+        }
+
+
+class Subscriber:
+    """Buffer de frames pendientes de un cliente (pares clave, frame)"""
+
+    __slots__ = ("buffer", "max_pending", "policy", "region", "farewell", "closed", "_waiter")
+
+    # Clientes SSE: frames sin topic y sin filtro de clave
+    topic: Optional[str] = None
+    key_filter: Optional[str] = None
+
+    def __init__(
+        self,
+        max_pending: int,
+        policy: SlowConsumerPolicy,
+        region: Optional[GeoRegion] = None,
+        farewell: Union[bytes, str] = SLOW_CONSUMER_FRAME,
+    ):
+        self.buffer: Deque[Tuple[Optional[Hashable], Union[bytes, str]]] = deque()
+        self.max_pending = max_pending
+        self.policy = policy
+        # Sin región recibe todos los mensajes
+        self.region = region
+        # Último frame al desconectarlo por lento
+        self.farewell = farewell
+        self.closed = False
+        self._waiter: Optional[asyncio.Future] = None
+
+    @property
+    def full(self) -> bool:
+        return len(self.buffer) >= self.max_pending
+
+    def _wake(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def enqueue(self, frame: Union[bytes, str], key: Optional[Hashable] = None):
+        """Encolar sin aplicar la política (frame inicial, replay, avisos)"""
+        self.buffer.append((key, frame))
+        self._wake()
+
+    def push(self, frame: Union[bytes, str], key: Optional[Hashable] = None) -> Optional[str]:
+        """
+        Encolar un frame aplicando la política si el buffer está lleno
+
+        Returns:
+            None si se encoló sin más; si no, DROPPED / COALESCED / DISCONNECTED
+        """
+        if self.closed:
+            return DISCONNECTED
+        if len(self.buffer) < self.max_pending:
+            self.buffer.append((key, frame))
+            self._wake()
+            return None
+
+        if self.policy == SlowConsumerPolicy.COALESCE and key is not None:
+            for index, (pending_key, _) in enumerate(self.buffer):
+                if pending_key == key:
+                    # El estado más reciente de esa clave reemplaza al pendiente
+                    del self.buffer[index]
+                    self.buffer.append((key, frame))
+                    return COALESCED
+            # Nada que fusionar: perder un frame sin avisar no es aceptable
+
+        if self.policy == SlowConsumerPolicy.DROP_OLDEST:
+            self.buffer.popleft()
+            self.buffer.append((key, frame))
+            return DROPPED
+
+        self.disconnect()
+        return DISCONNECTED
+
+    def ping(self):
+        """Encolar un heartbeat si no hay nada pendiente de enviar"""
+        if not self.buffer and not self.closed:
+            self.buffer.append((None, HEARTBEAT_FRAME))
+            self._wake()
+
+    def disconnect(self):
+        """Desconectarlo por lento: los pendientes ya no sirven, el cliente debe recargar el estado"""
+        self.buffer.clear()
+        self.buffer.append((None, self.farewell))
+        self.close()
+
+    def close(self):
+        """Terminar el stream después de los frames ya encolados"""
+        self.closed = True
+        self._wake()
+
+    async def frames(self) -> AsyncGenerator[Union[bytes, str], None]:
+        while True:
+            while self.buffer:
+                yield self.buffer.popleft()[1]
+            if self.closed:
+                return
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+
+class TopicSubscription:
+    """
+    Suscripción de una conexión WebSocket a un broadcaster
+
+    Encola en el Subscriber de la conexión (compartido por todos sus topics)
+    los mensajes codificados para su topic; con `key_filter` solo recibe los
+    mensajes de esa clave.
+    """
+
+    __slots__ = ("connection", "topic", "key_filter")
+
+    # Los topics no filtran por región
+    region = None
+
+    def __init__(self, connection: Subscriber, topic: str, key_filter: Optional[str] = None):
+        self.connection = connection
+        self.topic = topic
+        self.key_filter = key_filter
+
+    @property
+    def policy(self) -> SlowConsumerPolicy:
+        return self.connection.policy
+
+    @property
+    def closed(self) -> bool:
+        return self.connection.closed
+
+    def enqueue(self, frame: str, key: Optional[str] = None):
+        self.connection.enqueue(frame, None if key is None else (self.topic, key))
+
+    def push(self, frame: str, key: Optional[str] = None) -> Optional[str]:
+        # Claves por topic: COALESCE no mezcla el mismo id de topics distintos
+        return self.connection.push(frame, None if key is None else (self.topic, key))
+
+    def ping(self):
+        pass  # El servidor WebSocket ya envía pings de protocolo
+
+    def close(self):
+        self.connection.close()
+
+
+# Suscriptor SSE o topic de una conexión WebSocket
+AnySubscriber = Union[Subscriber, TopicSubscription]
 
 
 class EventBroadcaster:
     """
     Sistema de broadcasting para Server-Sent Events (SSE)
-    
+
     Gestiona múltiples clientes conectados y distribuye eventos
     a todos ellos en tiempo real sin necesidad de Redis.
     """
-    
-    def __init__(self):
-        self.clients: Set[asyncio.Queue] = set()
-        self._lock = asyncio.Lock()
-    
-    async def subscribe(self) -> AsyncGenerator[str, None]:
+
+    def __init__(
+        self,
+        channel: str,
+        transport: Optional[BroadcastTransport] = None,
+        queue_size: int = settings.SSE_CLIENT_BUFFER_SIZE,
+        default_policy: SlowConsumerPolicy = SlowConsumerPolicy(settings.SSE_SLOW_CONSUMER_POLICY),
+        replay_size: int = settings.SSE_REPLAY_BUFFER_SIZE,
+        heartbeat_seconds: float = settings.SSE_HEARTBEAT_SECONDS,
+        coalesce: bool = True,
+    ):
+        self.channel = channel
+        self.transport = transport or broadcast_transport
+        self.transport.register(self)
+        self.queue_size = queue_size
+        self.default_policy = default_policy
+        self.heartbeat_seconds = heartbeat_seconds
+        # Con mensajes incrementales (diffs) un pendiente no puede reemplazar
+        # a otro: la clave solo filtra y COALESCE pasa a desconectar
+        self.coalesce = coalesce
+        # Conjuntos inmutables: solo se reasignan (nunca se modifican en sitio)
+        self.clients: FrozenSet[AnySubscriber] = frozenset()
+        # Sin filtro de clave (con o sin región) / sin filtro de ningún tipo;
+        # los que tienen región están además en geo_index
+        self.broad_clients: FrozenSet[AnySubscriber] = frozenset()
+        self.global_clients: FrozenSet[AnySubscriber] = frozenset()
+        self.geo_index = SubscriptionGrid(settings.SSE_GEO_CELL_DEGREES, settings.SSE_GEO_MAX_CELLS)
+        # Clave -> suscriptores que solo quieren los mensajes de esa clave
+        self.keyed_clients: Dict[str, FrozenSet[AnySubscriber]] = {}
+        self.stats = FanoutStats()
+        # Ids en milisegundos desde el arranque: siguen creciendo tras reiniciar
+        # (con el transporte mongodb los asigna el transporte, mayores aún)
+        self.last_id = int(time.time() * 1000)
+        # Últimos mensajes publicados: (id, clave, payload, puntos); se
+        # codifican al reenviar, según el topic de quien reconecta
+        self.replay: Deque[Tuple[int, Optional[str], bytes, Tuple[Point, ...]]] = deque(maxlen=replay_size)
+        # Ids del replay, para reconocer un Last-Event-ID emitido aquí
+        self._replay_ids: Set[int] = set()
+        # Mayor id que ya no se puede reenviar (los ids no tienen por qué ser
+        # consecutivos): desde él se reenvía todo el buffer
+        self._replay_floor = self.last_id
+        self._published = False
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def _add(self, subscriber: AnySubscriber):
+        self.clients = self.clients | {subscriber}
+        key = subscriber.key_filter
+        if key is not None:
+            self.keyed_clients[key] = self.keyed_clients.get(key, frozenset()) | {subscriber}
+            return
+        self.broad_clients = self.broad_clients | {subscriber}
+        if subscriber.region is None:
+            self.global_clients = self.global_clients | {subscriber}
+        else:
+            self.geo_index.add(subscriber, subscriber.region)
+
+    def _discard(self, subscriber: AnySubscriber):
+        if subscriber not in self.clients:
+            return
+        self.clients = self.clients - {subscriber}
+        key = subscriber.key_filter
+        if key is not None:
+            remaining = self.keyed_clients[key] - {subscriber}
+            if remaining:
+                self.keyed_clients[key] = remaining
+            else:
+                del self.keyed_clients[key]
+            return
+        self.broad_clients = self.broad_clients - {subscriber}
+        if subscriber.region is None:
+            self.global_clients = self.global_clients - {subscriber}
+        else:
+            self.geo_index.remove(subscriber)
+
+    def _ensure_heartbeat(self):
+        if self.heartbeat_seconds > 0 and (self._heartbeat_task is None or self._heartbeat_task.done()):
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        while self.clients:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscriber in self.clients:
+                subscriber.ping()
+
+    def _replay_after(self, subscriber: AnySubscriber, last_event_id: Optional[int]):
+        """
+        Encolar el frame inicial y los mensajes posteriores a last_event_id
+
+        El frame inicial es "connected" (nada perdido o cliente nuevo) o
+        "reset" (hueco fuera del ring buffer o id que no emitió este
+        broadcaster, p.ej. de otra réplica), con el id actual para que el
+        siguiente Last-Event-ID parta de aquí.
+        """
+        topic = subscriber.topic
+        if last_event_id is None or last_event_id == self.last_id:
+            subscriber.enqueue(encode_frame(topic, CONNECTED_PAYLOAD, self.last_id))
+            return
+
+        if last_event_id != self._replay_floor and last_event_id not in self._replay_ids:
+            subscriber.enqueue(encode_frame(topic, RESET_PAYLOAD, self.last_id))
+            return
+
+        subscriber.enqueue(encode_frame(topic, CONNECTED_PAYLOAD, last_event_id))
+        # El replay no cuenta para max_pending: la política se aplica a los
+        # mensajes nuevos si el cliente no se pone al día
+        region = subscriber.region
+        key_filter = subscriber.key_filter
+        for event_id, key, payload, points in self.replay:
+            if event_id <= last_event_id or (key_filter is not None and key != key_filter):
+                continue
+            if region is None or not points or region.contains_any(points):
+                subscriber.enqueue(encode_frame(topic, payload, event_id), key if self.coalesce else None)
+
+    def attach(self, subscriber: AnySubscriber, last_event_id: Optional[int] = None):
+        """
+        Registrar un suscriptor y encolar su frame inicial y el replay
+
+        Registrar y reenviar sin await de por medio: ningún mensaje se
+        pierde ni se duplica entre el replay y los nuevos.
+        """
+        self._add(subscriber)
+        self._replay_after(subscriber, last_event_id)
+        self._ensure_heartbeat()
+
+    def detach(self, subscriber: AnySubscriber):
+        self._discard(subscriber)
+
+    async def subscribe(
+        self,
+        policy: Optional[SlowConsumerPolicy] = None,
+        last_event_id: Optional[int] = None,
+        region: Optional[GeoRegion] = None,
+    ) -> AsyncGenerator[bytes, None]:
         """
         Suscribir un cliente para recibir eventos SSE
-        
+
+        Args:
+            policy: Política si el cliente no consume al ritmo de los mensajes
+                (por defecto, la del broadcaster)
+            last_event_id: Último id recibido antes de reconectar
+            region: Recibir solo los mensajes con coordenadas dentro de la
+                región (y los que no tienen coordenadas)
+
         Yields:
-            str: Mensajes en formato SSE (data: {json}\n\n)
+            bytes: Frames SSE ya codificados (id: n\\ndata: {json}\\n\\n)
         """
-        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
-        
-        async with self._lock:
-            self.clients.add(queue)
-        
+        subscriber = Subscriber(self.queue_size, policy or self.default_policy, region)
+        self.attach(subscriber, last_event_id)
+
         try:
-            # Enviar mensaje de conexión
-            yield f"data: {json.dumps({'type': 'connected'})}\n\n"
-            
-            # Escuchar eventos
-            while True:
-                message = await queue.get()
-                if message is None:  # Señal de desconexión
-                    break
-                yield f"data: {message}\n\n"
-                
+            # Mensaje de conexión (o reset), replay y eventos (termina con close())
+            async for frame in subscriber.frames():
+                yield frame
+
         except asyncio.CancelledError:
             # Cliente desconectado
             pass
         finally:
-            async with self._lock:
-                self.clients.discard(queue)
-    
-    async def broadcast(self, event_type: str, data: dict):
+            self.detach(subscriber)
+
+    def publish(
+        self,
+        payload: bytes,
+        key: Optional[str] = None,
+        event_id: Optional[int] = None,
+        points: Sequence[Point] = (),
+    ) -> int:
+        """
+        Asignar id, guardar en el ring buffer y encolar en los clientes
+        locales interesados (síncrono, sin lock). Lo llama el transporte.
+
+        Args:
+            payload: Mensaje JSON ya serializado
+            key: Clave para la política COALESCE (ej: id de la alerta)
+            event_id: Id asignado por el transporte (por defecto, el siguiente)
+            points: Coordenadas (lat, lng) del mensaje; sin puntos llega a
+                todos, con puntos solo a las regiones que contienen alguno
+                (los suscriptores con filtro de clave lo reciben si coincide)
+
+        Returns:
+            Número de clientes que lo recibieron
+        """
+        if event_id is None:
+            event_id = self.last_id + 1
+        elif event_id <= self.last_id:
+            return 0  # Ya entregado
+        if not self._published:
+            # Quien conectó antes del primer mensaje tiene el id inicial
+            self._replay_floor = self.last_id
+            self._published = True
+        if len(self.replay) == self.replay.maxlen:
+            self._replay_floor = self.replay[0][0]
+            self._replay_ids.discard(self._replay_floor)
+        self.last_id = event_id
+        points = tuple(points)
+        self.replay.append((event_id, key, payload, points))
+        self._replay_ids.add(event_id)
+
+        if not self.clients:
+            return 0
+
+        start = time.perf_counter()
+        # Foto de los destinatarios actuales
+        keyed = self.keyed_clients.get(key, ()) if key is not None else ()
+        if points:
+            matched = self.geo_index.match(points)
+            recipients: Iterable[AnySubscriber] = chain(self.global_clients, matched, keyed)
+            count = len(self.global_clients) + len(matched) + len(keyed)
+        else:
+            recipients = chain(self.broad_clients, keyed) if keyed else self.broad_clients
+            count = len(self.broad_clients) + len(keyed)
+
+        push_key = key if self.coalesce else None
+        # Una codificación por topic (None = SSE)
+        sse_frame = encode_sse(payload, event_id)
+        frames: Dict[str, str] = {}
+        closed: List[AnySubscriber] = []
+        for subscriber in recipients:
+            topic = subscriber.topic
+            if topic is None:
+                frame = sse_frame
+            else:
+                frame = frames.get(topic)
+                if frame is None:
+                    frame = frames[topic] = encode_topic(topic, payload, event_id)
+            outcome = subscriber.push(frame, push_key)
+            if outcome is None:
+                continue
+            self.stats.record_overflow(subscriber.policy, outcome)
+            if outcome == DISCONNECTED:
+                closed.append(subscriber)
+
+        # El generador de cada uno termina al vaciar su buffer
+        for subscriber in closed:
+            self._discard(subscriber)
+
+        delivered = count - len(closed)
+        self.stats.record((time.perf_counter() - start) * 1e6, count, delivered)
+        return delivered
+
+    async def broadcast_json(
+        self, event_type: str, data: bytes, key: Optional[str] = None, points: Sequence[Point] = ()
+    ):
+        """
+        Enviar evento cuyo payload ya está serializado a JSON
+        (ej: el fragmento cacheado de la respuesta), sin volver a codificarlo
         """
-        Enviar evento a todos los clientes conectados
-        
+        await self.transport.publish(
+            self.channel, b'{"type":' + dumps(event_type) + b',"data":' + data + b"}", key, points
+        )
+
+    async def broadcast(
+        self, event_type: str, data: dict, key: Optional[str] = None, points: Sequence[Point] = ()
+    ):
+        """
+        Enviar evento a los clientes conectados
+
         Args:
             event_type: Tipo de evento (create, update, delete)
             data: Datos del evento
+            key: Clave para fusionar eventos pendientes de clientes lentos
+            points: Coordenadas (lat, lng) para los clientes con región
         """
-        if not self.clients:
-            return
-        
-        message = json.dumps({
-            "type": event_type,
-            "data": data
-        })
-        
-        # Enviar mensaje a todos los clientes
-        disconnected_clients = []
-        
-        async with self._lock:
-            for queue in self.clients:
-                try:
-                    # Usar put_nowait para evitar bloqueos
-                    queue.put_nowait(message)
-                except asyncio.QueueFull:
-                    # Cliente con cola llena - marcar para desconexión
-                    disconnected_clients.append(queue)
-        
-        # Limpiar clientes desconectados
-        if disconnected_clients:
-            async with self._lock:
-                for queue in disconnected_clients:
-                    self.clients.discard(queue)
-    
+        await self.transport.publish(self.channel, dumps({"type": event_type, "data": data}), key, points)
+
+    def reset_clients(self):
+        """
+        Avisar a los clientes locales de que pudieron perder mensajes
+        (el transporte perdió el historial) y vaciar el replay
+        """
+        self.replay.clear()
+        self._replay_ids.clear()
+        self._replay_floor = self.last_id
+        for subscriber in self.clients:
+            subscriber.push(encode_frame(subscriber.topic, RESET_PAYLOAD, self.last_id))
+
     async def disconnect_all(self):
         """Desconectar todos los clientes (útil para shutdown)"""
-        async with self._lock:
-            for queue in self.clients:
-                await queue.put(None)
-            self.clients.clear()
-    
+        clients, self.clients = self.clients, frozenset()
+        self.broad_clients = self.global_clients = frozenset()
+        self.keyed_clients = {}
+        self.geo_index = SubscriptionGrid(self.geo_index.cell_degrees, self.geo_index.max_cells)
+        for subscriber in clients:
+            subscriber.close()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
     def get_active_connections(self) -> int:
         """Obtener número de clientes activos"""
         return len(self.clients)
 
+    def get_stats(self) -> dict:
+        """Clientes activos y latencia del reparto"""
+        return {
+            "active_connections": len(self.clients),
+            "last_event_id": self.last_id,
+            "replay_buffered": len(self.replay),
+            "geo_subscriptions": len(self.geo_index),
+            "geo_cells": len(self.geo_index.cells),
+            "keyed_subscriptions": sum(len(clients) for clients in self.keyed_clients.values()),
+            **self.stats.snapshot(),
+        }
+
 
-# Instancia global del broadcaster
-alerts_broadcaster = EventBroadcaster()
+# Instancias globales de los broadcasters (un canal cada uno)
+alerts_broadcaster = EventBroadcaster("alerts")
+events_broadcaster = EventBroadcaster("events", coalesce=False)  # Diffs por evento
+agenda_broadcaster = EventBroadcaster("agenda")  # Clave: id del usuario
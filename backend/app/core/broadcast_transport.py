@@ -0,0 +1,246 @@
+"""
+Core Broadcast Transport - Reparto de mensajes entre réplicas
+Los broadcasters publican a través de un transporte; el transporte entrega
+cada mensaje al broadcaster local de su canal, que lo reparte a sus clientes.
+
+    memory   -> entrega directa en el mismo proceso (desarrollo, una réplica)
+    mongodb  -> cada mensaje se inserta en BROADCAST_LOG_COLLECTION y cada
+                pod lo recibe por un change stream (requiere replica set,
+                p.ej. Atlas o `mongod --replSet`)
+
+Con mongodb el pod que publica también recibe el mensaje por el change
+stream (no se entrega localmente dos veces) y el resume token permite
+retomar tras un corte sin perder ni repetir mensajes: exactamente una
+entrega por pod. El id SSE de cada mensaje es el clusterTime de la
+inserción, igual en todas las réplicas, así que Last-Event-ID sirve aunque
+el cliente reconecte a otro pod.
+
+Los caches locales (alertas, rutas, catálogo de eventos) se registran con
+add_listener: cada mensaje escrito en otra réplica se les pasa antes de
+repartirlo, así un cliente que recarga tras el aviso ya ve el cambio. Con
+la clave None (historial perdido) deben recargarse enteros.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from bson import Timestamp
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.config import settings
+from app.database import get_database
+
+if TYPE_CHECKING:
+    from app.core.broadcast import EventBroadcaster
+
+# Códigos de OperationFailure de change streams
+CHANGE_STREAMS_UNSUPPORTED = 40573  # Servidor standalone (sin replica set)
+CHANGE_STREAM_HISTORY_LOST = 286    # El resume token ya salió del oplog
+
+# async (payload, clave) -> None; clave None = recargar todo
+Listener = Callable[[bytes, Optional[str]], Awaitable[None]]
+
+
+def cluster_time_id(cluster_time: Timestamp) -> int:
+    """Id entero y creciente a partir del clusterTime de una operación"""
+    return (cluster_time.time << 32) | cluster_time.inc
+
+
+class BroadcastTransport:
+    """Transporte base: registro de canales y entrega local"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._channels: Dict[str, "EventBroadcaster"] = {}
+        self._listeners: Dict[str, List[Listener]] = {}
+
+    def register(self, broadcaster: "EventBroadcaster"):
+        self._channels[broadcaster.channel] = broadcaster
+
+    def add_listener(self, channel: str, listener: Listener):
+        """
+        Registrar un cache local que se actualiza con los mensajes del canal
+        publicados en otra réplica (la réplica que escribe ya lo actualizó)
+        """
+        self._listeners.setdefault(channel, []).append(listener)
+
+    async def notify(self, channel: str, payload: bytes, key: Optional[str]):
+        """Pasar un mensaje remoto a los caches del canal (sus errores no cortan el reparto)"""
+        for listener in self._listeners.get(channel, ()):
+            try:
+                await listener(payload, key)
+            except Exception as e:
+                print(f"⚠️  Error actualizando cache local del canal '{channel}': {e!r}")
+
+    def deliver(
+        self,
+        channel: str,
+        payload: bytes,
+        key: Optional[str],
+        event_id: Optional[int] = None,
+        points: Sequence[Tuple[float, float]] = (),
+    ):
+        """Repartir un mensaje a los clientes locales del canal"""
+        broadcaster = self._channels.get(channel)
+        if broadcaster is not None:
+            broadcaster.publish(payload, key, event_id, points)
+
+    async def publish(
+        self,
+        channel: str,
+        payload: bytes,
+        key: Optional[str] = None,
+        points: Sequence[Tuple[float, float]] = (),
+    ):
+        self.deliver(channel, payload, key, points=points)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class InProcessTransport(BroadcastTransport):
+    """Entrega directa en el proceso (sin coordinación entre réplicas)"""
+
+    name = "memory"
+
+
+class MongoChangeStreamTransport(BroadcastTransport):
+    """Log de mensajes en MongoDB leído por un change stream en cada pod"""
+
+    name = "mongodb"
+
+    def __init__(self, collection_name: str, ttl_seconds: int):
+        super().__init__()
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self._resume_token: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        # Marca los mensajes propios: sus caches ya se actualizaron al escribir
+        self.origin = uuid.uuid4().hex
+        # Sin replica set: se degrada a entrega local en vez de perder mensajes
+        self._local_only = False
+
+    @property
+    def collection(self):
+        return get_database()[self.collection_name]
+
+    async def start(self):
+        """Crear el índice TTL del log y arrancar el change stream"""
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        try:
+            # Abrir el stream aquí para detectar un servidor sin replica set
+            stream = self._open_stream()
+            await stream.try_next()
+            self._resume_token = stream.resume_token
+            await stream.close()
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAMS_UNSUPPORTED:
+                raise
+            print("⚠️  MongoDB sin replica set: broadcast solo local (sin change streams)")
+            self._local_only = True
+            return
+        self._task = asyncio.create_task(self._watch())
+        print(f"📡 Broadcast entre réplicas por change stream en '{self.collection_name}'")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _open_stream(self):
+        return self.collection.watch(
+            [{"$match": {"operationType": "insert"}}],
+            resume_after=self._resume_token,
+        )
+
+    async def publish(
+        self,
+        channel: str,
+        payload: bytes,
+        key: Optional[str] = None,
+        points: Sequence[Tuple[float, float]] = (),
+    ):
+        if self._local_only:
+            self.deliver(channel, payload, key, points=points)
+            return
+        await self.collection.insert_one({
+            "channel": channel,
+            "payload": payload,
+            "key": key,
+            "points": [list(point) for point in points],
+            "origin": self.origin,
+            "created_at": datetime.utcnow(),
+        })
+
+    async def _watch(self):
+        """Entregar cada inserción del log a los broadcasters locales"""
+        delay = 1.0
+        while True:
+            try:
+                async with self._open_stream() as stream:
+                    delay = 1.0
+                    async for change in stream:
+                        try:
+                            doc = change["fullDocument"]
+                            channel, payload, key = doc["channel"], bytes(doc["payload"]), doc.get("key")
+                            # Caches locales primero: quien recargue tras el aviso ya ve el cambio
+                            if doc.get("origin") != self.origin:
+                                await self.notify(channel, payload, key)
+                            self.deliver(
+                                channel, payload, key,
+                                cluster_time_id(change["clusterTime"]),
+                                [tuple(point) for point in doc.get("points", ())],
+                            )
+                        except Exception as e:
+                            # Un mensaje malformado no debe parar el relay:
+                            # se descarta y se avanza igualmente
+                            print(f"⚠️  Mensaje de broadcast descartado ({change.get('_id')}): {e!r}")
+                        self._resume_token = stream.resume_token
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    # El hueco ya no está en el oplog: seguir desde ahora y
+                    # que los clientes recarguen el estado
+                    print("⚠️  Change stream sin historial: se retoma desde ahora")
+                    self._resume_token = None
+                    for channel in self._listeners:
+                        await self.notify(channel, b"", None)
+                    for broadcaster in self._channels.values():
+                        broadcaster.reset_clients()
+                else:
+                    print(f"⚠️  Error en change stream de broadcast: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            except PyMongoError as e:
+                print(f"⚠️  Error en change stream de broadcast: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            except Exception as e:
+                # Cualquier otro fallo reinicia el stream en vez de matar la tarea
+                print(f"❌ Error inesperado en el relay de broadcast: {e!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+def create_transport(name: str) -> BroadcastTransport:
+    if name == "memory":
+        return InProcessTransport()
+    if name == "mongodb":
+        return MongoChangeStreamTransport(
+            settings.BROADCAST_LOG_COLLECTION, settings.BROADCAST_LOG_TTL_SECONDS
+        )
+    raise ValueError(f"Transporte de broadcast desconocido: {name}")
+
+
+# Instancia global del transporte (la comparten todos los broadcasters)
+broadcast_transport = create_transport(settings.BROADCAST_TRANSPORT)
@@ -0,0 +1,208 @@
+"""
+Core Fragments - Respuestas JSON pre-serializadas
+Cada documento se serializa una sola vez (al cargarse o escribirse) y los
+listados se arman concatenando esos bytes en una Response cruda, sin
+validación ni codificación pydantic por petición.
+
+Cada réplica tiene su propio cache: las escrituras hechas en otra réplica
+llegan por el transporte de broadcast (canal de la colección) y se releen
+de la BD antes de repartir el aviso a los clientes.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from beanie import Document
+from bson import ObjectId
+from fastapi import Response
+
+from app.config import settings
+from app.core import mappers
+from app.core.broadcast_transport import broadcast_transport
+from app.core.placeholders import placeholders
+
+
+def json_list_response(fragments: Iterable[bytes], status_code: int = 200) -> Response:
+    """Armar un array JSON a partir de fragmentos ya serializados"""
+    return Response(
+        content=b"[" + b",".join(fragments) + b"]",
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def json_fragment_response(fragment: bytes, status_code: int = 200) -> Response:
+    """Responder con un único fragmento ya serializado"""
+    return Response(content=fragment, status_code=status_code, media_type="application/json")
+
+
+def naive_utc(doc: dict) -> dict:
+    """
+    Normalizar los datetimes de primer nivel a naive UTC (como los devuelve MongoDB)
+    para que el documento serialice igual venga de la BD o de un modelo recién creado
+    """
+    for key, value in doc.items():
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            doc[key] = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return doc
+
+
+class CachedEntry:
+    """Documento crudo junto a su representación JSON"""
+
+    __slots__ = ("doc", "fragment")
+
+    def __init__(self, doc: dict, fragment: bytes):
+        self.doc = doc
+        self.fragment = fragment
+
+
+class FragmentCache:
+    """
+    Cache en memoria de documentos de una colección pre-serializados a JSON
+
+    Pensada para colecciones pequeñas (alertas, rutas): se carga completa,
+    se mantiene ordenada por `sort_field` descendente y se actualiza en
+    cada escritura con put/remove. Las escrituras de otras réplicas llegan
+    por `channel` (la clave del mensaje es el id del documento).
+    """
+
+    def __init__(
+        self,
+        model: type[Document],
+        serialize: Callable[[dict], bytes],
+        channel: str,
+        sort_field: str = "created_at",
+    ):
+        """
+        Args:
+            model: Documento Beanie de la colección
+            serialize: Función documento crudo -> bytes JSON de la respuesta
+            channel: Canal del transporte de broadcast con sus escrituras
+            sort_field: Campo de orden descendente de los listados
+        """
+        self.model = model
+        self.serialize = serialize
+        self.channel = channel
+        self.sort_field = sort_field
+        self._entries: Dict[str, CachedEntry] = {}
+        self._ordered: List[CachedEntry] = []
+        self._dirty = False
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Escrituras recibidas mientras se recarga (id -> documento o None si se borró)
+        self._pending: Optional[Dict[str, Optional[dict]]] = None
+        broadcast_transport.add_listener(channel, self.on_remote_write)
+
+    async def load(self):
+        """Cargar (o recargar) la colección completa"""
+        async with self._lock:
+            self._pending = {}
+            try:
+                docs = await self.model.get_motor_collection().find({}).to_list(length=None)
+                await placeholders.ensure(doc.get("image_id") for doc in docs)
+            finally:
+                pending, self._pending = self._pending, None
+
+            self._entries = {
+                str(doc["_id"]): CachedEntry(doc, self.serialize(doc)) for doc in docs
+            }
+            for doc_id, doc in pending.items():
+                if doc is None:
+                    self._entries.pop(doc_id, None)
+                else:
+                    self._entries[doc_id] = CachedEntry(doc, self.serialize(doc))
+            self._dirty = True
+            self.loaded_at = time.monotonic()
+
+    async def ensure_loaded(self):
+        """
+        Cargar si hace falta; recargar en segundo plano si el snapshot es viejo
+        (red de seguridad: las escrituras remotas ya llegan por el transporte)
+        """
+        if self.loaded_at is None:
+            await self.load()
+            return
+
+        age = time.monotonic() - self.loaded_at
+        if age >= settings.FRAGMENT_CACHE_MAX_AGE_SECONDS and (
+            self._refresh_task is None or self._refresh_task.done()
+        ):
+            self._refresh_task = asyncio.create_task(self.load())
+
+    async def refresh(self, doc_id: str):
+        """Releer un documento de la BD y actualizarlo o quitarlo del cache"""
+        if self.loaded_at is None and self._pending is None:
+            return  # Se cargará completo en la primera lectura
+        doc = None
+        if ObjectId.is_valid(doc_id):
+            doc = await self.model.get_motor_collection().find_one({"_id": ObjectId(doc_id)})
+        if doc is None:
+            self.remove(doc_id)
+            return
+        await placeholders.ensure([doc.get("image_id")])
+        self.put(doc)
+
+    async def on_remote_write(self, payload: bytes, key: Optional[str]):
+        """Escritura hecha en otra réplica (sin clave: recargar todo)"""
+        if key is None:
+            await self.load()
+        else:
+            await self.refresh(key)
+
+    async def announce(self, doc_id: str):
+        """
+        Avisar a las demás réplicas de que el documento cambió
+        (para colecciones sin broadcaster propio, como las rutas)
+        """
+        try:
+            await broadcast_transport.publish(self.channel, b"", doc_id)
+        except Exception as e:
+            print(f"Error anunciando cambio en '{self.channel}': {e}")
+
+    def put(self, doc: dict) -> bytes:
+        """Insertar o reemplazar un documento; devuelve su fragmento JSON"""
+        doc = naive_utc(doc)
+        entry = CachedEntry(doc, self.serialize(doc))
+        self._entries[str(doc["_id"])] = entry
+        if self._pending is not None:
+            self._pending[str(doc["_id"])] = doc
+        self._dirty = True
+        return entry.fragment
+
+    def put_document(self, document: Document) -> bytes:
+        """Insertar o reemplazar a partir de un documento Beanie"""
+        return self.put(mappers.raw(document))
+
+    def remove(self, doc_id: str):
+        """Quitar un documento del cache"""
+        if self._pending is not None:
+            self._pending[doc_id] = None
+        if self._entries.pop(doc_id, None) is not None:
+            self._dirty = True
+
+    def get(self, doc_id: str) -> Optional[bytes]:
+        """Fragmento JSON de un documento por id"""
+        entry = self._entries.get(doc_id)
+        return entry.fragment if entry else None
+
+    def select(self, predicate: Optional[Callable[[dict], bool]] = None) -> List[bytes]:
+        """
+        Fragmentos en orden descendente de `sort_field`, opcionalmente filtrados
+
+        Args:
+            predicate: Función sobre el documento crudo que decide si se incluye
+        """
+        if self._dirty:
+            self._ordered = sorted(
+                self._entries.values(),
+                key=lambda entry: entry.doc.get(self.sort_field) or datetime.min,
+                reverse=True,
+            )
+            self._dirty = False
+
+        if predicate is None:
+            return [entry.fragment for entry in self._ordered]
+        return [entry.fragment for entry in self._ordered if predicate(entry.doc)]
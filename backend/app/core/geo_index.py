@@ -0,0 +1,163 @@
+"""
+Core Geo Index - Índice espacial de suscripciones SSE
+Cada suscripción con región (círculo o bbox) se registra en las celdas de
+una rejilla lat/lng que cubre su rectángulo envolvente. Para repartir un
+mensaje con coordenadas solo se miran las suscripciones de la celda del
+punto, así el coste crece con los clientes interesados y no con el total.
+
+Las regiones que cubren demasiadas celdas (p.ej. un bbox de media
+provincia) no se indexan: van a una lista aparte que se comprueba entera
+en cada mensaje.
+"""
+import math
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+# (lat, lng)
+Point = Tuple[float, float]
+Cell = Tuple[int, int]
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = 111320.0
+
+
+class GeoRegion:
+    """Círculo (centro y radio en metros) o rectángulo lat/lng"""
+
+    __slots__ = ("min_lat", "min_lng", "max_lat", "max_lng", "center", "radius_m")
+
+    def __init__(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        center: Optional[Point] = None,
+        radius_m: Optional[float] = None,
+    ):
+        self.min_lat = min_lat
+        self.min_lng = min_lng
+        self.max_lat = max_lat
+        self.max_lng = max_lng
+        self.center = center
+        self.radius_m = radius_m
+
+    @classmethod
+    def circle(cls, lat: float, lng: float, radius_m: float) -> "GeoRegion":
+        d_lat = radius_m / METERS_PER_DEGREE
+        d_lng = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        return cls(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng, (lat, lng), radius_m)
+
+    @classmethod
+    def bbox(cls, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> "GeoRegion":
+        return cls(min_lat, min_lng, max_lat, max_lng)
+
+    @classmethod
+    def parse_bbox(cls, value: str) -> "GeoRegion":
+        """
+        "min_lng,min_lat,max_lng,max_lat" (orden GeoJSON) -> GeoRegion
+
+        Raises:
+            ValueError: Formato o rangos inválidos
+        """
+        parts = [float(part) for part in value.split(",")]
+        if len(parts) != 4:
+            raise ValueError("bbox debe tener 4 valores")
+        min_lng, min_lat, max_lng, max_lat = parts
+        if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+            raise ValueError("bbox fuera de rango")
+        return cls.bbox(min_lng, min_lat, max_lng, max_lat)
+
+    def contains(self, point: Point) -> bool:
+        lat, lng = point
+        if not (self.min_lat <= lat <= self.max_lat and self.min_lng <= lng <= self.max_lng):
+            return False
+        if self.center is None:
+            return True
+        # Distancia haversine al centro
+        lat1, lng1 = math.radians(self.center[0]), math.radians(self.center[1])
+        lat2, lng2 = math.radians(lat), math.radians(lng)
+        a = (
+            math.sin((lat2 - lat1) / 2.0) ** 2
+            + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2.0) ** 2
+        )
+        return 2.0 * EARTH_RADIUS_M * math.asin(math.sqrt(a)) <= self.radius_m
+
+    def contains_any(self, points: Sequence[Point]) -> bool:
+        for point in points:
+            if self.contains(point):
+                return True
+        return False
+
+
+class SubscriptionGrid:
+    """
+    Rejilla de celdas de `cell_degrees` grados -> suscripciones que la tocan
+
+    Cada celda guarda un frozenset que se reemplaza entero al cambiar
+    (copy-on-write, como el conjunto de clientes del broadcaster).
+    """
+
+    def __init__(self, cell_degrees: float, max_cells: int):
+        self.cell_degrees = cell_degrees
+        self.max_cells = max_cells
+        self.cells: Dict[Cell, FrozenSet[Hashable]] = {}
+        # Regiones demasiado grandes para indexar
+        self.wide: FrozenSet[Hashable] = frozenset()
+        self._regions: Dict[Hashable, Tuple[GeoRegion, List[Cell]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def _covering(self, region: GeoRegion) -> Optional[List[Cell]]:
+        """Celdas que cubren la región (None si son más de max_cells)"""
+        low_lat, low_lng = self._cell(region.min_lat, region.min_lng)
+        high_lat, high_lng = self._cell(region.max_lat, region.max_lng)
+        if (high_lat - low_lat + 1) * (high_lng - low_lng + 1) > self.max_cells:
+            return None
+        return [
+            (cell_lat, cell_lng)
+            for cell_lat in range(low_lat, high_lat + 1)
+            for cell_lng in range(low_lng, high_lng + 1)
+        ]
+
+    def add(self, item: Hashable, region: GeoRegion):
+        cells = self._covering(region)
+        if cells is None:
+            self.wide = self.wide | {item}
+            cells = []
+        for cell in cells:
+            self.cells[cell] = self.cells.get(cell, frozenset()) | {item}
+        self._regions[item] = (region, cells)
+
+    def remove(self, item: Hashable):
+        entry = self._regions.pop(item, None)
+        if entry is None:
+            return
+        for cell in entry[1]:
+            remaining = self.cells[cell] - {item}
+            if remaining:
+                self.cells[cell] = remaining
+            else:
+                del self.cells[cell]
+        if item in self.wide:
+            self.wide = self.wide - {item}
+
+    def match(self, points: Sequence[Point]) -> Iterable[Hashable]:
+        """Suscripciones cuya región contiene alguno de los puntos"""
+        if len(points) == 1:
+            candidates: Iterable[Hashable] = self.cells.get(self._cell(*points[0]), ())
+        else:
+            found: Set[Hashable] = set()
+            for point in points:
+                found.update(self.cells.get(self._cell(*point), ()))
+            candidates = found
+
+        regions = self._regions
+        matched = [item for item in candidates if regions[item][0].contains_any(points)]
+        for item in self.wide:
+            if regions[item][0].contains_any(points):
+                matched.append(item)
+        return matched
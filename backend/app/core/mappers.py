@@ -0,0 +1,195 @@
+"""
+Core Mappers - Conversión documento crudo (BSON) -> respuesta JSON
+Única conversión usada por los routers en el camino caliente: construye el
+dict de respuesta directamente desde el documento de MongoDB, sin pasar por
+el Document de Beanie ni por los schemas pydantic. Los schemas se mantienen
+como response_model solo para la documentación OpenAPI: FastAPI no valida
+una Response ya armada, así que el contrato lo garantizan estos mappers.
+
+Los campos con default en el modelo se leen con el mismo default: los
+documentos antiguos pueden no tenerlos (Beanie los rellenaba al cargar).
+
+Los placeholders de imagen salen de app.core.placeholders, que se debe
+completar (placeholders.ensure) antes de mapear un lote de documentos.
+
+El resultado de cada mapper tiene la misma forma que el schema equivalente
+(EventSummary, EventResponse, AlertResponse, RouteResponse, UserResponse,
+AgendaResponse) y se serializa con app.core.responses.dumps.
+"""
+from datetime import datetime
+from typing import Optional
+
+from beanie import Document
+
+from app.core.placeholders import placeholders
+
+IMAGE_URL_PREFIX = "/api/v1/images/"
+
+# Proyecciones mínimas para las consultas de lectura
+EVENT_SUMMARY_PROJECTION = {
+    "title": 1, "description": 1, "date": 1, "time": 1, "location": 1,
+    "coordinates": 1, "category": 1, "image_id": 1,
+}
+USER_PROJECTION = {"password_hash": 0, "refresh_token": 0}
+
+
+def raw(document: Document) -> dict:
+    """Documento Beanie -> dict con la misma forma que el documento en MongoDB"""
+    return document.model_dump(by_alias=True)
+
+
+def image_url(image_id) -> Optional[str]:
+    """URL pública de una imagen de GridFS"""
+    return f"{IMAGE_URL_PREFIX}{image_id}" if image_id else None
+
+
+def image_placeholder(image_id) -> Optional[str]:
+    """Placeholder de la imagen (requiere placeholders.ensure previo)"""
+    return placeholders.get(image_id)
+
+
+def timestamp(doc: dict, field: str) -> datetime:
+    """Fecha de auditoría con el default del modelo (datetime.utcnow) si falta"""
+    value = doc.get(field)
+    return value if value is not None else datetime.utcnow()
+
+
+def lat_lng(point: dict) -> dict:
+    """GeoJSON ({"coordinates": [lng, lat]}) -> {"lat", "lng"}"""
+    coordinates = point["coordinates"]
+    return {"lat": coordinates[1], "lng": coordinates[0]}
+
+
+# ============================================
+# EVENTOS
+# ============================================
+
+def event_summary(doc: dict) -> dict:
+    """Documento de evento -> EventSummary"""
+    return {
+        "_id": str(doc["_id"]),
+        "title": doc["title"],
+        "description": doc["description"],
+        "date": doc["date"],
+        "time": doc["time"],
+        "location": doc["location"],
+        "coordinates": lat_lng(doc["coordinates"]),
+        "category": doc["category"],
+        "image_url": image_url(doc.get("image_id")),
+        "image_placeholder": image_placeholder(doc.get("image_id")),
+    }
+
+
+def _testimonial(item: dict) -> dict:
+    user_id = item.get("user_id")
+    return {
+        "user_id": str(user_id) if user_id else None,
+        "name": item["name"],
+        "comment": item["comment"],
+        "rating": item["rating"],
+        "created_at": timestamp(item, "created_at"),
+    }
+
+
+def event_detail(doc: dict) -> dict:
+    """Documento de evento -> EventResponse"""
+    return {
+        "_id": str(doc["_id"]),
+        "title": doc["title"],
+        "description": doc["description"],
+        "long_description": doc.get("long_description"),
+        "date": doc["date"],
+        "time": doc["time"],
+        "end_time": doc.get("end_time"),
+        "location": doc["location"],
+        "address": doc.get("address"),
+        "coordinates": lat_lng(doc["coordinates"]),
+        "category": doc["category"],
+        "image_url": image_url(doc.get("image_id")),
+        "gallery": [f"{IMAGE_URL_PREFIX}{img_id}" for img_id in doc.get("gallery", ())],
+        "itinerary": [
+            {"time": item["time"], "activity": item["activity"]}
+            for item in doc.get("itinerary", ())
+        ],
+        "closed_streets": doc.get("closed_streets", []),
+        "testimonials": [_testimonial(item) for item in doc.get("testimonials", ())],
+        "created_at": timestamp(doc, "created_at"),
+        "updated_at": timestamp(doc, "updated_at"),
+    }
+
+
+# ============================================
+# ALERTAS Y RUTAS
+# ============================================
+
+def alert(doc: dict) -> dict:
+    """Documento de alerta -> AlertResponse"""
+    return {
+        "_id": str(doc["_id"]),
+        "title": doc["title"],
+        "description": doc["description"],
+        "type": doc["type"],
+        "location": doc["location"],
+        "coordinates": lat_lng(doc["coordinates"]),
+        "start_date": doc["start_date"],
+        "end_date": doc["end_date"],
+        "image_url": image_url(doc.get("image_id")),
+        "image_placeholder": image_placeholder(doc.get("image_id")),
+        "is_active": doc.get("is_active", True),
+        "created_at": timestamp(doc, "created_at"),
+    }
+
+
+def route(doc: dict) -> dict:
+    """Documento de ruta -> RouteResponse"""
+    return {
+        "_id": str(doc["_id"]),
+        "name": doc["name"],
+        "description": doc["description"],
+        "category": doc["category"],
+        "duration": doc["duration"],
+        "distance": doc["distance"],
+        "difficulty": doc["difficulty"],
+        "image_url": image_url(doc.get("image_id")),
+        "image_placeholder": image_placeholder(doc.get("image_id")),
+        "events": [str(event_id) for event_id in doc.get("events", ())],
+        "stops": [
+            {"name": stop["name"], "coordinates": lat_lng(stop["coordinates"])}
+            for stop in doc.get("stops", ())
+        ],
+        "created_at": timestamp(doc, "created_at"),
+    }
+
+
+# ============================================
+# USUARIOS Y AGENDA
+# ============================================
+
+def user(doc: dict) -> dict:
+    """Documento de usuario -> UserResponse (sin password ni tokens)"""
+    return {
+        "_id": str(doc["_id"]),
+        "name": doc["name"],
+        "email": doc["email"],
+        "phone": doc.get("phone"),
+        "age": doc.get("age"),
+        "gender": doc.get("gender"),
+        "city": doc.get("city", "Cuenca"),
+        "member_since": timestamp(doc, "member_since"),
+        "preferences": doc.get("preferences", []),
+        "role": doc.get("role", "user"),
+        "avatar_url": image_url(doc.get("avatar_id")),
+    }
+
+
+def agenda(doc: dict) -> dict:
+    """Documento de agenda -> AgendaResponse"""
+    return {
+        "_id": str(doc["_id"]),
+        "user_id": str(doc["user_id"]),
+        "attending": [str(e) for e in doc.get("attending", ())],
+        "interested": [str(e) for e in doc.get("interested", ())],
+        "not_going": [str(e) for e in doc.get("not_going", ())],
+        "created_routes": [str(r) for r in doc.get("created_routes", ())],
+        "completed_routes": [str(r) for r in doc.get("completed_routes", ())],
+    }
@@ -0,0 +1,159 @@
+"""
+Core Multipart - Lectura en streaming de multipart/form-data
+Recorre request.stream() con el parser incremental de python-multipart y
+entrega los bytes de los campos de archivo a medida que llegan, sin
+bufferizar el cuerpo completo (a diferencia de UploadFile / request.form()).
+"""
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartError(ValueError):
+    """Cuerpo multipart inválido, truncado o sin boundary"""
+
+
+class FilePart:
+    """Campo de archivo en curso de lectura"""
+
+    __slots__ = ("field_name", "filename", "content_type", "_reader")
+
+    def __init__(self, reader: "MultipartStream", field_name: str, filename: str, content_type: Optional[str]):
+        self._reader = reader
+        self.field_name = field_name
+        self.filename = filename
+        self.content_type = content_type  # Declarado por el cliente (no fiable)
+
+    def chunks(self) -> AsyncIterator[bytes]:
+        """Bytes del archivo tal como llegan por la red"""
+        return self._reader._part_chunks()
+
+
+class MultipartStream:
+    """
+    Iterador asíncrono de los campos de archivo de una petición multipart
+
+    Uso:
+        async for part in MultipartStream(request):
+            async for chunk in part.chunks():
+                ...
+
+    Los campos que no son archivos se ignoran. Cada parte debe consumirse
+    (o abandonarse) antes de pedir la siguiente.
+    """
+
+    def __init__(self, request: Request):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise MultipartError("Se esperaba multipart/form-data con boundary")
+
+        self._body = request.stream()
+        self._finished = False
+        # Estado del parser (rellenado por los callbacks)
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._in_file = False
+        self._events: Deque[tuple] = deque()
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    # ============================================
+    # CALLBACKS DEL PARSER (síncronos)
+    # ============================================
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_file = b"filename" in disposition
+        if self._in_file:
+            self._events.append((
+                "begin",
+                disposition.get(b"name", b"").decode("latin-1"),
+                disposition[b"filename"].decode("utf-8", "replace"),
+                self._headers.get(b"content-type", b"").decode("latin-1") or None,
+            ))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._events.append(("end",))
+        self._in_file = False
+
+    # ============================================
+    # LECTURA
+    # ============================================
+
+    async def _next_event(self) -> Optional[tuple]:
+        """Siguiente evento de archivo, leyendo de la red solo cuando hace falta"""
+        while not self._events:
+            if self._finished:
+                return None
+            try:
+                chunk = await self._body.__anext__()
+            except StopAsyncIteration:
+                self._finished = True
+                chunk = None
+            try:
+                if chunk is None:
+                    self._parser.finalize()
+                elif chunk:
+                    self._parser.write(chunk)
+            except MultipartParseError as e:
+                raise MultipartError(f"Cuerpo multipart inválido: {e}") from e
+        return self._events.popleft()
+
+    async def _part_chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            event = await self._next_event()
+            if event is None:
+                # El cuerpo terminó antes del boundary de cierre de la parte
+                raise MultipartError("Cuerpo multipart truncado")
+            if event[0] == "end":
+                return
+            if event[0] == "data":
+                yield event[1]
+            else:
+                # Empezó otra parte: devolverla para la siguiente iteración
+                self._events.appendleft(event)
+                return
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> FilePart:
+        while True:
+            event = await self._next_event()
+            if event is None:
+                raise StopAsyncIteration
+            if event[0] == "begin":
+                _, field_name, filename, content_type = event
+                return FilePart(self, field_name, filename, content_type)
+            # Restos de una parte anterior no consumida
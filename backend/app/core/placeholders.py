@@ -0,0 +1,85 @@
+"""
+Core Placeholders - Cache de placeholders de imágenes
+Cada imagen original guarda en metadata.placeholder un data URI diminuto
+(calculado al subirla o al migrarla). Los mappers lo incrustan junto a
+image_url leyendo de este cache en memoria, que se completa por lotes antes
+de serializar (una consulta $in por lote, nunca una por imagen).
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.database import get_database
+
+
+class PlaceholderCache:
+    """
+    id de imagen (str) -> placeholder
+
+    Los placeholders no cambian una vez calculados, así que se guardan hasta
+    max_entries (se descartan los más antiguos). Las imágenes sin
+    placeholder se recuerdan solo miss_ttl segundos: image_pipeline en otra
+    réplica o scripts/migrate_images.py pueden calcularlo después.
+    """
+
+    def __init__(self, max_entries: int, miss_ttl: float):
+        self.max_entries = max_entries
+        self.miss_ttl = miss_ttl
+        self._values: "OrderedDict[str, str]" = OrderedDict()
+        # id -> instante (monotonic) en que se vuelve a consultar
+        self._misses: Dict[str, float] = {}
+
+    def get(self, image_id) -> Optional[str]:
+        """Placeholder ya cargado de una imagen (None si no se conoce)"""
+        return self._values.get(str(image_id)) if image_id else None
+
+    def set(self, image_id, placeholder: Optional[str]):
+        """Registrar el placeholder de una imagen recién procesada"""
+        key = str(image_id)
+        if placeholder is None:
+            self._misses[key] = time.monotonic() + self.miss_ttl
+            return
+        self._misses.pop(key, None)
+        self._values[key] = placeholder
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_entries:
+            self._values.popitem(last=False)
+
+    def _known(self, key: str, now: float) -> bool:
+        if key in self._values:
+            return True
+        retry_at = self._misses.get(key)
+        return retry_at is not None and retry_at > now
+
+    async def ensure(self, image_ids: Iterable):
+        """Cargar en un único query los placeholders que aún no están en memoria"""
+        now = time.monotonic()
+        missing = set()
+        for image_id in image_ids:
+            if image_id and not self._known(str(image_id), now):
+                try:
+                    missing.add(ObjectId(image_id))
+                except Exception:
+                    continue
+        if not missing:
+            return
+
+        if len(self._misses) > self.max_entries:
+            self._misses = {key: retry_at for key, retry_at in self._misses.items() if retry_at > now}
+
+        cursor = get_database().fs.files.find(
+            {"_id": {"$in": list(missing)}},
+            {"metadata.placeholder": 1},
+        )
+        async for file_doc in cursor:
+            self.set(file_doc["_id"], (file_doc.get("metadata") or {}).get("placeholder"))
+            missing.discard(file_doc["_id"])
+        for image_id in missing:
+            self.set(image_id, None)
+
+
+# Instancia global del cache
+placeholders = PlaceholderCache(settings.PLACEHOLDER_CACHE_MAX_ENTRIES, settings.PLACEHOLDER_MISS_TTL_SECONDS)
@@ -0,0 +1,46 @@
+"""
+Core Responses - Clase de respuesta JSON rápida basada en orjson
+Serializa datetime, enums y ObjectId de forma nativa con orjson en vez del
+módulo json de la librería estándar.
+
+Ojo: si la ruta devuelve un objeto y declara response_model, FastAPI lo
+valida contra el modelo y pasa por jsonable_encoder antes de llegar aquí;
+solo se ahorra ese paso al devolver directamente una Response (como hacen
+los routers con app.core.mappers) o cuando la ruta no tiene response_model.
+"""
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    """Tipos que orjson no conoce: ObjectId y modelos pydantic"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serializar a JSON (bytes) con las mismas reglas que FastJSONResponse"""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON por defecto de la API
+
+    Uso:
+        app = FastAPI(default_response_class=FastJSONResponse)
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
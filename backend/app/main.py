@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
+from app.core.responses import FastJSONResponse
 from app.database import connect_to_mongodb, close_mongodb_connection
 
 
@@ -19,11 +20,34 @@ async def lifespan(app: FastAPI):
     
     await connect_to_mongodb()
     
+    from app.core.broadcast_transport import broadcast_transport
+    await broadcast_transport.start()
+    
+    from app.services.image_service import ensure_image_indexes
+    from app.services.image_pipeline import image_pipeline
+    from app.services.disk_cache import image_disk_cache
+    await ensure_image_indexes()
+    from app.services.blob_store import get_blob_store
+    await get_blob_store().ensure_ready()
+    image_pipeline.start(settings.IMAGE_PROCESS_WORKERS)
+    image_disk_cache.open()
+    
+    from app.services.event_catalog import event_catalog
+    from app.services.response_cache import alert_fragments, route_fragments
+    await event_catalog.load()
+    await alert_fragments.load()
+    await route_fragments.load()
+    
     print(f"🚀 {settings.PROJECT_NAME} v{settings.VERSION} iniciado")
     
     yield
     
     # Shutdown
+    from app.core.broadcast import agenda_broadcaster, alerts_broadcaster, events_broadcaster
+    for broadcaster in (alerts_broadcaster, events_broadcaster, agenda_broadcaster):
+        await broadcaster.disconnect_all()
+    await broadcast_transport.stop()
+    await image_pipeline.stop()
     await close_mongodb_connection()
     print("👋 Servidor detenido")
 
@@ -36,6 +60,7 @@ app = FastAPI(
     docs_url=f"{settings.API_V1_PREFIX}/docs",
     redoc_url=f"{settings.API_V1_PREFIX}/redoc",
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -75,7 +100,7 @@ async def api_health_check():
 
 
 # Importar y registrar routers
-from app.routers import auth, events, alerts, routes, users, agenda, images
+from app.routers import auth, events, alerts, routes, users, agenda, images, realtime
 
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX, tags=["Autenticación"])
 app.include_router(events.router, prefix=settings.API_V1_PREFIX, tags=["Eventos"])
@@ -84,6 +109,7 @@ app.include_router(routes.router, prefix=settings.API_V1_PREFIX, tags=["Rutas"])
 app.include_router(users.router, prefix=settings.API_V1_PREFIX, tags=["Usuarios"])
 app.include_router(agenda.router, prefix=settings.API_V1_PREFIX, tags=["Agenda"])
 app.include_router(images.router, prefix=settings.API_V1_PREFIX, tags=["Imágenes"])
+app.include_router(realtime.router, prefix=settings.API_V1_PREFIX, tags=["Tiempo real"])
 
 
 if __name__ == "__main__":
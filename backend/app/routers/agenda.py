@@ -1,10 +1,16 @@
 """
 Router de agenda personal - /agenda
 Gestión de la agenda del usuario
+Los response_model solo documentan (OpenAPI): las respuestas se arman con
+app.core.mappers y FastAPI no las vuelve a validar.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from beanie import PydanticObjectId
+from bson import ObjectId
 
+from app.core import mappers
+from app.core.broadcast import agenda_broadcaster
+from app.core.responses import FastJSONResponse
 from app.core.dependencies import get_current_user
 from app.models.user import User
 from app.models.agenda import Agenda
@@ -23,22 +29,35 @@ async def get_or_create_agenda(user_id: PydanticObjectId) -> Agenda:
     return agenda
 
 
+async def publish_agenda(agenda: Agenda) -> dict:
+    """Publicar la agenda actualizada (topic agenda:me de su usuario)"""
+    data = mappers.agenda(mappers.raw(agenda))
+    try:
+        await agenda_broadcaster.broadcast("update", data, key=data["user_id"])
+    except Exception as e:
+        print(f"Error broadcasting agenda: {e}")
+    return data
+
+
+async def ensure_event_exists(event_id: str):
+    """Verificar que el evento existe (sin cargar el documento)"""
+    exists = ObjectId.is_valid(event_id) and await Event.get_motor_collection().count_documents(
+        {"_id": ObjectId(event_id)}, limit=1
+    )
+    if not exists:
+        raise HTTPException(status_code=404, detail="Evento no encontrado")
+
+
 @router.get("/", response_model=AgendaResponse)
 async def get_user_agenda(user: User = Depends(get_current_user)):
     """
     Obtener agenda del usuario autenticado
     """
-    agenda = await get_or_create_agenda(user.id)
+    doc = await Agenda.get_motor_collection().find_one({"user_id": user.id})
+    if doc is None:
+        doc = mappers.raw(await get_or_create_agenda(user.id))
     
-    return AgendaResponse(
-        _id=str(agenda.id),
-        user_id=str(agenda.user_id),
-        attending=[str(e) for e in agenda.attending],
-        interested=[str(e) for e in agenda.interested],
-        not_going=[str(e) for e in agenda.not_going],
-        created_routes=[str(r) for r in agenda.created_routes],
-        completed_routes=[str(r) for r in agenda.completed_routes]
-    )
+    return FastJSONResponse(mappers.agenda(doc))
 
 
 @router.post("/attending/{event_id}", response_model=AgendaResponse)
@@ -50,13 +69,7 @@ async def mark_attending(
     Marcar asistencia a un evento
     """
     # Verificar que el evento existe
-    try:
-        event = await Event.get(event_id)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Evento no encontrado")
-    
-    if not event:
-        raise HTTPException(status_code=404, detail="Evento no encontrado")
+    await ensure_event_exists(event_id)
     
     agenda = await get_or_create_agenda(user.id)
     event_oid = PydanticObjectId(event_id)
@@ -73,15 +86,7 @@ async def mark_attending(
     
     await agenda.save()
     
-    return AgendaResponse(
-        _id=str(agenda.id),
-        user_id=str(agenda.user_id),
-        attending=[str(e) for e in agenda.attending],
-        interested=[str(e) for e in agenda.interested],
-        not_going=[str(e) for e in agenda.not_going],
-        created_routes=[str(r) for r in agenda.created_routes],
-        completed_routes=[str(r) for r in agenda.completed_routes]
-    )
+    return FastJSONResponse(await publish_agenda(agenda))
 
 
 @router.post("/interested/{event_id}", response_model=AgendaResponse)
@@ -92,13 +97,7 @@ async def mark_interested(
     """
     Marcar interés en un evento
     """
-    try:
-        event = await Event.get(event_id)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Evento no encontrado")
-    
-    if not event:
-        raise HTTPException(status_code=404, detail="Evento no encontrado")
+    await ensure_event_exists(event_id)
     
     agenda = await get_or_create_agenda(user.id)
     event_oid = PydanticObjectId(event_id)
@@ -115,15 +114,7 @@ async def mark_interested(
     
     await agenda.save()
     
-    return AgendaResponse(
-        _id=str(agenda.id),
-        user_id=str(agenda.user_id),
-        attending=[str(e) for e in agenda.attending],
-        interested=[str(e) for e in agenda.interested],
-        not_going=[str(e) for e in agenda.not_going],
-        created_routes=[str(r) for r in agenda.created_routes],
-        completed_routes=[str(r) for r in agenda.completed_routes]
-    )
+    return FastJSONResponse(await publish_agenda(agenda))
 
 
 @router.post("/not-going/{event_id}", response_model=AgendaResponse)
@@ -134,13 +125,7 @@ async def mark_not_going(
     """
     Marcar que no asistirá al evento
     """
-    try:
-        event = await Event.get(event_id)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Evento no encontrado")
-    
-    if not event:
-        raise HTTPException(status_code=404, detail="Evento no encontrado")
+    await ensure_event_exists(event_id)
     
     agenda = await get_or_create_agenda(user.id)
     event_oid = PydanticObjectId(event_id)
@@ -157,15 +142,7 @@ async def mark_not_going(
     
     await agenda.save()
     
-    return AgendaResponse(
-        _id=str(agenda.id),
-        user_id=str(agenda.user_id),
-        attending=[str(e) for e in agenda.attending],
-        interested=[str(e) for e in agenda.interested],
-        not_going=[str(e) for e in agenda.not_going],
-        created_routes=[str(r) for r in agenda.created_routes],
-        completed_routes=[str(r) for r in agenda.completed_routes]
-    )
+    return FastJSONResponse(await publish_agenda(agenda))
 
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -188,4 +165,5 @@ async def remove_from_agenda(
         agenda.not_going.remove(event_oid)
     
     await agenda.save()
+    await publish_agenda(agenda)
     return None
@@ -1,27 +1,44 @@
 """
 Router de alertas - /alerts
 CRUD para gestión de alertas de tránsito con soporte Real-time (SSE)
+Los response_model solo documentan (OpenAPI): las respuestas se arman con
+app.core.mappers y FastAPI no las vuelve a validar.
 """
-import json
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
 from beanie import PydanticObjectId
+from bson import ObjectId
 
 from app.core.dependencies import require_admin
-from app.core.broadcast import alerts_broadcaster
+from app.core.broadcast import SlowConsumerPolicy, alerts_broadcaster
+from app.core.geo_index import GeoRegion
+from app.core.fragments import json_fragment_response, json_list_response
+from app.core.placeholders import placeholders
 from app.models.user import User
 from app.models.alert import Alert, AlertType
 from app.models.event import GeoJSONPoint
 from app.schemas.alert import AlertCreate, AlertUpdate, AlertResponse
+from app.services.response_cache import alert_fragments
 
 router = APIRouter(prefix="/alerts")
 
 async def publish_alert_event(event_type: str, data: dict):
     """Publicar evento de alerta a todos los clientes conectados"""
     try:
-        await alerts_broadcaster.broadcast(event_type, data)
+        await alerts_broadcaster.broadcast(event_type, data, key=data.get("_id"))
+    except Exception as e:
+        print(f"Error broadcasting event: {e}")
+
+def alert_point(alert: Alert) -> tuple:
+    """Coordenadas (lat, lng) de la alerta, para los clientes con región"""
+    return (alert.coordinates.lat, alert.coordinates.lng)
+
+async def publish_alert_fragment(event_type: str, alert_id: str, fragment: bytes, points: List[tuple]):
+    """Publicar una alerta usando su fragmento JSON cacheado (sin re-serializar)"""
+    try:
+        await alerts_broadcaster.broadcast_json(event_type, fragment, key=alert_id, points=points)
     except Exception as e:
         print(f"Error broadcasting event: {e}")
 
@@ -30,20 +47,83 @@ async def publish_alert_event(event_type: str, data: dict):
 # ============================================
 
 @router.get("/stream")
-async def stream_alerts():
+async def stream_alerts(
+    request: Request,
+    policy: Optional[SlowConsumerPolicy] = Query(
+        None, description="Si el cliente se atrasa: drop_oldest | coalesce | disconnect"
+    ),
+    last_event_id: Optional[str] = Query(
+        None, description="Último id recibido (si el cliente no puede enviar Last-Event-ID)"
+    ),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitud del centro de la región"),
+    lng: Optional[float] = Query(None, ge=-180, le=180, description="Longitud del centro de la región"),
+    radius: Optional[int] = Query(None, ge=100, le=50000, description="Radio de la región en metros"),
+    bbox: Optional[str] = Query(None, description="Región rectangular: min_lng,min_lat,max_lng,max_lat")
+):
     """
     Endpoint SSE (Server-Sent Events) para recibir alertas en tiempo real.
     El cliente debe conectarse usando EventSource.
+    
+    Si el cliente no consume al ritmo de los mensajes se aplica `policy`;
+    con "disconnect" (o "coalesce" sin nada que fusionar) recibe un último
+    mensaje {"type": "disconnected"} y debe recargar /alerts/.
+    
+    Al reconectar con Last-Event-ID (cabecera o ?last_event_id=) se reenvían
+    los mensajes perdidos; si ya no están en el buffer llega {"type": "reset"}
+    y el cliente debe recargar /alerts/.
+    
+    Con lat/lng/radius o bbox solo llegan las alertas creadas o modificadas
+    dentro de la región (una alerta que sale de ella llega una última vez);
+    los borrados llegan siempre.
     """
+    circle = (lat, lng, radius)
+    if any(value is not None for value in circle) and None in circle:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Se deben enviar lat, lng y radius juntos"
+        )
+    if bbox is not None and lat is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usar lat/lng/radius o bbox, no ambos"
+        )
+    
+    region = None
+    if lat is not None:
+        region = GeoRegion.circle(lat, lng, radius)
+    elif bbox is not None:
+        try:
+            region = GeoRegion.parse_bbox(bbox)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="bbox inválido (formato: min_lng,min_lat,max_lng,max_lat)"
+            )
+    
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    try:
+        resume_id = int(resume_from) if resume_from else None
+    except ValueError:
+        resume_id = None
+    
     return StreamingResponse(
-        alerts_broadcaster.subscribe(),
+        alerts_broadcaster.subscribe(policy, resume_id, region),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # nginx: no bufferizar el stream
         }
     )
 
+@router.get("/stream/stats")
+async def stream_stats(admin: User = Depends(require_admin)):
+    """
+    Estado del stream SSE (solo administradores): clientes conectados,
+    mensajes repartidos y latencia del reparto en microsegundos
+    """
+    return alerts_broadcaster.get_stats()
+
 @router.get("/", response_model=List[AlertResponse])
 async def get_alerts(
     active_only: bool = Query(True, description="Solo alertas activas"),
@@ -52,38 +132,17 @@ async def get_alerts(
     """
     Listar alertas activas
     """
-    query = {}
-    
-    if active_only:
-        now = datetime.utcnow()
-        query["is_active"] = True
-        query["start_date"] = {"$lte": now}
-        query["end_date"] = {"$gte": now}
-    
-    if alert_type:
-        query["type"] = alert_type
-    
-    if query:
-        alerts = await Alert.find(query).sort("-created_at").to_list()
-    else:
-        alerts = await Alert.find_all().sort("-created_at").to_list()
-    
-    return [
-        AlertResponse(
-            _id=str(alert.id),
-            title=alert.title,
-            description=alert.description,
-            type=alert.type,
-            location=alert.location,
-            coordinates={"lat": alert.coordinates.lat, "lng": alert.coordinates.lng},
-            start_date=alert.start_date,
-            end_date=alert.end_date,
-            image_url=f"/api/v1/images/{alert.image_id}" if alert.image_id else None,
-            is_active=alert.is_active,
-            created_at=alert.created_at
-        )
-        for alert in alerts
-    ]
+    await alert_fragments.ensure_loaded()
+    now = datetime.utcnow()
+    
+    def matches(doc: dict) -> bool:
+        if active_only and not (
+            doc.get("is_active", True) and doc["start_date"] <= now <= doc["end_date"]
+        ):
+            return False
+        return alert_type is None or doc["type"] == alert_type
+    
+    return json_list_response(alert_fragments.select(matches))
 
 
 @router.get("/{alert_id}", response_model=AlertResponse)
@@ -91,27 +150,21 @@ async def get_alert(alert_id: str):
     """
     Obtener detalle de una alerta
     """
-    try:
-        alert = await Alert.get(alert_id)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Alerta no encontrada")
+    await alert_fragments.ensure_loaded()
+    fragment = alert_fragments.get(alert_id)
+    if fragment is not None:
+        return json_fragment_response(fragment)
     
-    if not alert:
+    # Puede haberse creado en otra réplica después de cargar el cache
+    doc = None
+    if ObjectId.is_valid(alert_id):
+        doc = await Alert.get_motor_collection().find_one({"_id": ObjectId(alert_id)})
+    
+    if not doc:
         raise HTTPException(status_code=404, detail="Alerta no encontrada")
     
-    return AlertResponse(
-        _id=str(alert.id),
-        title=alert.title,
-        description=alert.description,
-        type=alert.type,
-        location=alert.location,
-        coordinates={"lat": alert.coordinates.lat, "lng": alert.coordinates.lng},
-        start_date=alert.start_date,
-        end_date=alert.end_date,
-        image_url=f"/api/v1/images/{alert.image_id}" if alert.image_id else None,
-        is_active=alert.is_active,
-        created_at=alert.created_at
-    )
+    await placeholders.ensure([doc.get("image_id")])
+    return json_fragment_response(alert_fragments.put(doc))
 
 
 # ============================================
@@ -144,25 +197,13 @@ async def create_alert(
     )
     
     await alert.insert()
-    
-    response_data = AlertResponse(
-        _id=str(alert.id),
-        title=alert.title,
-        description=alert.description,
-        type=alert.type,
-        location=alert.location,
-        coordinates={"lat": alert.coordinates.lat, "lng": alert.coordinates.lng},
-        start_date=alert.start_date,
-        end_date=alert.end_date,
-        image_url=f"/api/v1/images/{alert.image_id}" if alert.image_id else None,
-        is_active=alert.is_active,
-        created_at=alert.created_at
-    )
+    await placeholders.ensure([alert.image_id])
+    fragment = alert_fragments.put_document(alert)
 
     # Publish Real-time Event
-    await publish_alert_event("create", json.loads(response_data.model_dump_json()))
+    await publish_alert_fragment("create", str(alert.id), fragment, [alert_point(alert)])
 
-    return response_data
+    return json_fragment_response(fragment, status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{alert_id}", response_model=AlertResponse)
@@ -193,27 +234,18 @@ async def update_alert(
     if "image_id" in update_data and update_data["image_id"]:
         update_data["image_id"] = PydanticObjectId(update_data["image_id"])
     
+    previous_point = alert_point(alert)
     await alert.update({"$set": update_data})
     alert = await Alert.get(alert_id)
-    
-    response_data = AlertResponse(
-        _id=str(alert.id),
-        title=alert.title,
-        description=alert.description,
-        type=alert.type,
-        location=alert.location,
-        coordinates={"lat": alert.coordinates.lat, "lng": alert.coordinates.lng},
-        start_date=alert.start_date,
-        end_date=alert.end_date,
-        image_url=f"/api/v1/images/{alert.image_id}" if alert.image_id else None,
-        is_active=alert.is_active,
-        created_at=alert.created_at
-    )
+    await placeholders.ensure([alert.image_id])
+    fragment = alert_fragments.put_document(alert)
     
     # Publish Real-time Event
-    await publish_alert_event("update", json.loads(response_data.model_dump_json()))
+    # También a la posición anterior: quien la veía se entera de que se movió
+    points = list({previous_point, alert_point(alert)})
+    await publish_alert_fragment("update", str(alert.id), fragment, points)
 
-    return response_data
+    return json_fragment_response(fragment)
 
 
 @router.delete("/{alert_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -233,8 +265,9 @@ async def delete_alert(
         raise HTTPException(status_code=404, detail="Alerta no encontrada")
     
     await alert.delete()
+    alert_fragments.remove(alert_id)
 
-    # Publish Real-time Event
+    # Publish Real-time Event (sin coordenadas: llega a todas las regiones)
     await publish_alert_event("delete", {"_id": alert_id})
 
     return None
@@ -2,10 +2,14 @@
 Router de autenticación - /auth
 Endpoints para registro, login, refresh token y logout
 Refactorizado para usar AuthService
+Los response_model solo documentan (OpenAPI): las respuestas se arman con
+app.core.mappers y FastAPI no las vuelve a validar.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from app.core.ratelimit import limiter
+from app.core import mappers
+from app.core.responses import FastJSONResponse
 
 from app.core.security import verify_token, create_access_token, create_refresh_token
 from app.core.dependencies import get_current_user
@@ -25,17 +29,9 @@ async def register(request: Request, user_data: UserCreate):
     """
     user = await auth_service.register_user(user_data)
     
-    return UserResponse(
-        _id=str(user.id),
-        name=user.name,
-        email=user.email,
-        phone=user.phone,
-        age=user.age,
-        gender=user.gender,
-        city=user.city,
-        member_since=user.member_since,
-        preferences=user.preferences,
-        role=user.role
+    return FastJSONResponse(
+        mappers.user(mappers.raw(user)),
+        status_code=status.HTTP_201_CREATED
     )
 
 
@@ -2,12 +2,14 @@
 Router de eventos - /events
 CRUD completo para gestión de eventos culturales
 Refactorizado para usar Clean Architecture (EventService)
+Los response_model solo documentan (OpenAPI): las respuestas se arman con
+app.core.mappers y FastAPI no las vuelve a validar.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime, date
 
-from app.core.dependencies import get_current_user_optional, require_admin
+from app.core.dependencies import get_current_user, get_current_user_optional, require_admin
 # from app.core.cache import invalidate_events_cache # Ya no es necesario aquí, lo maneja el servicio si quisiera, o lo dejamos aquí pero llamando al servicio
 # Nota: La invalidación de caché la hacía el router antes. De momento la dejamos fuera o la agregamos al servicio.
 # En la implementación anterior del Router, se llamaba a invalidate_events_cache() después de create/update/delete.
@@ -15,15 +17,40 @@ from app.core.dependencies import get_current_user_optional, require_admin
 # Por simplicidad y para no romper nada, agregaremos la invalidación aquí o en el servicio.
 # En mi implementación de EventService NO incluí caché invalidation. Debería agregarlo.
 from app.core.cache import invalidate_events_cache 
+from app.core import mappers
+from app.core.broadcast import events_broadcaster
+from app.core.fragments import json_list_response
+from app.core.placeholders import placeholders
+from app.core.responses import FastJSONResponse
 
 from app.models.user import User
 from app.models.event import Event, EventCategory
 from app.schemas.event import EventCreate, EventUpdate, EventResponse, EventSummary
 from app.services.event_service import event_service
+from app.services.event_catalog import event_catalog
+from app.services.feed_service import feed_service
 
 router = APIRouter(prefix="/events")
 
 
+def changed_fields(before: dict, after: dict) -> dict:
+    """Campos de la respuesta de detalle que cambiaron (valor nuevo)"""
+    return {field: value for field, value in after.items() if before.get(field) != value}
+
+
+async def publish_event_change(event_type: str, event_id: str, data: dict):
+    """
+    Publicar un cambio de evento (topics events y event:<id>)
+
+    create -> detalle completo; update -> {"_id", "changes": campos cambiados};
+    delete -> {"_id"}
+    """
+    try:
+        await events_broadcaster.broadcast(event_type, data, key=event_id)
+    except Exception as e:
+        print(f"Error broadcasting event: {e}")
+
+
 # ============================================
 # ENDPOINTS PÚBLICOS
 # ============================================
@@ -36,29 +63,15 @@ async def get_events(
     upcoming: bool = Query(False, description="Solo eventos futuros"),
     user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Listar eventos con filtros opcionales"""
-    events = await event_service.get_multi(
+    """Listar eventos con filtros opcionales (servido desde el catálogo en memoria)"""
+    await event_catalog.ensure_loaded()
+    fragments = event_catalog.get_multi(
         skip=skip,
         limit=limit,
         category=category,
         upcoming=upcoming
     )
-    
-    # Transformar a respuesta (Manual mapping por diferencia de estructuras GeoJSON vs LatLng)
-    return [
-        EventSummary(
-            _id=str(event.id),
-            title=event.title,
-            description=event.description,
-            date=event.date,
-            time=event.time,
-            location=event.location,
-            coordinates={"lat": event.coordinates.lat, "lng": event.coordinates.lng},
-            category=event.category,
-            image_url=f"/api/v1/images/{event.image_id}" if event.image_id else None
-        )
-        for event in events
-    ]
+    return json_list_response(fragments)
 
 
 @router.get("/upcoming", response_model=List[EventSummary])
@@ -66,43 +79,15 @@ async def get_upcoming_events(
     limit: int = Query(10, ge=1, le=50, description="Límite de eventos")
 ):
     """Obtener próximos eventos ordenados por fecha"""
-    events = await event_service.get_upcoming(limit=limit)
-    
-    return [
-        EventSummary(
-            _id=str(event.id),
-            title=event.title,
-            description=event.description,
-            date=event.date,
-            time=event.time,
-            location=event.location,
-            coordinates={"lat": event.coordinates.lat, "lng": event.coordinates.lng},
-            category=event.category,
-            image_url=f"/api/v1/images/{event.image_id}" if event.image_id else None
-        )
-        for event in events
-    ]
+    await event_catalog.ensure_loaded()
+    return json_list_response(event_catalog.get_upcoming(limit=limit))
 
 
 @router.get("/date/{event_date}", response_model=List[EventSummary])
 async def get_events_by_date(event_date: date):
     """Obtener eventos de una fecha específica"""
-    events = await event_service.get_by_date(event_date)
-    
-    return [
-        EventSummary(
-            _id=str(event.id),
-            title=event.title,
-            description=event.description,
-            date=event.date,
-            time=event.time,
-            location=event.location,
-            coordinates={"lat": event.coordinates.lat, "lng": event.coordinates.lng},
-            category=event.category,
-            image_url=f"/api/v1/images/{event.image_id}" if event.image_id else None
-        )
-        for event in events
-    ]
+    await event_catalog.ensure_loaded()
+    return json_list_response(event_catalog.get_by_date(event_date))
 
 
 @router.get("/nearby", response_model=List[EventSummary])
@@ -113,57 +98,46 @@ async def get_nearby_events(
     limit: int = Query(10, ge=1, le=50)
 ):
     """Obtener eventos cercanos a una ubicación"""
-    events = await event_service.get_nearby(lat=lat, lng=lng, max_distance=max_distance, limit=limit)
+    docs = await event_service.get_nearby(lat=lat, lng=lng, max_distance=max_distance, limit=limit)
+    await placeholders.ensure(doc.get("image_id") for doc in docs)
+    return FastJSONResponse([mappers.event_summary(doc) for doc in docs])
+
+
+@router.get("/feed", response_model=List[EventSummary])
+async def get_event_feed(
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitud del usuario"),
+    lng: Optional[float] = Query(None, ge=-180, le=180, description="Longitud del usuario"),
+    limit: int = Query(20, ge=1, le=100, description="Límite de eventos"),
+    user: User = Depends(get_current_user)
+):
+    """
+    Feed "para ti": próximos eventos ordenados por relevancia para el usuario
     
-    # Nota: get_nearby devuelve objetos Event completos, no agregaciones crudas
-    # (Beanie maneja el mapeo)
-    return [
-        EventSummary(
-            _id=str(event.id),
-            title=event.title,
-            description=event.description,
-            date=event.date,
-            time=event.time,
-            location=event.location,
-            coordinates={"lat": event.coordinates.lat, "lng": event.coordinates.lng},
-            category=event.category,
-            image_url=f"/api/v1/images/{event.image_id}" if event.image_id else None
+    El score combina preferencias de categoría, distancia (si se envía lat/lng),
+    cercanía en el tiempo y popularidad en agendas.
+    """
+    if (lat is None) != (lng is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Se deben enviar lat y lng juntos"
         )
-        for event in events
-    ]
+    
+    docs = await feed_service.get_feed(user.preferences, lat=lat, lng=lng, limit=limit)
+    return FastJSONResponse([mappers.event_summary(doc) for doc in docs])
 
 
 @router.get("/{event_id}", response_model=EventResponse)
 async def get_event(event_id: str):
     """Obtener detalle de un evento por ID"""
-    event = await event_service.get(event_id)
+    doc = await event_service.get_raw(event_id)
     
-    if not event:
+    if not doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Evento no encontrado"
         )
     
-    return EventResponse(
-        _id=str(event.id),
-        title=event.title,
-        description=event.description,
-        long_description=event.long_description,
-        date=event.date,
-        time=event.time,
-        end_time=event.end_time,
-        location=event.location,
-        address=event.address,
-        coordinates={"lat": event.coordinates.lat, "lng": event.coordinates.lng},
-        category=event.category,
-        image_url=f"/api/v1/images/{event.image_id}" if event.image_id else None,
-        gallery=[f"/api/v1/images/{img_id}" for img_id in event.gallery],
-        itinerary=event.itinerary,
-        closed_streets=event.closed_streets,
-        testimonials=event.testimonials,
-        created_at=event.created_at,
-        updated_at=event.updated_at
-    )
+    return FastJSONResponse(mappers.event_detail(doc))
 
 
 # ============================================
@@ -180,27 +154,13 @@ async def create_event(
     
     # Invalidar caché
     await invalidate_events_cache()
+    await placeholders.ensure([event.image_id])
+    event_catalog.upsert_event(event)
     
-    return EventResponse(
-        _id=str(event.id),
-        title=event.title,
-        description=event.description,
-        long_description=event.long_description,
-        date=event.date,
-        time=event.time,
-        end_time=event.end_time,
-        location=event.location,
-        address=event.address,
-        coordinates={"lat": event.coordinates.lat, "lng": event.coordinates.lng},
-        category=event.category,
-        image_url=f"/api/v1/images/{event.image_id}" if event.image_id else None,
-        gallery=[f"/api/v1/images/{img_id}" for img_id in event.gallery],
-        itinerary=event.itinerary,
-        closed_streets=event.closed_streets,
-        testimonials=[],
-        created_at=event.created_at,
-        updated_at=event.updated_at
-    )
+    detail = mappers.event_detail(mappers.raw(event))
+    await publish_event_change("create", detail["_id"], detail)
+    
+    return FastJSONResponse(detail, status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{event_id}", response_model=EventResponse)
@@ -217,31 +177,20 @@ async def update_event(
             detail="Evento no encontrado"
         )
     
+    before = mappers.event_detail(mappers.raw(event))
     event = await event_service.update(event, event_data)
     
     # Invalidar caché
     await invalidate_events_cache()
+    await placeholders.ensure([event.image_id])
+    event_catalog.upsert_event(event)
     
-    return EventResponse(
-        _id=str(event.id),
-        title=event.title,
-        description=event.description,
-        long_description=event.long_description,
-        date=event.date,
-        time=event.time,
-        end_time=event.end_time,
-        location=event.location,
-        address=event.address,
-        coordinates={"lat": event.coordinates.lat, "lng": event.coordinates.lng},
-        category=event.category,
-        image_url=f"/api/v1/images/{event.image_id}" if event.image_id else None,
-        gallery=[f"/api/v1/images/{img_id}" for img_id in event.gallery],
-        itinerary=event.itinerary,
-        closed_streets=event.closed_streets,
-        testimonials=event.testimonials,
-        created_at=event.created_at,
-        updated_at=event.updated_at
-    )
+    detail = mappers.event_detail(mappers.raw(event))
+    changes = changed_fields(before, detail)
+    if changes:
+        await publish_event_change("update", event_id, {"_id": event_id, "changes": changes})
+    
+    return FastJSONResponse(detail)
 
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -259,5 +208,7 @@ async def delete_event(
     
     # Invalidar caché
     await invalidate_events_cache()
+    event_catalog.remove(event_id)
+    await publish_event_change("delete", event_id, {"_id": event_id})
     
     return None
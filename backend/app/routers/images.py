@@ -1,108 +1,455 @@
 """
 Router de imágenes - /images
-Subida y obtención de imágenes con GridFS
+Subida y obtención de imágenes (metadatos en fs.files, bytes en el BlobStore)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import StreamingResponse
-from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from beanie import PydanticObjectId
 from bson import ObjectId
-import io
+from typing import AsyncIterator, List, Optional
+
+from app.config import settings
 
+from app.core.cache import invalidate_events_cache
 from app.core.dependencies import require_admin
+from app.core.multipart import FilePart, MultipartError, MultipartStream
 from app.models.user import User
-from app.database import get_database
+from app.services.disk_cache import image_disk_cache
+from app.services.event_service import event_service
+from app.services.image_manifest import image_manifest_service
+from app.services.image_pipeline import image_pipeline
+from app.services.image_processing import MODERN_FORMATS, ImageFit, ImageFormat, ImageTooLarge, InvalidImage
+from app.services.image_service import (
+    RangeNotSatisfiable,
+    UnsupportedImageType,
+    UploadTooLarge,
+    cached_not_modified,
+    find_file,
+    get_or_create_variant,
+    is_not_modified,
+    is_not_modified_by,
+    iter_file,
+    negotiate_variant,
+    negotiation_complete,
+    parse_range,
+    release_image,
+    representation_key,
+    store_upload,
+    validator_headers,
+)
 
 router = APIRouter(prefix="/images")
 
 
-def get_gridfs_bucket():
-    """Obtener bucket de GridFS"""
-    db = get_database()
-    return AsyncIOMotorGridFSBucket(db)
+# Margen para boundary y cabeceras de la parte en la comprobación de Content-Length
+MULTIPART_OVERHEAD = 16 * 1024
+
+ALLOWED_TYPES = ["image/jpeg", "image/png", "image/webp", "image/gif"]
+
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+BATCH_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}}
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+def _too_large() -> HTTPException:
+    max_mb = settings.IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"El archivo es muy grande. Máximo {max_mb}MB"
+    )
+
+
+def _check_content_length(request: Request, max_bytes: int):
+    """Rechazar antes de leer el cuerpo si el Content-Length ya supera el máximo"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise _too_large()
+
+
+async def _store(chunks: AsyncIterator[bytes], filename: str, admin: User) -> dict:
+    """Guardar un archivo traduciendo los errores a HTTP"""
+    try:
+        return await store_upload(chunks, filename, str(admin.id), settings.IMAGE_MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        raise _too_large()
+    except UnsupportedImageType:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de archivo no permitido. Permitidos: {ALLOWED_TYPES}"
+        )
+
+
+def _publish(stored: dict):
+    """Encolar los derivados (y el placeholder) de una imagen nueva"""
+    if not stored["deduplicated"]:
+        # Derivados estándar (thumbnail, card, hero) en segundo plano
+        image_pipeline.enqueue(stored["_id"])
+
+
+def _image_response(stored: dict) -> dict:
+    return {
+        "id": str(stored["_id"]),
+        "filename": stored["filename"],
+        "content_type": stored["content_type"],
+        "size": stored["length"],
+        "placeholder": stored["placeholder"],
+        "deduplicated": stored["deduplicated"],
+        "url": f"/api/v1/images/{stored['_id']}"
+    }
 
 
-@router.post("/upload")
+async def store_part(part: FilePart, admin: User) -> dict:
+    """Guardar un campo de archivo y devolver su respuesta"""
+    stored = await _store(part.chunks(), part.filename, admin)
+    _publish(stored)
+    return _image_response(stored)
+
+
+@router.post("/upload", openapi_extra=UPLOAD_OPENAPI)
 async def upload_image(
-    file: UploadFile = File(...),
+    request: Request,
     admin: User = Depends(require_admin)
 ):
     """
-    Subir imagen a GridFS (solo admin)
+    Subir imagen (solo admin)
+    
+    - El cuerpo multipart se lee en streaming y se escribe en el BlobStore
+      chunk a chunk; la subida se corta (y se borra lo escrito) al superar el máximo
+    - El tipo se valida por magic bytes, no por el Content-Type del cliente
     
     Retorna el ID de la imagen guardada
     """
-    # Validar tipo de archivo
-    allowed_types = ["image/jpeg", "image/png", "image/webp", "image/gif"]
-    if file.content_type not in allowed_types:
+    _check_content_length(request, settings.IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD)
+    
+    try:
+        async for part in MultipartStream(request):
+            if part.field_name == "file":
+                return await store_part(part, admin)
+    except MultipartError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Tipo de archivo no permitido. Permitidos: {allowed_types}"
+            detail="Se esperaba un formulario multipart con el campo 'file'"
         )
     
-    # Validar tamaño (max 5MB)
-    contents = await file.read()
-    if len(contents) > 5 * 1024 * 1024:
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Falta el campo 'file'"
+    )
+
+
+async def _buffer_part(part: FilePart) -> bytes:
+    """Leer un campo de archivo completo, cortando al superar el máximo"""
+    data = bytearray()
+    async for chunk in part.chunks():
+        data += chunk
+        if len(data) > settings.IMAGE_MAX_UPLOAD_BYTES:
+            raise _too_large()
+    return bytes(data)
+
+
+async def _single_chunk(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+async def _rollback(stored: List[dict]):
+    """Quitar la referencia de cada imagen ya guardada de un lote fallido"""
+    for item in stored:
+        await release_image(item["_id"])
+
+
+@router.post("/upload/batch", openapi_extra=BATCH_UPLOAD_OPENAPI)
+async def upload_images_batch(
+    request: Request,
+    event_id: Optional[str] = Query(None, description="Evento al que añadir las imágenes a la galería"),
+    admin: User = Depends(require_admin)
+):
+    """
+    Subir varias imágenes en una sola petición (solo admin)
+    
+    - Cada campo 'files' se lee de la red y se guarda en una tarea aparte:
+      se guardan hasta IMAGE_BATCH_CONCURRENCY a la vez mientras se siguen
+      leyendo los siguientes (memoria acotada a ese número de archivos)
+    - Todo o nada: si un archivo falla se deshacen los ya guardados
+    - Con event_id, los ids se añaden al final de la galería del evento en
+      una sola operación atómica
+    
+    Retorna las imágenes en el mismo orden en que se enviaron
+    """
+    if event_id is not None and not await event_service.get_raw(event_id):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El archivo es muy grande. Máximo 5MB"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evento no encontrado"
         )
     
-    # Guardar en GridFS
-    bucket = get_gridfs_bucket()
-    file_id = await bucket.upload_from_stream(
-        file.filename,
-        io.BytesIO(contents),
-        metadata={
-            "content_type": file.content_type,
-            "uploaded_by": str(admin.id)
-        }
-    )
+    max_files = settings.IMAGE_BATCH_MAX_FILES
+    _check_content_length(request, max_files * (settings.IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD))
+    
+    slots = asyncio.Semaphore(settings.IMAGE_BATCH_CONCURRENCY)
+    
+    async def store_buffered(data: bytes, filename: str) -> dict:
+        try:
+            return await _store(_single_chunk(data), filename, admin)
+        finally:
+            slots.release()
+    
+    tasks: List[asyncio.Task] = []
+    try:
+        async for part in MultipartStream(request):
+            if part.field_name != "files":
+                continue
+            # No seguir leyendo el cuerpo si ya falló algún archivo
+            for task in tasks:
+                if task.done() and task.exception() is not None:
+                    raise task.exception()
+            if len(tasks) >= max_files:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Demasiados archivos. Máximo {max_files} por petición"
+                )
+            # El hueco se ocupa antes de leer el archivo: como mucho hay
+            # IMAGE_BATCH_CONCURRENCY archivos en memoria o guardándose
+            await slots.acquire()
+            try:
+                data = await _buffer_part(part)
+            except BaseException:
+                slots.release()
+                raise
+            tasks.append(asyncio.create_task(store_buffered(data, part.filename)))
+        
+        if not tasks:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Falta el campo 'files'"
+            )
+        await asyncio.gather(*tasks)
+    except BaseException as exc:
+        # Se dejan terminar las que están en curso (como mucho
+        # IMAGE_BATCH_CONCURRENCY) para no dejar archivos a medio registrar
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        await _rollback([result for result in results if isinstance(result, dict)])
+        if isinstance(exc, MultipartError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Se esperaba un formulario multipart con el campo 'files'"
+            )
+        raise
+    
+    stored = [task.result() for task in tasks]
+    
+    if event_id is not None:
+        if not await event_service.append_gallery(event_id, [item["_id"] for item in stored]):
+            # El evento se borró mientras se subían las imágenes
+            await _rollback(stored)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Evento no encontrado"
+            )
+        # La galería no forma parte del resumen del catálogo: basta con la caché
+        await invalidate_events_cache()
+        image_manifest_service.invalidate()
+    
+    for item in stored:
+        _publish(item)
     
     return {
-        "id": str(file_id),
-        "filename": file.filename,
-        "content_type": file.content_type,
-        "size": len(contents),
-        "url": f"/api/v1/images/{file_id}"
+        "event_id": event_id,
+        "images": [_image_response(item) for item in stored],
+    }
+
+
+@router.get("/manifest")
+async def get_image_manifest(request: Request):
+    """
+    Manifiesto de imágenes para la precarga del service worker (público)
+    
+    - Imágenes de eventos próximos (portada y galería), alertas activas y rutas
+    - Por imagen: id, URL, tamaño, SHA-256, content type y URLs de los
+      derivados estándar ya generados
+    - `version` (y el ETag) solo cambia cuando cambia el contenido: el
+      service worker revalida con If-None-Match y, si hay versión nueva,
+      precarga solo las entradas cuyo hash no tenía
+    """
+    manifest = await image_manifest_service.get()
+    headers = {
+        "ETag": manifest.etag,
+        "Cache-Control": "public, max-age=0, must-revalidate",
     }
+    if is_not_modified_by(request.headers, manifest.etag, None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=manifest.body, media_type="application/json", headers=headers)
+
+
+def validate_variant_params(
+    file_doc: dict,
+    w: Optional[int],
+    h: Optional[int],
+    fmt: Optional[ImageFormat]
+):
+    """Validar tamaños y formato pedidos para una variante"""
+    allowed = settings.IMAGE_VARIANT_SIZES
+    for value in (w, h):
+        if value is not None and value not in allowed:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tamaño no permitido. Permitidos: {allowed}"
+            )
+    
+    if fmt == ImageFormat.AVIF and fmt not in MODERN_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato AVIF no disponible en este servidor"
+        )
+    
+    if (file_doc.get("metadata") or {}).get("variant_of"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Solo se pueden generar variantes de imágenes originales"
+        )
 
 
 @router.get("/{image_id}")
-async def get_image(image_id: str):
+async def get_image(
+    image_id: str,
+    request: Request,
+    w: Optional[int] = Query(None, description="Ancho de la variante"),
+    h: Optional[int] = Query(None, description="Alto de la variante"),
+    fit: Optional[ImageFit] = Query(None, description="Ajuste: cover | contain"),
+    fmt: Optional[ImageFormat] = Query(None, alias="format", description="Formato: jpeg | webp | png | avif")
+):
     """
     Obtener imagen por ID (público)
+    
+    - Con w / h / fit / format se sirve una variante redimensionada; se genera
+      en la primera petición y queda guardada para las siguientes
+    - Sin format, se elige por Accept la representación más pequeña entre
+      WebP / AVIF ya generados y el original (Vary: Accept)
+    - Se transmite por bloques desde su backend (memoria por descarga: un bloque)
+    - ETag / Last-Modified con respuestas 304 para If-None-Match / If-Modified-Since
+    - Range de un único intervalo con respuesta 206 (seek directo al chunk)
+    - Las respuestas completas quedan en el cache local en disco; los hits se
+      sirven con FileResponse (sendfile) sin consultar MongoDB
     """
     try:
         oid = ObjectId(image_id)
     except Exception:
         raise HTTPException(status_code=400, detail="ID de imagen inválido")
     
-    bucket = get_gridfs_bucket()
+    # Cache local: solo respuestas completas (los rangos van al backend)
+    accept = request.headers.get("accept")
+    cache_key = None
+    if "range" not in request.headers:
+        cache_key = representation_key(str(oid), w, h, fit, fmt, accept)
+        cached = image_disk_cache.get(cache_key)
+        if cached is not None:
+            if cached_not_modified(request.headers, cached.headers):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cached.headers)
+            return FileResponse(cached.path, media_type=cached.media_type, headers=cached.headers)
     
+    file_doc = await find_file(oid)
+    if not file_doc:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    original = file_doc
+    
+    headers = {
+        "Cache-Control": "public, max-age=31536000",  # 1 año
+        "Accept-Ranges": "bytes",
+    }
+    
+    is_variant = bool((file_doc.get("metadata") or {}).get("variant_of"))
+    if w is not None or h is not None or fit is not None or fmt is not None:
+        validate_variant_params(file_doc, w, h, fmt)
+    
+    cacheable = True
     try:
-        # Obtener stream de la imagen
-        grid_out = await bucket.open_download_stream(oid)
-        
-        # Leer contenido
-        contents = await grid_out.read()
-        
-        # Obtener content type de metadata
-        content_type = "image/jpeg"
-        if grid_out.metadata and "content_type" in grid_out.metadata:
-            content_type = grid_out.metadata["content_type"]
-        
-        return StreamingResponse(
-            io.BytesIO(contents),
-            media_type=content_type,
-            headers={
-                "Cache-Control": "public, max-age=31536000",  # 1 año
-                "Content-Disposition": f"inline; filename={grid_out.filename}"
-            }
+        if fmt is not None:
+            file_doc = await get_or_create_variant(file_doc, w, h, fit or ImageFit.CONTAIN, fmt)
+        elif not is_variant:
+            file_doc = await negotiate_variant(file_doc, accept, w, h, fit or ImageFit.CONTAIN)
+            headers["Vary"] = "Accept"
+            # Con derivados pendientes la elección puede mejorar: no fijarla
+            cacheable = negotiation_complete(original, accept, w, h, fit or ImageFit.CONTAIN)
+    except ImageTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"La imagen supera el máximo de {settings.IMAGE_MAX_PIXELS} píxeles para generar variantes"
         )
-        
-    except Exception:
-        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    except InvalidImage:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo no es una imagen procesable"
+        )
+    
+    headers.update(validator_headers(file_doc))
+    
+    if is_not_modified(request.headers, file_doc):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    length = file_doc["length"]
+    try:
+        byte_range = parse_range(request.headers, file_doc)
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{length}"}
+        )
+    
+    # Obtener content type de metadata
+    content_type = "image/jpeg"
+    metadata = file_doc.get("metadata") or {}
+    if "content_type" in metadata:
+        content_type = metadata["content_type"]
+    
+    headers["Content-Disposition"] = f"inline; filename={file_doc.get('filename')}"
+    if byte_range is None:
+        chunks = iter_file(file_doc)
+        if cache_key is not None and cacheable:
+            image_ref = (original.get("metadata") or {}).get("variant_of") or original["_id"]
+            chunks = image_disk_cache.tee(
+                cache_key, chunks, str(image_ref), content_type, dict(headers), length
+            )
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(chunks, media_type=content_type, headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    return StreamingResponse(
+        iter_file(file_doc, start=start, end=end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=content_type,
+        headers=headers
+    )
 
 
 @router.delete("/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -112,17 +459,20 @@ async def delete_image(
 ):
     """
     Eliminar imagen (solo admin)
+    
+    Resta una referencia; el archivo se borra cuando no quedan referencias
     """
     try:
         oid = ObjectId(image_id)
     except Exception:
         raise HTTPException(status_code=400, detail="ID de imagen inválido")
     
-    bucket = get_gridfs_bucket()
-    
-    try:
-        await bucket.delete(oid)
-    except Exception:
+    # Con deduplicación la imagen puede estar referenciada por otras subidas:
+    # solo se borra al quitar la última referencia
+    if await release_image(oid) is None:
         raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    # Cache en disco de este pod y de las demás réplicas
+    await image_disk_cache.announce_delete(str(oid))
+    image_manifest_service.invalidate()
     
     return None
@@ -0,0 +1,247 @@
+"""
+Router de tiempo real - /realtime
+Canal WebSocket que multiplexa varios topics en una sola conexión:
+
+    alerts       -> alertas (create / update / delete)
+    events       -> cambios de cualquier evento
+    event:<id>   -> cambios de un evento
+    agenda:me    -> agenda del usuario autenticado
+
+Mensajes del cliente:
+    {"action": "auth", "token": "<access token>"}
+    {"action": "subscribe", "topic": "event:<id>", "last_event_id": "123"}
+    {"action": "unsubscribe", "topic": "event:<id>"}
+
+Mensajes del servidor:
+    {"topic": "...", "id": "123", "message": {"type": "...", "data": {...}}}
+    {"error": "...", "topic": "..."}
+    {"type": "disconnected", "reason": "slow_consumer"}  (y se cierra)
+
+Cada topic es una suscripción a un broadcaster de app.core.broadcast
+(mismo reparto, replay y transporte entre réplicas que /alerts/stream).
+Todos los topics de la conexión comparten un buffer acotado: los errores
+se descartan si está lleno y suscribirse con él lleno desconecta por lento.
+El número de topics está limitado y demasiados mensajes inválidos cierran
+la conexión (1008).
+Los ids van como string (pueden superar el entero seguro de JavaScript).
+
+El token viaja en el mensaje "auth" y no en la URL (las URLs acaban en los
+logs del proxy). Se puede repetir con un token renovado del mismo usuario;
+un token inválido cierra con 1008 y, al caducar el último recibido, la
+conexión se cierra también con 1008 para que el cliente reconecte con uno
+nuevo (el replay recupera lo perdido).
+"""
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+
+from app.config import settings
+from app.core.broadcast import (
+    SLOW_CONSUMER_PAYLOAD,
+    EventBroadcaster,
+    SlowConsumerPolicy,
+    Subscriber,
+    TopicSubscription,
+    agenda_broadcaster,
+    alerts_broadcaster,
+    events_broadcaster,
+)
+from app.core.responses import dumps
+from app.core.security import verify_token
+from app.models.user import User
+
+router = APIRouter(prefix="/realtime")
+
+
+def resolve_topic(topic: str, user: Optional[User]) -> Tuple[EventBroadcaster, Optional[str]]:
+    """
+    Topic -> (broadcaster, filtro de clave)
+
+    Raises:
+        ValueError: Topic desconocido o no permitido (mensaje para el cliente)
+    """
+    if topic == "alerts":
+        return alerts_broadcaster, None
+    if topic == "events":
+        return events_broadcaster, None
+    if topic.startswith("event:"):
+        event_id = topic[len("event:"):]
+        if not ObjectId.is_valid(event_id):
+            raise ValueError("Id de evento inválido")
+        return events_broadcaster, event_id
+    if topic == "agenda:me":
+        if user is None:
+            raise ValueError("Se requiere autenticación")
+        return agenda_broadcaster, str(user.id)
+    raise ValueError("Topic desconocido")
+
+
+def parse_event_id(value) -> Optional[int]:
+    """last_event_id del cliente (string o número) -> int (None si no vale)"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def authenticate(token: str) -> Tuple[Optional[User], Optional[float]]:
+    """
+    Access token -> (usuario, expiración como timestamp)
+
+    Returns:
+        (None, None) si el token no vale o el usuario no existe
+    """
+    payload = verify_token(token, token_type="access")
+    if payload is None or payload.get("sub") is None:
+        return None, None
+    user = await User.get(payload["sub"])
+    if user is None:
+        return None, None
+    return user, payload.get("exp")
+
+
+def error_message(detail: str, topic: Optional[str] = None) -> str:
+    return dumps({"error": detail, "topic": topic}).decode()
+
+
+@router.websocket("/ws")
+async def realtime_socket(
+    websocket: WebSocket,
+    policy: Optional[SlowConsumerPolicy] = Query(
+        None, description="Si el cliente se atrasa: drop_oldest | coalesce | disconnect"
+    )
+):
+    """
+    WebSocket multiplexado de actualizaciones en tiempo real
+    """
+    await websocket.accept()
+    user: Optional[User] = None
+    expiry: Optional[asyncio.Task] = None
+
+    connection = Subscriber(
+        settings.WS_CONNECTION_BUFFER_SIZE,
+        policy or SlowConsumerPolicy(settings.SSE_SLOW_CONSUMER_POLICY),
+        farewell=SLOW_CONSUMER_PAYLOAD.decode(),
+    )
+    subscriptions: Dict[str, Tuple[EventBroadcaster, TopicSubscription]] = {}
+
+    async def send_frames():
+        async for frame in connection.frames():
+            await websocket.send_text(frame)
+        # Desconectado por lento: el cliente debe recargar el estado
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    async def expire(delay: float):
+        await asyncio.sleep(delay)
+        # Token caducado: el receive pendiente termina con WebSocketDisconnect
+        try:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expirado")
+        except RuntimeError:
+            pass
+
+    invalid_messages = 0
+    close_code: Optional[int] = None
+
+    def reject(detail: str, topic: Optional[str] = None) -> bool:
+        """
+        Avisar al cliente de un mensaje rechazado
+
+        Returns:
+            True si ya son demasiados y hay que cerrar la conexión
+        """
+        nonlocal invalid_messages
+        invalid_messages += 1
+        # Los errores no se saltan el límite del buffer: si está lleno se pierden
+        if not connection.full:
+            connection.enqueue(error_message(detail, topic))
+        return invalid_messages > settings.WS_MAX_INVALID_MESSAGES
+
+    sender = asyncio.create_task(send_frames())
+    try:
+        # Desconectado por lento: send_frames cierra el socket
+        while not connection.closed:
+            try:
+                message = await websocket.receive_json()
+                action = message["action"]
+                # "auth" lleva token; el resto, topic
+                argument = message["token" if action == "auth" else "topic"]
+                if not isinstance(argument, str):
+                    raise TypeError(argument)
+            except (ValueError, KeyError, TypeError):
+                if reject("Mensaje inválido"):
+                    close_code = status.WS_1008_POLICY_VIOLATION
+                    break
+                continue
+
+            if action == "auth":
+                authenticated, expires_at = await authenticate(argument)
+                # Un token de otro usuario no puede heredar sus suscripciones
+                if authenticated is None or (user is not None and authenticated.id != user.id):
+                    close_code = status.WS_1008_POLICY_VIOLATION
+                    break
+                user = authenticated
+                if expiry is not None:
+                    expiry.cancel()
+                    expiry = None
+                if expires_at is not None:
+                    expiry = asyncio.create_task(expire(max(expires_at - time.time(), 0)))
+                continue
+
+            topic = argument
+            if action == "subscribe":
+                if topic in subscriptions:
+                    continue
+                if len(subscriptions) >= settings.WS_MAX_TOPICS_PER_CONNECTION:
+                    if reject("Demasiados topics en la conexión", topic):
+                        close_code = status.WS_1008_POLICY_VIOLATION
+                        break
+                    continue
+                try:
+                    broadcaster, key_filter = resolve_topic(topic, user)
+                except ValueError as e:
+                    if reject(str(e), topic):
+                        close_code = status.WS_1008_POLICY_VIOLATION
+                        break
+                    continue
+                # El frame inicial y el replay no pasan por la política:
+                # con el buffer lleno el cliente no está leyendo
+                if connection.full:
+                    connection.disconnect()
+                    break
+                subscription = TopicSubscription(connection, topic, key_filter)
+                subscriptions[topic] = (broadcaster, subscription)
+                broadcaster.attach(subscription, parse_event_id(message.get("last_event_id")))
+            elif action == "unsubscribe":
+                entry = subscriptions.pop(topic, None)
+                if entry is not None:
+                    entry[0].detach(entry[1])
+            elif reject("Acción desconocida", topic):
+                close_code = status.WS_1008_POLICY_VIOLATION
+                break
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: el socket ya se cerró desde send_frames
+        pass
+    finally:
+        if expiry is not None:
+            expiry.cancel()
+        for broadcaster, subscription in subscriptions.values():
+            broadcaster.detach(subscription)
+        if connection.closed and close_code is None:
+            # Desconectado por lento: dejar que send_frames envíe el aviso
+            await asyncio.wait({sender}, timeout=5)
+        connection.close()
+        sender.cancel()
+        try:
+            await sender
+        except (asyncio.CancelledError, WebSocketDisconnect, RuntimeError):
+            pass
+        if close_code is not None:
+            try:
+                await websocket.close(code=close_code)
+            except RuntimeError:
+                pass
@@ -1,17 +1,23 @@
 """
 Router de rutas turísticas - /routes
 CRUD para gestión de rutas
+Los response_model solo documentan (OpenAPI): las respuestas se arman con
+app.core.mappers y FastAPI no las vuelve a validar.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
 from datetime import datetime
 from beanie import PydanticObjectId
+from bson import ObjectId
 
 from app.core.dependencies import require_admin
+from app.core.fragments import json_fragment_response, json_list_response
+from app.core.placeholders import placeholders
 from app.models.user import User
 from app.models.route import Route, RouteCategory, RouteDifficulty, RouteStop
 from app.models.event import GeoJSONPoint
 from app.schemas.route import RouteCreate, RouteUpdate, RouteResponse
+from app.services.response_cache import route_fragments
 
 router = APIRouter(prefix="/routes")
 
@@ -28,38 +34,14 @@ async def get_routes(
     """
     Listar rutas turísticas con filtros
     """
-    query = {}
-    
-    if category:
-        query["category"] = category
-    
-    if difficulty:
-        query["difficulty"] = difficulty
-    
-    if query:
-        routes = await Route.find(query).sort("-created_at").to_list()
-    else:
-        routes = await Route.find_all().sort("-created_at").to_list()
-    
-    return [
-        RouteResponse(
-            _id=str(route.id),
-            name=route.name,
-            description=route.description,
-            category=route.category,
-            duration=route.duration,
-            distance=route.distance,
-            difficulty=route.difficulty,
-            image_url=f"/api/v1/images/{route.image_id}" if route.image_id else None,
-            events=[str(e) for e in route.events],
-            stops=[
-                {"name": stop.name, "coordinates": {"lat": stop.coordinates.lat, "lng": stop.coordinates.lng}}
-                for stop in route.stops
-            ],
-            created_at=route.created_at
-        )
-        for route in routes
-    ]
+    await route_fragments.ensure_loaded()
+    
+    def matches(doc: dict) -> bool:
+        if category and doc["category"] != category:
+            return False
+        return not difficulty or doc["difficulty"] == difficulty
+    
+    return json_list_response(route_fragments.select(matches))
 
 
 @router.get("/{route_id}", response_model=RouteResponse)
@@ -67,30 +49,21 @@ async def get_route(route_id: str):
     """
     Obtener detalle de una ruta
     """
-    try:
-        route = await Route.get(route_id)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    await route_fragments.ensure_loaded()
+    fragment = route_fragments.get(route_id)
+    if fragment is not None:
+        return json_fragment_response(fragment)
     
-    if not route:
+    # Puede haberse creado en otra réplica después de cargar el cache
+    doc = None
+    if ObjectId.is_valid(route_id):
+        doc = await Route.get_motor_collection().find_one({"_id": ObjectId(route_id)})
+    
+    if not doc:
         raise HTTPException(status_code=404, detail="Ruta no encontrada")
     
-    return RouteResponse(
-        _id=str(route.id),
-        name=route.name,
-        description=route.description,
-        category=route.category,
-        duration=route.duration,
-        distance=route.distance,
-        difficulty=route.difficulty,
-        image_url=f"/api/v1/images/{route.image_id}" if route.image_id else None,
-        events=[str(e) for e in route.events],
-        stops=[
-            {"name": stop.name, "coordinates": {"lat": stop.coordinates.lat, "lng": stop.coordinates.lng}}
-            for stop in route.stops
-        ],
-        created_at=route.created_at
-    )
+    await placeholders.ensure([doc.get("image_id")])
+    return json_fragment_response(route_fragments.put(doc))
 
 
 # ============================================
@@ -129,23 +102,11 @@ async def create_route(
     )
     
     await route.insert()
+    await placeholders.ensure([route.image_id])
+    fragment = route_fragments.put_document(route)
+    await route_fragments.announce(str(route.id))
     
-    return RouteResponse(
-        _id=str(route.id),
-        name=route.name,
-        description=route.description,
-        category=route.category,
-        duration=route.duration,
-        distance=route.distance,
-        difficulty=route.difficulty,
-        image_url=f"/api/v1/images/{route.image_id}" if route.image_id else None,
-        events=[str(e) for e in route.events],
-        stops=[
-            {"name": stop.name, "coordinates": {"lat": stop.coordinates.lat, "lng": stop.coordinates.lng}}
-            for stop in route.stops
-        ],
-        created_at=route.created_at
-    )
+    return json_fragment_response(fragment, status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{route_id}", response_model=RouteResponse)
@@ -187,23 +148,11 @@ async def update_route(
     
     await route.update({"$set": update_data})
     route = await Route.get(route_id)
+    await placeholders.ensure([route.image_id])
+    fragment = route_fragments.put_document(route)
+    await route_fragments.announce(route_id)
     
-    return RouteResponse(
-        _id=str(route.id),
-        name=route.name,
-        description=route.description,
-        category=route.category,
-        duration=route.duration,
-        distance=route.distance,
-        difficulty=route.difficulty,
-        image_url=f"/api/v1/images/{route.image_id}" if route.image_id else None,
-        events=[str(e) for e in route.events],
-        stops=[
-            {"name": stop.name, "coordinates": {"lat": stop.coordinates.lat, "lng": stop.coordinates.lng}}
-            for stop in route.stops
-        ],
-        created_at=route.created_at
-    )
+    return json_fragment_response(fragment)
 
 
 @router.delete("/{route_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -223,4 +172,6 @@ async def delete_route(
         raise HTTPException(status_code=404, detail="Ruta no encontrada")
     
     await route.delete()
+    route_fragments.remove(route_id)
+    await route_fragments.announce(route_id)
     return None
@@ -1,13 +1,17 @@
 """
 Router de usuarios - /users
 Perfil y gestión de usuarios (Admin)
+Los response_model solo documentan (OpenAPI): las respuestas se arman con
+app.core.mappers y FastAPI no las vuelve a validar.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from datetime import datetime
 from typing import List, Optional
 from beanie import PydanticObjectId
 
+from app.core import mappers
 from app.core.dependencies import get_current_user, require_admin
+from app.core.responses import FastJSONResponse
 from app.models.user import User, UserRole
 from app.schemas.user import UserResponse, UserUpdate
 
@@ -22,19 +26,7 @@ async def get_current_user_profile(user: User = Depends(get_current_user)):
     """
     Obtener perfil del usuario autenticado
     """
-    return UserResponse(
-        _id=str(user.id),
-        name=user.name,
-        email=user.email,
-        phone=user.phone,
-        age=user.age,
-        gender=user.gender,
-        city=user.city,
-        member_since=user.member_since,
-        preferences=user.preferences,
-        role=user.role,
-        avatar_url=f"/api/v1/images/{user.avatar_id}" if user.avatar_id else None
-    )
+    return FastJSONResponse(mappers.user(mappers.raw(user)))
 
 
 @router.put("/me", response_model=UserResponse)
@@ -49,21 +41,9 @@ async def update_current_user_profile(
     update_data["updated_at"] = datetime.utcnow()
     
     await user.update({"$set": update_data})
-    user = await User.get(user.id)
+    doc = await User.get_motor_collection().find_one({"_id": user.id}, mappers.USER_PROJECTION)
     
-    return UserResponse(
-        _id=str(user.id),
-        name=user.name,
-        email=user.email,
-        phone=user.phone,
-        age=user.age,
-        gender=user.gender,
-        city=user.city,
-        member_since=user.member_since,
-        preferences=user.preferences,
-        role=user.role,
-        avatar_url=f"/api/v1/images/{user.avatar_id}" if user.avatar_id else None
-    )
+    return FastJSONResponse(mappers.user(doc))
 
 
 @router.get("/me/preferences", response_model=list[str])
@@ -101,34 +81,20 @@ async def list_users(
     """
     [ADMIN] Listar usuarios registrados
     """
-    query = User.find_all()
+    query = {}
     
     if search:
         # Búsqueda simple por nombre o email (case insensitive regex)
-        query = User.find({
+        query = {
             "$or": [
                 {"name": {"$regex": search, "$options": "i"}},
                 {"email": {"$regex": search, "$options": "i"}}
             ]
-        })
+        }
     
-    users = await query.skip(skip).limit(limit).to_list()
+    cursor = User.get_motor_collection().find(query, mappers.USER_PROJECTION).skip(skip).limit(limit)
     
-    return [
-        UserResponse(
-            _id=str(u.id),
-            name=u.name,
-            email=u.email,
-            phone=u.phone,
-            age=u.age,
-            gender=u.gender,
-            city=u.city,
-            member_since=u.member_since,
-            preferences=u.preferences,
-            role=u.role,
-            avatar_url=f"/api/v1/images/{u.avatar_id}" if u.avatar_id else None
-        ) for u in users
-    ]
+    return FastJSONResponse([mappers.user(doc) async for doc in cursor])
 
 
 @router.get("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_admin)])
@@ -136,23 +102,11 @@ async def get_user_admin(user_id: PydanticObjectId):
     """
     [ADMIN] Obtener usuario por ID
     """
-    user = await User.get(user_id)
-    if not user:
+    doc = await User.get_motor_collection().find_one({"_id": user_id}, mappers.USER_PROJECTION)
+    if not doc:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
         
-    return UserResponse(
-        _id=str(user.id),
-        name=user.name,
-        email=user.email,
-        phone=user.phone,
-        age=user.age,
-        gender=user.gender,
-        city=user.city,
-        member_since=user.member_since,
-        preferences=user.preferences,
-        role=user.role,
-        avatar_url=f"/api/v1/images/{user.avatar_id}" if user.avatar_id else None
-    )
+    return FastJSONResponse(mappers.user(doc))
 
 
 @router.put("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_admin)])
@@ -170,21 +124,9 @@ async def update_user_admin(user_id: PydanticObjectId, user_data: UserUpdate):
     await user.update({"$set": update_data})
     
     # Recargar para asegurar nuevos datos
-    user = await User.get(user_id)
+    doc = await User.get_motor_collection().find_one({"_id": user_id}, mappers.USER_PROJECTION)
     
-    return UserResponse(
-        _id=str(user.id),
-        name=user.name,
-        email=user.email,
-        phone=user.phone,
-        age=user.age,
-        gender=user.gender,
-        city=user.city,
-        member_since=user.member_since,
-        preferences=user.preferences,
-        role=user.role,
-        avatar_url=f"/api/v1/images/{user.avatar_id}" if user.avatar_id else None
-    )
+    return FastJSONResponse(mappers.user(doc))
 
 
 @router.delete("/{user_id}", dependencies=[Depends(require_admin)])
@@ -60,6 +60,7 @@ class AlertResponse(BaseModel):
     start_date: datetime
     end_date: datetime
     image_url: Optional[str] = None
+    image_placeholder: Optional[str] = None  # Data URI diminuto para mostrar mientras carga
     is_active: bool
     created_at: datetime
     
@@ -123,6 +123,7 @@ class EventSummary(BaseModel):
     coordinates: Coordinates
     category: EventCategory
     image_url: Optional[str] = None
+    image_placeholder: Optional[str] = None  # Data URI diminuto para mostrar mientras carga
     
     class Config:
         from_attributes = True
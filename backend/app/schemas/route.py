@@ -73,6 +73,7 @@ class RouteResponse(BaseModel):
     distance: str
     difficulty: RouteDifficulty
     image_url: Optional[str] = None
+    image_placeholder: Optional[str] = None  # Data URI diminuto para mostrar mientras carga
     events: List[str] = []
     stops: List[RouteStop] = []
     created_at: datetime
@@ -0,0 +1,471 @@
+"""
+Almacenamiento de bytes de imágenes (BlobStore)
+Los metadatos de todas las imágenes siguen en fs.files (ids, variantes, hash,
+placeholder, refcount...); metadata.backend indica dónde están los bytes:
+
+    gridfs      -> fs.chunks de MongoDB (archivos sin backend también)
+    filesystem  -> directorio local o volumen compartido
+    s3          -> bucket S3 compatible (AWS S3, MinIO, R2...)
+
+Las subidas nuevas van al backend de settings.IMAGE_STORAGE_BACKEND; las
+lecturas y borrados usan el backend registrado en cada archivo, así que
+pueden convivir mientras se migra (scripts/migrate_blobs.py).
+
+Toda la E/S de disco (temporales, os.replace, unlink) va a un hilo para no
+bloquear el event loop mientras se sirven otras peticiones.
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import Binary, ObjectId
+from gridfs.errors import FileExists
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket, AsyncIOMotorGridOut
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.database import get_database
+
+DEFAULT_BACKEND = "gridfs"
+
+# Tamaño de lectura/escritura por iteración (igual al chunk de GridFS)
+STREAM_CHUNK_SIZE = 255 * 1024
+
+# Errores de commit por un índice único de fs.files: GridFS convierte el
+# DuplicateKeyError en FileExists (que no es subclase suya)
+DuplicateFile = (DuplicateKeyError, FileExists)
+
+
+def backend_of(file_doc: dict) -> str:
+    """Backend donde están los bytes de un archivo"""
+    return (file_doc.get("metadata") or {}).get("backend") or DEFAULT_BACKEND
+
+
+async def _insert_file_doc(file_id: ObjectId, filename: str, length: int, metadata: dict):
+    """Crear el documento de fs.files de un archivo guardado fuera de GridFS"""
+    await get_database().fs.files.insert_one({
+        "_id": file_id,
+        "filename": filename,
+        "length": length,
+        "chunkSize": STREAM_CHUNK_SIZE,
+        "uploadDate": datetime.utcnow(),
+        "metadata": metadata,
+    })
+
+
+class BlobWriter(ABC):
+    """Escritura incremental de un archivo nuevo"""
+
+    @abstractmethod
+    async def write(self, chunk: bytes):
+        """Añadir un bloque al archivo"""
+
+    @abstractmethod
+    async def commit(self, metadata: dict):
+        """
+        Publicar el archivo creando su documento en fs.files
+
+        Raises:
+            DuplicateFile: Si viola un índice único de fs.files; los bytes
+                escritos ya se han descartado
+        """
+
+    @abstractmethod
+    async def abort(self):
+        """Descartar lo escrito"""
+
+
+class BlobStore(ABC):
+    """Interfaz de un backend de bytes"""
+
+    name: str = ""
+
+    async def ensure_ready(self):
+        """Preparar el backend al arrancar (directorio, bucket...)"""
+
+    @abstractmethod
+    async def open_writer(self, file_id: ObjectId, filename: str) -> BlobWriter:
+        """Empezar a escribir un archivo nuevo"""
+
+    @abstractmethod
+    async def put(self, file_id: ObjectId, data: bytes):
+        """Guardar solo los bytes de un archivo ya registrado (migraciones)"""
+
+    @abstractmethod
+    def iter_range(self, file_doc: dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Leer el archivo por bloques
+
+        Args:
+            file_doc: Documento de fs.files
+            start: Primer byte
+            end: Último byte (inclusive); None hasta el final
+        """
+
+    async def read(self, file_doc: dict) -> bytes:
+        """Leer el archivo completo"""
+        return b"".join([chunk async for chunk in self.iter_range(file_doc)])
+
+    @abstractmethod
+    async def delete(self, file_ids: List[ObjectId]):
+        """Borrar los bytes (no el documento de fs.files)"""
+
+
+# ============================================
+# GRIDFS
+# ============================================
+
+class GridFSWriter(BlobWriter):
+    def __init__(self, file_id: ObjectId, filename: str):
+        bucket = AsyncIOMotorGridFSBucket(get_database())
+        self._grid_in = bucket.open_upload_stream_with_id(file_id, filename)
+
+    async def write(self, chunk: bytes):
+        await self._grid_in.write(chunk)
+
+    async def commit(self, metadata: dict):
+        await self._grid_in.set("metadata", metadata)
+        try:
+            await self._grid_in.close()
+        except DuplicateFile:
+            await get_database().fs.chunks.delete_many({"files_id": self._grid_in._id})
+            raise
+
+    async def abort(self):
+        if not self._grid_in.closed:
+            await self._grid_in.abort()
+
+
+class GridFSBlobStore(BlobStore):
+    """Bytes en fs.chunks (comportamiento original)"""
+
+    name = "gridfs"
+
+    async def open_writer(self, file_id: ObjectId, filename: str) -> BlobWriter:
+        return GridFSWriter(file_id, filename)
+
+    async def put(self, file_id: ObjectId, data: bytes):
+        db = get_database()
+        await db.fs.chunks.delete_many({"files_id": file_id})
+        chunks = [
+            {"files_id": file_id, "n": n, "data": Binary(data[offset:offset + STREAM_CHUNK_SIZE])}
+            for n, offset in enumerate(range(0, len(data), STREAM_CHUNK_SIZE))
+        ]
+        if chunks:
+            await db.fs.chunks.insert_many(chunks)
+        await db.fs.files.update_one({"_id": file_id}, {"$set": {"chunkSize": STREAM_CHUNK_SIZE}})
+
+    async def iter_range(self, file_doc: dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Cada iteración lee un único chunk de GridFS, por lo que la memoria por
+        descarga es de un chunk; seek salta directo al chunk que contiene start.
+        """
+        grid_out = AsyncIOMotorGridOut(get_database().fs, file_document=file_doc)
+        if start:
+            grid_out.seek(start)
+        remaining = (file_doc["length"] if end is None else end + 1) - start
+
+        while remaining > 0:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            yield chunk
+
+    async def delete(self, file_ids: List[ObjectId]):
+        await get_database().fs.chunks.delete_many({"files_id": {"$in": list(file_ids)}})
+
+
+# ============================================
+# SISTEMA DE ARCHIVOS
+# ============================================
+
+class FilesystemWriter(BlobWriter):
+    """Escribe en un temporal junto al destino y lo renombra al publicar"""
+
+    def __init__(self, store: "FilesystemBlobStore", file_id: ObjectId, filename: str, tmp_path: str, file):
+        self._store = store
+        self._file_id = file_id
+        self._filename = filename
+        self._path = store.path_for(file_id)
+        self._tmp_path = tmp_path
+        self._file = file
+        self._length = 0
+
+    @classmethod
+    async def open(cls, store: "FilesystemBlobStore", file_id: ObjectId, filename: str) -> "FilesystemWriter":
+        """Crear el temporal (en un hilo: makedirs/mkstemp tocan el disco)"""
+        directory = os.path.dirname(store.path_for(file_id))
+
+        def _open():
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            return tmp_path, os.fdopen(fd, "wb")
+
+        tmp_path, file = await asyncio.to_thread(_open)
+        return cls(store, file_id, filename, tmp_path, file)
+
+    async def write(self, chunk: bytes):
+        await asyncio.to_thread(self._file.write, chunk)
+        self._length += len(chunk)
+
+    def _publish(self):
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+
+    def _discard(self):
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+    async def commit(self, metadata: dict):
+        await asyncio.to_thread(self._publish)
+        try:
+            await _insert_file_doc(self._file_id, self._filename, self._length, metadata)
+        except DuplicateKeyError:
+            await self._store.delete([self._file_id])
+            raise
+
+    async def abort(self):
+        await asyncio.to_thread(self._discard)
+
+
+class FilesystemBlobStore(BlobStore):
+    """Bytes en un directorio (<root>/<2 últimos caracteres del id>/<id>)"""
+
+    name = "filesystem"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    async def ensure_ready(self):
+        await asyncio.to_thread(os.makedirs, self.root, exist_ok=True)
+
+    def path_for(self, file_id: ObjectId) -> str:
+        file_id = str(file_id)
+        return os.path.join(self.root, file_id[-2:], file_id)
+
+    async def open_writer(self, file_id: ObjectId, filename: str) -> BlobWriter:
+        return await FilesystemWriter.open(self, file_id, filename)
+
+    async def put(self, file_id: ObjectId, data: bytes):
+        path = self.path_for(file_id)
+
+        def _write():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as blob:
+                blob.write(data)
+
+        await asyncio.to_thread(_write)
+
+    async def iter_range(self, file_doc: dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        remaining = (file_doc["length"] if end is None else end + 1) - start
+        blob = await asyncio.to_thread(open, self.path_for(file_doc["_id"]), "rb")
+        try:
+            if start:
+                blob.seek(start)
+            while remaining > 0:
+                chunk = await asyncio.to_thread(blob.read, min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            blob.close()
+
+    async def delete(self, file_ids: List[ObjectId]):
+        paths = [self.path_for(file_id) for file_id in file_ids]
+
+        def _unlink():
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+        await asyncio.to_thread(_unlink)
+
+
+# ============================================
+# S3 COMPATIBLE
+# ============================================
+
+class S3Writer(BlobWriter):
+    def __init__(self, store: "S3BlobStore", file_id: ObjectId, filename: str):
+        self._store = store
+        self._file_id = file_id
+        self._filename = filename
+        # Las subidas están acotadas por IMAGE_MAX_UPLOAD_BYTES: buffer en memoria/disco
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=STREAM_CHUNK_SIZE * 4)
+        self._length = 0
+
+    async def write(self, chunk: bytes):
+        # Pasado max_size el SpooledTemporaryFile escribe en disco
+        await asyncio.to_thread(self._buffer.write, chunk)
+        self._length += len(chunk)
+
+    async def commit(self, metadata: dict):
+        await asyncio.to_thread(self._buffer.seek, 0)
+        try:
+            await asyncio.to_thread(
+                self._store.client.upload_fileobj,
+                self._buffer,
+                self._store.bucket,
+                self._store.key_for(self._file_id),
+                ExtraArgs={"ContentType": metadata.get("content_type", "application/octet-stream")},
+            )
+        finally:
+            await asyncio.to_thread(self._buffer.close)
+        try:
+            await _insert_file_doc(self._file_id, self._filename, self._length, metadata)
+        except DuplicateKeyError:
+            await self._store.delete([self._file_id])
+            raise
+
+    async def abort(self):
+        await asyncio.to_thread(self._buffer.close)
+
+
+class S3BlobStore(BlobStore):
+    """
+    Bytes en un bucket S3 compatible
+
+    boto3 es una dependencia opcional: solo se importa al usar este backend.
+    Con S3_ENDPOINT_URL apunta a MinIO u otro servicio compatible.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+    ):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._config = {
+            "endpoint_url": endpoint_url,
+            "region_name": region,
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+        }
+        self._client = None
+
+    @property
+    def client(self):
+        """Cliente boto3 (creado en el primer uso)"""
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError(
+                    "IMAGE_STORAGE_BACKEND=s3 requiere boto3 (pip install boto3)"
+                ) from e
+            self._client = boto3.client("s3", **{k: v for k, v in self._config.items() if v})
+        return self._client
+
+    def key_for(self, file_id: ObjectId) -> str:
+        return f"{self.prefix}{file_id}"
+
+    async def ensure_ready(self):
+        """Verificar que el bucket existe y crearlo si no (p.ej. MinIO recién levantado)"""
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.client.head_bucket, Bucket=self.bucket)
+            return
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchBucket"):
+                raise
+        region = self._config["region_name"]
+        kwargs = {"Bucket": self.bucket}
+        if region and region != "us-east-1":
+            kwargs["CreateBucketConfiguration"] = {"LocationConstraint": region}
+        await asyncio.to_thread(self.client.create_bucket, **kwargs)
+        print(f"🪣 Bucket S3 '{self.bucket}' creado")
+
+    async def open_writer(self, file_id: ObjectId, filename: str) -> BlobWriter:
+        return S3Writer(self, file_id, filename)
+
+    async def put(self, file_id: ObjectId, data: bytes):
+        await asyncio.to_thread(
+            self.client.put_object, Bucket=self.bucket, Key=self.key_for(file_id), Body=data
+        )
+
+    async def iter_range(self, file_doc: dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        if file_doc["length"] == 0:
+            return
+        last = file_doc["length"] - 1 if end is None else end
+        response = await asyncio.to_thread(
+            self.client.get_object,
+            Bucket=self.bucket,
+            Key=self.key_for(file_doc["_id"]),
+            Range=f"bytes={start}-{last}",
+        )
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await asyncio.to_thread(body.read, STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, file_ids: List[ObjectId]):
+        keys = [{"Key": self.key_for(file_id)} for file_id in file_ids]
+        for offset in range(0, len(keys), 1000):  # Límite de DeleteObjects
+            await asyncio.to_thread(
+                self.client.delete_objects,
+                Bucket=self.bucket,
+                Delete={"Objects": keys[offset:offset + 1000], "Quiet": True},
+            )
+
+
+# ============================================
+# REGISTRO DE BACKENDS
+# ============================================
+
+_stores: Dict[str, BlobStore] = {}
+
+
+def _create_store(name: str) -> BlobStore:
+    if name == "gridfs":
+        return GridFSBlobStore()
+    if name == "filesystem":
+        return FilesystemBlobStore(settings.IMAGE_STORAGE_DIR)
+    if name == "s3":
+        return S3BlobStore(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        )
+    raise ValueError(f"Backend de imágenes desconocido: {name}")
+
+
+def get_blob_store(name: Optional[str] = None) -> BlobStore:
+    """Backend por nombre (por defecto el de settings.IMAGE_STORAGE_BACKEND)"""
+    name = name or settings.IMAGE_STORAGE_BACKEND
+    store = _stores.get(name)
+    if store is None:
+        store = _stores[name] = _create_store(name)
+    return store
+
+
+def store_for(file_doc: dict) -> BlobStore:
+    """Backend donde están los bytes de un archivo"""
+    return get_blob_store(backend_of(file_doc))
@@ -0,0 +1,273 @@
+"""
+Cache local en disco de imágenes servidas (LRU por pod)
+Las imágenes calientes se copian a disco la primera vez que se sirven
+completas desde GridFS; las siguientes peticiones se responden con
+FileResponse (sendfile) sin consultar MongoDB.
+
+Cada entrada son dos archivos en el directorio del cache:
+    <hash>.bin   -> bytes de la imagen
+    <hash>.json  -> cabeceras de la respuesta (ETag, Last-Modified, ...)
+
+Cada pod tiene su propio cache: al borrar una imagen se anuncia por el
+transporte de broadcast (canal "images") y todas las réplicas quitan sus
+entradas. El acceso al disco durante las peticiones va a un hilo.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from app.config import settings
+from app.core.broadcast_transport import broadcast_transport
+
+
+class CacheEntry:
+    """Entrada del cache: ruta de los bytes y cabeceras guardadas"""
+
+    __slots__ = ("path", "size", "image_id", "media_type", "headers")
+
+    def __init__(self, path: str, size: int, image_id: str, media_type: str, headers: Dict[str, str]):
+        self.path = path
+        self.size = size
+        self.image_id = image_id
+        self.media_type = media_type
+        self.headers = headers
+
+
+class DiskLRUCache:
+    """
+    Cache LRU acotado en bytes sobre un directorio local
+
+    El orden LRU y el índice viven en memoria (se reconstruyen al abrir a
+    partir de los .json, por fecha de acceso); el disco solo guarda datos.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_entry_bytes: int, channel: str):
+        """
+        Args:
+            channel: Canal del transporte de broadcast con las imágenes borradas
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.channel = channel
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # id de imagen original -> claves cacheadas (para invalidar al borrar)
+        self._by_image: Dict[str, Set[str]] = {}
+        # Crece con cada invalidación: una descarga que empezó antes no se publica
+        self._invalidations = 0
+        self.enabled = False
+        broadcast_transport.add_listener(channel, self.on_remote_delete)
+
+    def _paths(self, key: str):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        base = os.path.join(self.directory, name)
+        return base + ".bin", base + ".json"
+
+    def open(self):
+        """Crear el directorio y cargar las entradas existentes (startup)"""
+        if not self.directory or self.max_bytes <= 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                # Descarga interrumpida por un reinicio
+                self._unlink(os.path.join(self.directory, name))
+                continue
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            data_path = meta_path[:-len(".json")] + ".bin"
+            try:
+                with open(meta_path) as meta_file:
+                    meta = json.load(meta_file)
+                stat = os.stat(data_path)
+            except (OSError, ValueError):
+                self._unlink(data_path, meta_path)
+                continue
+            found.append((stat.st_atime, meta, data_path, stat.st_size))
+
+        for _, meta, data_path, size in sorted(found, key=lambda item: item[0]):
+            self._add(meta["key"], CacheEntry(data_path, size, meta["image_id"], meta["media_type"], meta["headers"]))
+        self._evict()
+        self.enabled = True
+
+    # ============================================
+    # ÍNDICE EN MEMORIA
+    # ============================================
+
+    def _add(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._by_image.setdefault(entry.image_id, set()).add(key)
+        self.total_bytes += entry.size
+
+    def _forget(self, key: str) -> List[str]:
+        """Quitar una entrada del índice; devuelve sus archivos a borrar"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return []
+        self.total_bytes -= entry.size
+        keys = self._by_image.get(entry.image_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_image[entry.image_id]
+        return list(self._paths(key))
+
+    def _drop(self, key: str):
+        self._unlink(*self._forget(key))
+
+    def _overflow(self) -> List[str]:
+        """Claves a desalojar (las menos usadas) para volver a max_bytes"""
+        keys = []
+        excess = self.total_bytes - self.max_bytes
+        for key, entry in self._entries.items():
+            if excess <= 0:
+                break
+            keys.append(key)
+            excess -= entry.size
+        return keys
+
+    def _evict(self):
+        for key in self._overflow():
+            self._drop(key)
+
+    async def _drop_all(self, keys: Iterable[str]):
+        """Quitar entradas del índice y borrar sus archivos en un hilo"""
+        paths = [path for key in list(keys) for path in self._forget(key)]
+        if paths:
+            await asyncio.to_thread(self._unlink, *paths)
+
+    @staticmethod
+    def _unlink(*paths: str):
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    # ============================================
+    # API
+    # ============================================
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Entrada cacheada (y la marca como usada recientemente)"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not os.path.exists(entry.path):
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def invalidate_image(self, image_id: str):
+        """Quitar todas las entradas derivadas de una imagen original"""
+        self._invalidations += 1
+        await self._drop_all(self._by_image.get(image_id, ()))
+
+    async def clear(self):
+        """Vaciar el cache (no se sabe qué imágenes se borraron)"""
+        self._invalidations += 1
+        await self._drop_all(self._entries)
+
+    async def on_remote_delete(self, payload: bytes, image_id: Optional[str]):
+        """Imagen borrada en otra réplica (sin id: vaciar todo)"""
+        if image_id is None:
+            await self.clear()
+        else:
+            await self.invalidate_image(image_id)
+
+    async def announce_delete(self, image_id: str):
+        """Invalidar la imagen en el cache de este pod y en el de las demás réplicas"""
+        await self.invalidate_image(image_id)
+        try:
+            await broadcast_transport.publish(self.channel, b"", image_id)
+        except Exception as e:
+            print(f"Error anunciando imagen borrada: {e}")
+
+    async def tee(
+        self,
+        key: str,
+        chunks: AsyncIterator[bytes],
+        image_id: str,
+        media_type: str,
+        headers: Dict[str, str],
+        length: int,
+    ) -> AsyncIterator[bytes]:
+        """
+        Reenviar los chunks al cliente escribiéndolos a la vez en el cache
+
+        La entrada solo se publica si se recibió el archivo completo; si el
+        cliente corta la descarga, el temporal se descarta.
+        """
+        if not self.enabled or length > self.max_entry_bytes or key in self._entries:
+            async for chunk in chunks:
+                yield chunk
+            return
+
+        invalidations = self._invalidations
+        tmp, tmp_path = await asyncio.to_thread(self._open_tmp)
+        written = 0
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(tmp.write, chunk)
+                written += len(chunk)
+                yield chunk
+        except BaseException:
+            await asyncio.to_thread(self._discard_tmp, tmp, tmp_path)
+            raise
+
+        if written != length or key in self._entries or invalidations != self._invalidations:
+            # Descarga incompleta, otra petición ya cacheó la misma clave, o
+            # se borró una imagen mientras tanto (podría ser esta)
+            await asyncio.to_thread(self._discard_tmp, tmp, tmp_path)
+            return
+        data_path, meta_path = self._paths(key)
+        meta = {"key": key, "image_id": image_id, "media_type": media_type, "headers": headers}
+        await asyncio.to_thread(self._commit_tmp, tmp, tmp_path, data_path, meta_path, meta)
+        if invalidations != self._invalidations:
+            # Se borró una imagen mientras se escribía: no cachear esta clave
+            self._forget(key)
+            await asyncio.to_thread(self._unlink, data_path, meta_path)
+            return
+        if key in self._entries:
+            return  # Otra petición publicó la misma clave (mismos archivos)
+
+        self._add(key, CacheEntry(data_path, written, image_id, media_type, headers))
+        await self._drop_all(self._overflow())
+
+    # ============================================
+    # ARCHIVOS (se ejecutan en un hilo)
+    # ============================================
+
+    def _open_tmp(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        return os.fdopen(fd, "wb"), tmp_path
+
+    def _discard_tmp(self, tmp, tmp_path: str):
+        tmp.close()
+        self._unlink(tmp_path)
+
+    def _commit_tmp(self, tmp, tmp_path: str, data_path: str, meta_path: str, meta: dict):
+        tmp.close()
+        with open(meta_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, data_path)
+
+
+# Instancia global del cache
+image_disk_cache = DiskLRUCache(
+    directory=settings.IMAGE_DISK_CACHE_DIR,
+    max_bytes=settings.IMAGE_DISK_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.IMAGE_DISK_CACHE_MAX_ENTRY_BYTES,
+    channel="images",
+)
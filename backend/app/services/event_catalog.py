@@ -0,0 +1,325 @@
+"""
+Catálogo de eventos en memoria
+Snapshot columnar de todos los eventos para responder las lecturas de listas
+sin consultar MongoDB. Se carga al iniciar y se actualiza incrementalmente
+en cada escritura (create/update/delete). Las escrituras de otras réplicas
+llegan por el canal "events" del transporte de broadcast y se releen de la
+BD antes de repartir el aviso a los clientes.
+"""
+import asyncio
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from typing import Iterator, List, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.core import mappers
+from app.core.broadcast_transport import broadcast_transport
+from app.core.placeholders import placeholders
+from app.core.responses import dumps
+from app.models.event import Event, EventCategory
+
+# Código numérico de cada categoría (posición en el enum)
+CATEGORY_CODES = {category.value: code for code, category in enumerate(EventCategory)}
+UNKNOWN_CATEGORY = 255
+
+# Campos necesarios para construir un EventSummary
+SUMMARY_PROJECTION = mappers.EVENT_SUMMARY_PROJECTION
+
+
+def _to_timestamp(value: datetime) -> float:
+    """Timestamp de un datetime naive en UTC (como los guarda MongoDB)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _summary_json(doc: dict) -> bytes:
+    """Serializar un documento crudo como fragmento JSON de EventSummary"""
+    return dumps(mappers.event_summary(doc))
+
+
+class EventCatalog:
+    """
+    Snapshot en memoria de los eventos ordenado por fecha
+
+    Columnas alineadas por posición (orden ascendente de fecha):
+        ids         -> id del evento (str)
+        timestamps  -> array('d') ordenado, para búsquedas binarias
+        categories  -> bytearray con el código de categoría
+        times       -> hora del evento ("HH:MM") para ordenar por día
+        fragments   -> EventSummary ya serializado a JSON (bytes)
+        docs        -> documento crudo con la proyección de resumen
+
+    Además mantiene un bitmap (int) por categoría donde el bit i indica que
+    el evento en la posición i pertenece a esa categoría.
+
+    Nota: el modelo Event no tiene estado de archivado, por lo que el
+    catálogo contiene todos los eventos (los listados incluyen pasados).
+    """
+
+    __slots__ = (
+        "ids", "timestamps", "categories", "times", "fragments", "docs",
+        "bitmaps", "version", "loaded_at", "_lock", "_refresh_task", "_pending",
+    )
+
+    def __init__(self):
+        self._reset()
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Escrituras recibidas mientras se recarga (se re-aplican al terminar)
+        self._pending: Optional[list] = None
+        # Escrituras de otras réplicas (clave: id del evento)
+        broadcast_transport.add_listener("events", self.on_remote_write)
+
+    def _reset(self):
+        self.ids: List[str] = []
+        self.timestamps = array("d")
+        self.categories = bytearray()
+        self.times: List[str] = []
+        self.fragments: List[bytes] = []
+        self.docs: List[dict] = []
+        self.bitmaps = {code: 0 for code in CATEGORY_CODES.values()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ============================================
+    # CARGA Y REFRESCO
+    # ============================================
+
+    async def load(self):
+        """Cargar (o recargar) el snapshot completo desde MongoDB"""
+        async with self._lock:
+            self._pending = []
+            try:
+                docs = await self._fetch_all()
+            except Exception:
+                self._pending = None
+                raise
+
+            pending, self._pending = self._pending, None
+            self._fill(docs)
+            for op, payload in pending:
+                if op == "upsert":
+                    self.upsert(payload)
+                else:
+                    self.remove(payload)
+
+            self.version += 1
+            self.loaded_at = time.monotonic()
+
+    async def _fetch_all(self) -> List[dict]:
+        """Leer todos los eventos con la proyección de resumen"""
+        cursor = Event.get_motor_collection().find({}, SUMMARY_PROJECTION).sort("date", 1)
+        docs = await cursor.to_list(length=None)
+        await placeholders.ensure(doc.get("image_id") for doc in docs)
+        return docs
+
+    def _fill(self, docs: List[dict]):
+        """Reconstruir todas las columnas a partir de documentos ordenados por fecha"""
+        self._reset()
+        for position, doc in enumerate(docs):
+            code = CATEGORY_CODES.get(doc["category"], UNKNOWN_CATEGORY)
+            self.ids.append(str(doc["_id"]))
+            self.timestamps.append(_to_timestamp(doc["date"]))
+            self.categories.append(code)
+            self.times.append(doc["time"])
+            self.fragments.append(_summary_json(doc))
+            self.docs.append(doc)
+            if code in self.bitmaps:
+                self.bitmaps[code] |= 1 << position
+
+    async def ensure_loaded(self):
+        """
+        Garantizar que hay snapshot cargado
+
+        Si el snapshot superó EVENT_CATALOG_MAX_AGE_SECONDS se recarga en
+        segundo plano mientras se sigue respondiendo con el actual (red de
+        seguridad: las escrituras de otras réplicas llegan por on_remote_write).
+        """
+        if self.loaded_at is None:
+            await self.load()
+            return
+
+        age = time.monotonic() - self.loaded_at
+        if age >= settings.EVENT_CATALOG_MAX_AGE_SECONDS and (
+            self._refresh_task is None or self._refresh_task.done()
+        ):
+            self._refresh_task = asyncio.create_task(self.load())
+
+    # ============================================
+    # ACTUALIZACIÓN INCREMENTAL
+    # ============================================
+
+    def _insert_bit(self, bitmap: int, position: int, bit: int) -> int:
+        """Insertar un bit en la posición indicada desplazando los superiores"""
+        low = bitmap & ((1 << position) - 1)
+        high = bitmap >> position
+        return low | (bit << position) | (high << (position + 1))
+
+    def _remove_bit(self, bitmap: int, position: int) -> int:
+        """Eliminar el bit de la posición indicada desplazando los superiores"""
+        low = bitmap & ((1 << position) - 1)
+        high = bitmap >> (position + 1)
+        return low | (high << position)
+
+    def _remove_at(self, position: int):
+        del self.ids[position]
+        del self.timestamps[position]
+        del self.categories[position]
+        del self.times[position]
+        del self.fragments[position]
+        del self.docs[position]
+        for code in self.bitmaps:
+            self.bitmaps[code] = self._remove_bit(self.bitmaps[code], position)
+
+    def remove(self, event_id: str) -> bool:
+        """Quitar un evento del catálogo"""
+        if self._pending is not None:
+            self._pending.append(("remove", event_id))
+        try:
+            position = self.ids.index(event_id)
+        except ValueError:
+            return False
+        self._remove_at(position)
+        self.version += 1
+        return True
+
+    def upsert(self, doc: dict):
+        """
+        Insertar o reemplazar un evento a partir de su documento crudo
+
+        Args:
+            doc: Documento con al menos los campos de SUMMARY_PROJECTION y "_id"
+        """
+        if self._pending is not None:
+            self._pending.append(("upsert", doc))
+
+        event_id = str(doc["_id"])
+        if event_id in self.ids:
+            self._remove_at(self.ids.index(event_id))
+
+        timestamp = _to_timestamp(doc["date"])
+        code = CATEGORY_CODES.get(doc["category"], UNKNOWN_CATEGORY)
+        position = bisect_right(self.timestamps, timestamp)
+
+        self.ids.insert(position, event_id)
+        self.timestamps.insert(position, timestamp)
+        self.categories.insert(position, code)
+        self.times.insert(position, doc["time"])
+        self.fragments.insert(position, _summary_json(doc))
+        self.docs.insert(position, {key: doc.get(key) for key in ("_id", *SUMMARY_PROJECTION)})
+        for bitmap_code in self.bitmaps:
+            self.bitmaps[bitmap_code] = self._insert_bit(
+                self.bitmaps[bitmap_code], position, int(bitmap_code == code)
+            )
+        self.version += 1
+
+    async def refresh(self, event_id: str):
+        """Releer un evento de la BD y actualizarlo o quitarlo del catálogo"""
+        if self.loaded_at is None and self._pending is None:
+            return  # Se cargará completo en la primera lectura
+        doc = None
+        if ObjectId.is_valid(event_id):
+            doc = await Event.get_motor_collection().find_one(
+                {"_id": ObjectId(event_id)}, SUMMARY_PROJECTION
+            )
+        if doc is None:
+            self.remove(event_id)
+            return
+        await placeholders.ensure([doc.get("image_id")])
+        self.upsert(doc)
+
+    async def on_remote_write(self, payload: bytes, key: Optional[str]):
+        """Escritura hecha en otra réplica (sin clave: recargar todo)"""
+        if key is None:
+            await self.load()
+        else:
+            await self.refresh(key)
+
+    def upsert_event(self, event: Event):
+        """Insertar o reemplazar un evento a partir del documento Beanie"""
+        doc = event.model_dump(by_alias=True, include={"id", *SUMMARY_PROJECTION})
+        doc["category"] = event.category.value
+        if doc["date"].tzinfo is not None:
+            doc["date"] = doc["date"].astimezone(timezone.utc).replace(tzinfo=None)
+        self.upsert(doc)
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def _positions(self, start: int, stop: int, descending: bool) -> Iterator[int]:
+        return iter(range(stop - 1, start - 1, -1)) if descending else iter(range(start, stop))
+
+    def _select(
+        self,
+        positions: Iterator[int],
+        skip: int,
+        limit: int,
+        category: Optional[EventCategory] = None,
+    ) -> List[bytes]:
+        bitmap = None
+        if category is not None:
+            bitmap = self.bitmaps.get(CATEGORY_CODES[category.value], 0)
+
+        selected: List[bytes] = []
+        for position in positions:
+            if bitmap is not None and not (bitmap >> position) & 1:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            selected.append(self.fragments[position])
+            if len(selected) >= limit:
+                break
+        return selected
+
+    def get_multi(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        category: Optional[EventCategory] = None,
+        upcoming: bool = False,
+    ) -> List[bytes]:
+        """
+        Equivalente en memoria de EventService.get_multi
+
+        Returns:
+            Fragmentos JSON de EventSummary en el orden de respuesta
+        """
+        if upcoming:
+            start = bisect_left(self.timestamps, time.time())
+            positions = self._positions(start, len(self.ids), descending=False)
+        else:
+            positions = self._positions(0, len(self.ids), descending=True)
+        return self._select(positions, skip, limit, category)
+
+    def get_upcoming(self, limit: int = 10) -> List[bytes]:
+        """Equivalente en memoria de EventService.get_upcoming"""
+        start = bisect_left(self.timestamps, time.time())
+        return self.fragments[start:start + limit]
+
+    def get_by_date(self, event_date: date) -> List[bytes]:
+        """Equivalente en memoria de EventService.get_by_date (orden por hora)"""
+        start_ts = _to_timestamp(datetime.combine(event_date, datetime.min.time()))
+        end_ts = _to_timestamp(datetime.combine(event_date, datetime.max.time()))
+        start = bisect_left(self.timestamps, start_ts)
+        stop = bisect_right(self.timestamps, end_ts)
+        positions = sorted(range(start, stop), key=self.times.__getitem__)
+        return [self.fragments[position] for position in positions]
+
+    def upcoming_docs(self) -> List[dict]:
+        """Documentos crudos de los eventos futuros (para el feed)"""
+        start = bisect_left(self.timestamps, time.time())
+        return self.docs[start:]
+
+
+# Instancia global del catálogo
+event_catalog = EventCatalog()
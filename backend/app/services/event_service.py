@@ -1,9 +1,12 @@
 from typing import List, Optional, Union, Any
 from datetime import datetime, date
 from beanie import PydanticObjectId
+from bson import ObjectId
+from bson.errors import InvalidId
 from beanie.operators import GTE
 from beanie.odm.operators.find.evaluation import RegEx
 
+from app.core.mappers import EVENT_SUMMARY_PROJECTION
 from app.models.event import Event, EventCategory, GeoJSONPoint
 from app.schemas.event import EventCreate, EventUpdate
 from app.services.base import BaseService
@@ -15,6 +18,14 @@ class EventService(BaseService[Event, EventCreate, EventUpdate]):
     def __init__(self):
         super().__init__(Event)
 
+    async def get_raw(self, id: Union[PydanticObjectId, str]) -> Optional[dict]:
+        """Obtener el documento crudo de MongoDB (sin construir el modelo Beanie)"""
+        try:
+            oid = ObjectId(id)
+        except (InvalidId, TypeError):
+            return None
+        return await self.model.get_motor_collection().find_one({"_id": oid})
+
     async def create(self, schema_in: EventCreate) -> Event:
         """
         Crear evento manejando conversiones de tipos (GeoJSON, ObjectIds)
@@ -75,6 +86,26 @@ class EventService(BaseService[Event, EventCreate, EventUpdate]):
         await db_obj.set(update_data)
         return db_obj
 
+    async def append_gallery(self, id: Union[PydanticObjectId, str], image_ids: List[ObjectId]) -> bool:
+        """
+        Añadir imágenes al final de la galería en una sola operación atómica
+
+        Returns:
+            False si el evento no existe
+        """
+        try:
+            oid = ObjectId(id)
+        except (InvalidId, TypeError):
+            return False
+        result = await self.model.get_motor_collection().update_one(
+            {"_id": oid},
+            {
+                "$push": {"gallery": {"$each": list(image_ids)}},
+                "$set": {"updated_at": datetime.utcnow()},
+            },
+        )
+        return result.matched_count == 1
+
     async def get_multi(
         self, 
         *, 
@@ -131,11 +162,12 @@ class EventService(BaseService[Event, EventCreate, EventUpdate]):
         lng: float, 
         max_distance: int = 5000, 
         limit: int = 10
-    ) -> List[Event]:
+    ) -> List[dict]:
         """
         Obtener eventos cercanos usando índice geoespacial ($nearSphere).
+        Devuelve documentos crudos con la proyección de resumen.
         """
-        return await self.model.find({
+        return await self.model.get_motor_collection().find({
             "coordinates": {
                 "$nearSphere": {
                     "$geometry": {
@@ -145,7 +177,7 @@ class EventService(BaseService[Event, EventCreate, EventUpdate]):
                     "$maxDistance": max_distance
                 }
             }
-        }).limit(limit).to_list()
+        }, EVENT_SUMMARY_PROJECTION).limit(limit).to_list(length=limit)
 
 
 # Instancia global del servicio
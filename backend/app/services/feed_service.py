@@ -0,0 +1,198 @@
+"""
+Servicio de Feed - Eventos recomendados "para ti"
+Puntuación vectorizada con NumPy sobre un snapshot columnar de eventos
+construido a partir del catálogo en memoria
+"""
+import asyncio
+import time
+from datetime import timezone
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.models.agenda import Agenda
+from app.services.event_catalog import CATEGORY_CODES, event_catalog
+
+# Escalas de decaimiento de los componentes del score
+DISTANCE_SCALE_KM = 3.0
+TIME_SCALE_HOURS = 24.0 * 7
+EARTH_RADIUS_KM = 6371.0
+
+
+class EventColumns:
+    """
+    Snapshot columnar de los eventos próximos
+
+    Cada atributo usado en el scoring es un array de NumPy alineado por
+    posición; `docs` guarda el documento crudo para construir la respuesta.
+    """
+
+    __slots__ = (
+        "docs", "timestamps", "categories", "lat", "lng", "popularity",
+        "built_at", "catalog_version",
+    )
+
+    def __init__(self, docs: List[dict], popularity: dict, catalog_version: int = 0):
+        self.docs = docs
+        self.catalog_version = catalog_version
+        self.timestamps = np.fromiter(
+            (doc["date"].replace(tzinfo=timezone.utc).timestamp() for doc in docs), dtype=np.float64, count=len(docs)
+        )
+        self.categories = np.fromiter(
+            (CATEGORY_CODES.get(doc["category"], -1) for doc in docs), dtype=np.int8, count=len(docs)
+        )
+        self.lat = np.fromiter(
+            (doc["coordinates"]["coordinates"][1] for doc in docs), dtype=np.float64, count=len(docs)
+        )
+        self.lng = np.fromiter(
+            (doc["coordinates"]["coordinates"][0] for doc in docs), dtype=np.float64, count=len(docs)
+        )
+        raw_popularity = np.fromiter(
+            (popularity.get(doc["_id"], 0.0) for doc in docs), dtype=np.float64, count=len(docs)
+        )
+        # Normalizar popularidad a [0, 1] con escala logarítmica
+        scaled = np.log1p(raw_popularity)
+        peak = scaled.max() if len(docs) else 0.0
+        self.popularity = scaled / peak if peak > 0 else scaled
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+
+class FeedService:
+    """Ranking de eventos próximos según preferencias, distancia, fecha y popularidad"""
+
+    def __init__(self):
+        self._columns: Optional[EventColumns] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, columns: Optional[EventColumns]) -> bool:
+        """El snapshot sigue vigente si el catálogo no cambió y no expiró el TTL"""
+        return (
+            columns is not None
+            and columns.catalog_version == event_catalog.version
+            and time.monotonic() - columns.built_at < settings.FEED_SNAPSHOT_TTL_SECONDS
+        )
+
+    async def _load_popularity(self) -> dict:
+        """Contar asistentes (peso 1) e interesados (peso 0.5) por evento"""
+        pipeline = [
+            {"$project": {
+                "marks": {"$concatArrays": [
+                    {"$map": {"input": "$attending", "as": "e", "in": {"event": "$$e", "weight": 1.0}}},
+                    {"$map": {"input": "$interested", "as": "e", "in": {"event": "$$e", "weight": 0.5}}},
+                ]}
+            }},
+            {"$unwind": "$marks"},
+            {"$group": {"_id": "$marks.event", "score": {"$sum": "$marks.weight"}}},
+        ]
+        cursor = Agenda.get_motor_collection().aggregate(pipeline)
+        return {row["_id"]: row["score"] async for row in cursor}
+
+    async def _build_columns(self) -> EventColumns:
+        """Tomar los eventos próximos del catálogo y construir el snapshot"""
+        await event_catalog.ensure_loaded()
+        version = event_catalog.version
+        docs = event_catalog.upcoming_docs()
+        popularity = await self._load_popularity()
+        return EventColumns(docs, popularity, catalog_version=version)
+
+    async def get_columns(self) -> EventColumns:
+        """Obtener snapshot vigente, reconstruyéndolo si expiró o cambió el catálogo"""
+        columns = self._columns
+        if self._is_fresh(columns):
+            return columns
+
+        async with self._lock:
+            columns = self._columns
+            if not self._is_fresh(columns):
+                columns = await self._build_columns()
+                self._columns = columns
+        return columns
+
+    @staticmethod
+    def score(
+        columns: EventColumns,
+        preferences: Sequence[str],
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Calcular el score de todos los eventos del snapshot
+
+        Args:
+            columns: Snapshot columnar
+            preferences: Categorías favoritas del usuario
+            lat, lng: Ubicación opcional del usuario
+            now: Timestamp de referencia (por defecto, ahora)
+
+        Returns:
+            Array de scores alineado con columns.docs
+        """
+        now = time.time() if now is None else now
+
+        # Coincidencia de preferencias: máscara por código de categoría
+        preferred = np.zeros(len(CATEGORY_CODES) + 1, dtype=np.float64)
+        for category in preferences:
+            code = CATEGORY_CODES.get(category)
+            if code is not None:
+                preferred[code] = 1.0
+        # Código -1 (categoría desconocida) cae en la última posición (0.0)
+        preference_score = preferred[columns.categories]
+
+        hours_until = np.maximum(columns.timestamps - now, 0.0) / 3600.0
+        time_score = np.exp(-hours_until / TIME_SCALE_HOURS)
+
+        scores = (
+            settings.FEED_WEIGHT_PREFERENCE * preference_score
+            + settings.FEED_WEIGHT_TIME * time_score
+            + settings.FEED_WEIGHT_POPULARITY * columns.popularity
+        )
+
+        if lat is not None and lng is not None:
+            # Distancia haversine vectorizada (km)
+            lat1, lng1 = np.radians(lat), np.radians(lng)
+            lat2, lng2 = np.radians(columns.lat), np.radians(columns.lng)
+            a = (
+                np.sin((lat2 - lat1) / 2.0) ** 2
+                + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2.0) ** 2
+            )
+            distance_km = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+            scores += settings.FEED_WEIGHT_DISTANCE * np.exp(-distance_km / DISTANCE_SCALE_KM)
+
+        return scores
+
+    async def get_feed(
+        self,
+        preferences: Sequence[str],
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[dict]:
+        """
+        Obtener los `limit` eventos próximos con mayor score
+
+        Returns:
+            Documentos crudos de MongoDB ordenados por score descendente
+        """
+        columns = await self.get_columns()
+        now = time.time()
+        # Excluir eventos que ya empezaron desde que se construyó el snapshot
+        candidates = np.flatnonzero(columns.timestamps >= now)
+        if candidates.size == 0:
+            return []
+
+        scores = self.score(columns, preferences, lat, lng, now)[candidates]
+        if candidates.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(candidates.size)
+        ranked = top[np.argsort(-scores[top], kind="stable")]
+        return [columns.docs[i] for i in candidates[ranked]]
+
+
+# Instancia global del servicio
+feed_service = FeedService()
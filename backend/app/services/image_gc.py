@@ -0,0 +1,147 @@
+"""
+Recolector de imágenes huérfanas de GridFS
+Los routers de eventos, alertas, rutas y usuarios no borran sus imágenes al
+eliminar documentos. Este servicio calcula el conjunto de ids referenciados
+y borra por lotes los originales sin referencias (con sus variantes) que
+superan el periodo de gracia.
+"""
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Set
+
+from bson import ObjectId
+
+from app.database import get_database
+from app.services.image_service import delete_files
+
+# Colección -> campos que referencian imágenes (ObjectId o lista de ObjectId)
+IMAGE_REFERENCES: Dict[str, List[str]] = {
+    "events": ["image_id", "gallery"],
+    "alerts": ["image_id"],
+    "routes": ["image_id"],
+    "users": ["avatar_id"],
+}
+
+
+def _references_pipeline(fields: List[str]) -> List[dict]:
+    """
+    Aggregation que devuelve cada id de imagen referenciado una sola vez
+
+    Cada campo se normaliza a array (escalar, lista o ausente) y se
+    concatena; $unwind + $group deduplican en el servidor.
+    """
+    arrays = [
+        {"$cond": [
+            {"$isArray": f"${field}"},
+            f"${field}",
+            {"$cond": [{"$ifNull": [f"${field}", False]}, [f"${field}"], []]},
+        ]}
+        for field in fields
+    ]
+    return [
+        {"$project": {"_id": 0, "image_ids": {"$concatArrays": arrays}}},
+        {"$unwind": "$image_ids"},
+        {"$group": {"_id": "$image_ids"}},
+    ]
+
+
+async def iter_referenced_ids() -> AsyncIterator[ObjectId]:
+    """Ids referenciados en todas las colecciones (streaming por cursor)"""
+    db = get_database()
+    for collection, fields in IMAGE_REFERENCES.items():
+        cursor = db[collection].aggregate(
+            _references_pipeline(fields), allowDiskUse=True, batchSize=1000
+        )
+        async for item in cursor:
+            image_id = item["_id"]
+            if isinstance(image_id, str) and ObjectId.is_valid(image_id):
+                image_id = ObjectId(image_id)
+            if isinstance(image_id, ObjectId):
+                yield image_id
+
+
+async def live_image_ids() -> Set[ObjectId]:
+    """Conjunto de ids de imagen referenciados"""
+    return {image_id async for image_id in iter_referenced_ids()}
+
+
+async def _delete_batch(batch: List[dict], dry_run: bool) -> Dict[str, int]:
+    """Borrar (o medir, en dry-run) un lote de originales y sus variantes"""
+    files = get_database().fs.files
+    ids = [file_doc["_id"] for file_doc in batch]
+    variants = await files.find(
+        {"metadata.variant_of": {"$in": ids}}, {"length": 1, "metadata.backend": 1}
+    ).to_list(length=None)
+    
+    reclaimed = sum(doc["length"] for doc in batch) + sum(v["length"] for v in variants)
+    
+    if not dry_run:
+        await delete_files(batch + variants)
+    
+    return {"files": len(ids), "variants": len(variants), "bytes": reclaimed}
+
+
+async def collect_garbage(
+    grace_period: timedelta,
+    batch_size: int = 100,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Borrar imágenes originales sin referencias más viejas que el periodo de gracia
+    
+    Una imagen se considera nueva si se subió o se reutilizó (deduplicación)
+    dentro del periodo de gracia: puede estar a punto de referenciarse.
+    
+    Args:
+        grace_period: Antigüedad mínima para borrar
+        batch_size: Originales por lote de borrado
+        dry_run: Solo calcular qué se borraría
+    
+    Returns:
+        Resumen: scanned, live, deleted_files, deleted_variants,
+        reclaimed_bytes, dry_run
+    """
+    live = await live_image_ids()
+    cutoff = datetime.utcnow() - grace_period
+    
+    report = {
+        "scanned": 0,
+        "live": len(live),
+        "deleted_files": 0,
+        "deleted_variants": 0,
+        "reclaimed_bytes": 0,
+        "dry_run": dry_run,
+    }
+    
+    cursor = get_database().fs.files.find(
+        {
+            "metadata.variant_of": {"$exists": False},
+            "uploadDate": {"$lt": cutoff},
+            "$or": [
+                {"metadata.acquired_at": {"$exists": False}},
+                {"metadata.acquired_at": {"$lt": cutoff}},
+            ],
+        },
+        {"length": 1, "metadata.backend": 1},
+        batch_size=1000,
+    )
+    
+    batch: List[dict] = []
+    async for file_doc in cursor:
+        report["scanned"] += 1
+        if file_doc["_id"] in live:
+            continue
+        batch.append(file_doc)
+        if len(batch) >= batch_size:
+            result = await _delete_batch(batch, dry_run)
+            _accumulate(report, result)
+            batch = []
+    if batch:
+        _accumulate(report, await _delete_batch(batch, dry_run))
+    
+    return report
+
+
+def _accumulate(report: dict, result: Dict[str, int]):
+    report["deleted_files"] += result["files"]
+    report["deleted_variants"] += result["variants"]
+    report["reclaimed_bytes"] += result["bytes"]
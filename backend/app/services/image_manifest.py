@@ -0,0 +1,155 @@
+"""
+Servicio de Manifiesto de imágenes - Precarga del service worker (PWA)
+Lista compacta de las imágenes referenciadas por eventos próximos, alertas
+activas y rutas, con tamaño, hash de contenido y URLs de sus derivados.
+
+El manifiesto se serializa una vez por snapshot y se versiona con el hash
+de su contenido: mientras las imágenes no cambien la versión (y el ETag)
+se mantiene aunque el snapshot se reconstruya.
+"""
+import asyncio
+import hashlib
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from bson import ObjectId
+
+from app.config import settings
+from app.core.mappers import IMAGE_URL_PREFIX
+from app.core.responses import dumps
+from app.database import get_database
+from app.services.event_catalog import event_catalog
+from app.services.image_processing import derivative_specs, variant_key, VariantSpec
+
+FILE_PROJECTION = {
+    "length": 1,
+    "metadata.sha256": 1,
+    "metadata.content_type": 1,
+    "metadata.variants": 1,
+}
+
+
+def variant_url(image_id: str, spec: VariantSpec) -> str:
+    """URL de una variante con los mismos parámetros que GET /images/{id}"""
+    params = {}
+    if spec.width:
+        params["w"] = spec.width
+    if spec.height:
+        params["h"] = spec.height
+    params["fit"] = spec.fit.value
+    params["format"] = spec.fmt.value
+    return f"{IMAGE_URL_PREFIX}{image_id}?{urlencode(params)}"
+
+
+def manifest_entry(file_doc: dict) -> dict:
+    """Entrada del manifiesto de una imagen original y sus derivados guardados"""
+    image_id = str(file_doc["_id"])
+    metadata = file_doc.get("metadata") or {}
+    stored = metadata.get("variants") or {}
+    variants = []
+    for spec in derivative_specs():
+        variant = stored.get(variant_key(spec.width, spec.height, spec.fit, spec.fmt))
+        if variant:
+            variants.append({
+                "url": variant_url(image_id, spec),
+                "size": variant.get("length"),
+                "type": variant.get("content_type"),
+            })
+    return {
+        "id": image_id,
+        "url": f"{IMAGE_URL_PREFIX}{image_id}",
+        "size": file_doc["length"],
+        "hash": metadata.get("sha256"),
+        "type": metadata.get("content_type"),
+        "variants": variants,
+    }
+
+
+class ImageManifest:
+    """Snapshot serializado del manifiesto"""
+
+    __slots__ = ("version", "etag", "body", "built_at")
+
+    def __init__(self, images: List[dict]):
+        self.version = hashlib.sha256(dumps(images)).hexdigest()[:16]
+        self.etag = f'"manifest-{self.version}"'
+        self.body = dumps({"version": self.version, "images": images})
+        self.built_at = time.monotonic()
+
+
+class ImageManifestService:
+    """Construcción y cache del manifiesto de imágenes"""
+
+    def __init__(self):
+        self._manifest: Optional[ImageManifest] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, manifest: Optional[ImageManifest]) -> bool:
+        return (
+            manifest is not None
+            and time.monotonic() - manifest.built_at < settings.IMAGE_MANIFEST_TTL_SECONDS
+        )
+
+    async def _referenced_ids(self) -> List[ObjectId]:
+        """Ids de imagen de eventos próximos (portada y galería), alertas activas y rutas"""
+        db = get_database()
+        now = datetime.utcnow()
+
+        await event_catalog.ensure_loaded()
+        ids = {doc.get("image_id") for doc in event_catalog.upcoming_docs()}
+
+        # La galería no está en el catálogo: solo los eventos próximos que la tienen
+        cursor = db.events.find({"date": {"$gte": now}, "gallery.0": {"$exists": True}}, {"gallery": 1})
+        async for doc in cursor:
+            ids.update(doc["gallery"])
+
+        cursor = db.alerts.find(
+            {
+                "is_active": True,
+                "start_date": {"$lte": now},
+                "end_date": {"$gte": now},
+                "image_id": {"$ne": None},
+            },
+            {"image_id": 1},
+        )
+        async for doc in cursor:
+            ids.add(doc["image_id"])
+
+        cursor = db.routes.find({"image_id": {"$ne": None}}, {"image_id": 1})
+        async for doc in cursor:
+            ids.add(doc["image_id"])
+
+        ids.discard(None)
+        return sorted(ObjectId(image_id) for image_id in ids)
+
+    async def _build(self) -> ImageManifest:
+        ids = await self._referenced_ids()
+        files: Dict[ObjectId, dict] = {}
+        if ids:
+            cursor = get_database().fs.files.find({"_id": {"$in": ids}}, FILE_PROJECTION)
+            files = {doc["_id"]: doc async for doc in cursor}
+        # Orden por id: el mismo contenido produce siempre la misma versión
+        return ImageManifest([manifest_entry(files[oid]) for oid in ids if oid in files])
+
+    async def get(self) -> ImageManifest:
+        """Manifiesto vigente, reconstruyéndolo si expiró el TTL"""
+        manifest = self._manifest
+        if self._is_fresh(manifest):
+            return manifest
+
+        async with self._lock:
+            manifest = self._manifest
+            if not self._is_fresh(manifest):
+                manifest = await self._build()
+                self._manifest = manifest
+        return manifest
+
+    def invalidate(self):
+        """Forzar la reconstrucción en la siguiente petición"""
+        self._manifest = None
+
+
+# Instancia global del servicio
+image_manifest_service = ImageManifestService()
@@ -0,0 +1,121 @@
+"""
+Pipeline de derivados de imágenes
+Al subir una imagen se encola un trabajo que genera los derivados estándar
+(thumbnail, card, hero en WebP y JPEG, sin EXIF) en el pool de procesos y
+los registra en metadata.variants del original. El placeholder de las
+subidas nuevas (y de imágenes anteriores sin él) se calcula en el mismo
+trabajo, decodificando el original una sola vez.
+"""
+import asyncio
+from typing import List, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.core.placeholders import placeholders
+from app.database import get_database
+from app.services.image_processing import derivative_specs, render_derivatives, variant_key
+from app.services.image_service import (
+    find_file,
+    read_file,
+    run_cpu,
+    shutdown_process_pool,
+    start_process_pool,
+    store_variant,
+)
+
+
+class ImagePipeline:
+    """Cola de trabajos de derivados con workers asíncronos"""
+    
+    def __init__(self, queue_size: int = 1000):
+        self._queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+    
+    def start(self, workers: int):
+        """Iniciar el pool de procesos y un worker asíncrono por proceso"""
+        if self.running:
+            return
+        start_process_pool(workers)
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+    
+    async def stop(self):
+        """Detener los workers (los trabajos pendientes se descartan)"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        shutdown_process_pool()
+    
+    def enqueue(self, file_id: ObjectId) -> bool:
+        """
+        Encolar la generación de derivados de una imagen
+        
+        Returns:
+            False si el pipeline no está iniciado o la cola está llena; los
+            derivados se generarán entonces bajo demanda en la primera vista
+        """
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(file_id)
+        except asyncio.QueueFull:
+            print(f"⚠️  Cola de derivados llena, se omite imagen {file_id}")
+            return False
+        return True
+    
+    async def _worker(self):
+        while True:
+            file_id = await self._queue.get()
+            try:
+                await self.process(file_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error generando derivados de {file_id}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def process(self, file_id: ObjectId) -> int:
+        """
+        Generar y guardar los derivados estándar que aún no existan
+        
+        Returns:
+            Número de derivados generados
+        """
+        original = await find_file(file_id)
+        if not original or (original.get("metadata") or {}).get("variant_of"):
+            return 0
+        
+        metadata = original.get("metadata") or {}
+        existing = metadata.get("variants") or {}
+        specs = [
+            spec for spec in derivative_specs()
+            if variant_key(*spec) not in existing
+        ]
+        needs_placeholder = "placeholder" not in metadata
+        if not specs and not needs_placeholder:
+            return 0
+        
+        data = await read_file(original)
+        rendered, placeholder = await run_cpu(render_derivatives, data, specs, needs_placeholder)
+        for key, content, content_type in rendered:
+            await store_variant(original, key, content, content_type)
+        
+        if needs_placeholder:
+            await get_database().fs.files.update_one(
+                {"_id": file_id}, {"$set": {"metadata.placeholder": placeholder}}
+            )
+            placeholders.set(file_id, placeholder)
+        return len(rendered)
+
+
+# Instancia global del pipeline
+image_pipeline = ImagePipeline(queue_size=settings.IMAGE_PIPELINE_QUEUE_SIZE)
@@ -0,0 +1,316 @@
+"""
+Procesamiento de imágenes (CPU) - Redimensionado y recodificado con Pillow
+Funciones puras sobre bytes, sin dependencias de la app asíncrona, para
+poder ejecutarse en un thread o en otro proceso.
+
+La decodificación está acotada en píxeles (configure_decoder): una imagen
+mayor, o un "decompression bomb", lanza ImageTooLarge en vez de agotar la
+memoria del pod; un archivo que Pillow no puede decodificar lanza
+InvalidImage. Los JPEG se decodifican a escala reducida (draft) cuando
+basta para el tamaño pedido.
+"""
+import base64
+import io
+from contextlib import contextmanager
+from enum import Enum
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+
+class ImageFit(str, Enum):
+    COVER = "cover"      # Recorta para llenar exactamente w x h
+    CONTAIN = "contain"  # Escala para caber en w x h manteniendo proporción
+
+
+class ImageFormat(str, Enum):
+    JPEG = "jpeg"
+    WEBP = "webp"
+    PNG = "png"
+    AVIF = "avif"
+
+
+CONTENT_TYPES = {
+    ImageFormat.JPEG: "image/jpeg",
+    ImageFormat.WEBP: "image/webp",
+    ImageFormat.PNG: "image/png",
+    ImageFormat.AVIF: "image/avif",
+}
+
+# Formatos modernos que se sirven por negociación (Accept), en orden de
+# preferencia al generar; AVIF solo si Pillow se compiló con soporte
+MODERN_FORMATS = tuple(
+    fmt for fmt in (ImageFormat.WEBP, ImageFormat.AVIF)
+    if features.check(fmt.value)
+)
+
+# Formato de salida por defecto según el content type del original
+FORMAT_BY_CONTENT_TYPE = {
+    "image/jpeg": ImageFormat.JPEG,
+    "image/webp": ImageFormat.WEBP,
+    "image/png": ImageFormat.PNG,
+    "image/gif": ImageFormat.PNG,
+    "image/avif": ImageFormat.AVIF,
+}
+
+
+class VariantSpec(NamedTuple):
+    """Parámetros de una variante"""
+    width: Optional[int]
+    height: Optional[int]
+    fit: ImageFit
+    fmt: ImageFormat
+
+
+# Derivados estándar generados al subir una imagen (nombre -> w, h, fit).
+# Usan los mismos parámetros que ?w=&h=&fit=, así que las peticiones bajo
+# demanda equivalentes encuentran el derivado ya guardado.
+DERIVATIVE_PRESETS = {
+    "thumbnail": (160, 160, ImageFit.COVER),
+    "card": (480, None, ImageFit.CONTAIN),
+    "hero": (1280, None, ImageFit.CONTAIN),
+}
+DERIVATIVE_FORMATS = (ImageFormat.WEBP, ImageFormat.JPEG)
+
+# Lado mayor del placeholder embebido en los listados
+PLACEHOLDER_SIZE = 16
+
+# Píxeles máximos a decodificar por defecto (~48 MB en RGB)
+DEFAULT_MAX_PIXELS = 16_000_000
+
+# Etiqueta EXIF de orientación; 5-8 giran 90° (ancho y alto se intercambian)
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+class ImageTooLarge(Exception):
+    """La imagen supera el máximo de píxeles que se decodifican (HTTP 413)"""
+
+
+class InvalidImage(Exception):
+    """El archivo no se puede decodificar como imagen (HTTP 400)"""
+
+
+def configure_decoder(max_pixels: int):
+    """
+    Fijar el límite de píxeles del proceso
+
+    También es el initializer del pool de procesos: cada worker lo aplica
+    al arrancar.
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels
+
+
+configure_decoder(DEFAULT_MAX_PIXELS)
+
+
+@contextmanager
+def _decoding() -> Iterator[None]:
+    """Traducir los errores de decodificación de Pillow a los de este módulo"""
+    try:
+        yield
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage(str(e))
+
+
+def load_image(data: bytes, width: Optional[int] = None, height: Optional[int] = None) -> Image.Image:
+    """
+    Decodificar una imagen comprobando antes su tamaño en píxeles
+
+    Args:
+        width / height: Tamaño final que se necesita (ya orientado); en JPEG
+            se decodifica directamente a la menor escala que lo cubre
+
+    Raises:
+        ImageTooLarge: Más píxeles que Image.MAX_IMAGE_PIXELS
+        InvalidImage: Archivo no decodificable
+    """
+    with _decoding():
+        image = Image.open(io.BytesIO(data))
+        try:
+            limit = Image.MAX_IMAGE_PIXELS
+            if limit and image.width * image.height > limit:
+                raise ImageTooLarge(f"{image.width}x{image.height} píxeles")
+            if image.format == "JPEG" and (width or height):
+                if image.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS:
+                    width, height = height, width
+                image.draft(None, (width or 1, height or 1))
+            image.load()
+        except BaseException:
+            image.close()
+            raise
+    return image
+
+
+def derivative_specs() -> List[VariantSpec]:
+    """
+    Derivados estándar: cada preset x formato, más el tamaño original en
+    cada formato moderno (candidatos de la negociación por Accept)
+    """
+    presets = [
+        VariantSpec(width, height, fit, fmt)
+        for width, height, fit in DERIVATIVE_PRESETS.values()
+        for fmt in DERIVATIVE_FORMATS
+    ]
+    full_size = [VariantSpec(None, None, ImageFit.CONTAIN, fmt) for fmt in MODERN_FORMATS]
+    return presets + full_size
+
+
+# Firmas (magic bytes) de los formatos aceptados en la subida
+SNIFF_BYTES = 12
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """
+    Content type real a partir de los primeros SNIFF_BYTES bytes del archivo
+
+    Returns:
+        "image/jpeg" | "image/png" | "image/gif" | "image/webp", o None
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def variant_key(
+    width: Optional[int],
+    height: Optional[int],
+    fit: ImageFit,
+    fmt: ImageFormat,
+) -> str:
+    """Clave canónica de una variante (ej: "w480-h0-contain-webp")"""
+    return f"w{width or 0}-h{height or 0}-{fit.value}-{fmt.value}"
+
+
+def _prepare(image: Image.Image, fmt: ImageFormat) -> Image.Image:
+    """Convertir al modo de color que admite el formato de salida"""
+    if fmt == ImageFormat.JPEG:
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            # Aplanar transparencia sobre fondo blanco
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image.convert("RGBA"), mask=image.convert("RGBA").getchannel("A"))
+            return background
+        if image.mode not in ("RGB", "L"):
+            return image.convert("RGB")
+        return image
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        return image.convert("RGBA")
+    return image
+
+
+def encode(image: Image.Image, fmt: ImageFormat) -> bytes:
+    """Codificar una imagen sin metadatos EXIF"""
+    image = _prepare(image, fmt)
+    output = io.BytesIO()
+    if fmt == ImageFormat.JPEG:
+        image.save(output, "JPEG", quality=82, optimize=True, progressive=True)
+    elif fmt == ImageFormat.WEBP:
+        image.save(output, "WEBP", quality=80, method=4)
+    elif fmt == ImageFormat.AVIF:
+        image.save(output, "AVIF", quality=50)
+    else:
+        image.save(output, "PNG", optimize=True)
+    return output.getvalue()
+
+
+def resize(
+    image: Image.Image,
+    width: Optional[int],
+    height: Optional[int],
+    fit: ImageFit,
+) -> Image.Image:
+    """
+    Redimensionar sin ampliar nunca el original
+
+    Con fit=cover y ambas dimensiones se recorta centrado al tamaño exacto;
+    en cualquier otro caso se escala para caber en la caja pedida.
+    """
+    src_width, src_height = image.size
+    if fit == ImageFit.COVER and width and height:
+        width, height = min(width, src_width), min(height, src_height)
+        return ImageOps.fit(image, (width, height), method=Image.Resampling.LANCZOS)
+
+    box = (min(width or src_width, src_width), min(height or src_height, src_height))
+    image = image.copy()
+    image.thumbnail(box, Image.Resampling.LANCZOS)
+    return image
+
+
+def render_variant(
+    data: bytes,
+    width: Optional[int],
+    height: Optional[int],
+    fit: ImageFit,
+    fmt: ImageFormat,
+) -> Tuple[bytes, str]:
+    """
+    Generar una variante a partir de los bytes del original
+
+    Returns:
+        (bytes codificados, content type)
+    """
+    with load_image(data, width, height) as image:
+        image = ImageOps.exif_transpose(image)
+        image = resize(image, width, height, fit)
+        return encode(image, fmt), CONTENT_TYPES[fmt]
+
+
+def placeholder_from_image(image: Image.Image) -> str:
+    """Data URI WebP de PLACEHOLDER_SIZE px de lado mayor (~100-300 bytes)"""
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.BILINEAR)
+    tiny = _prepare(tiny, ImageFormat.WEBP)
+    output = io.BytesIO()
+    tiny.save(output, "WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def render_placeholder(data: bytes) -> str:
+    """Calcular el placeholder de una imagen a partir de sus bytes"""
+    # JPEG: decodificar directamente a escala reducida (mucho más rápido)
+    with load_image(data, PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4) as image:
+        return placeholder_from_image(ImageOps.exif_transpose(image))
+
+
+def render_derivatives(
+    data: bytes,
+    specs: List[VariantSpec],
+    with_placeholder: bool = False,
+) -> Tuple[List[Tuple[str, bytes, str]], Optional[str]]:
+    """
+    Generar varias variantes (y el placeholder) decodificando el original una vez
+
+    Pensada para ejecutarse en un ProcessPoolExecutor: recibe y devuelve
+    solo bytes y tipos simples (serializables con pickle).
+
+    Returns:
+        (lista de (clave de variante, bytes codificados, content type),
+         placeholder o None si no se pidió)
+    """
+    # Escala reducida solo si ningún derivado pide el tamaño original
+    width = height = None
+    if not specs:
+        width = height = PLACEHOLDER_SIZE * 4
+    elif all(spec.width or spec.height for spec in specs):
+        width = max((spec.width or 0 for spec in specs), default=0) or None
+        height = max((spec.height or 0 for spec in specs), default=0) or None
+    with load_image(data, width, height) as image:
+        image = ImageOps.exif_transpose(image)
+        results = []
+        for spec in specs:
+            resized = resize(image, spec.width, spec.height, spec.fit)
+            results.append((
+                variant_key(spec.width, spec.height, spec.fit, spec.fmt),
+                encode(resized, spec.fmt),
+                CONTENT_TYPES[spec.fmt],
+            ))
+        placeholder = placeholder_from_image(image) if with_placeholder else None
+        return results, placeholder
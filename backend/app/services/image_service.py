@@ -0,0 +1,668 @@
+"""
+Servicio de imágenes - Metadatos en fs.files y bytes en el BlobStore
+Lectura por bloques, validadores HTTP (ETag / Last-Modified), rangos y
+cache de variantes redimensionadas
+"""
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.config import settings
+from app.database import get_database
+from app.services.blob_store import BlobWriter, DuplicateFile, backend_of, get_blob_store, store_for
+from app.services.image_processing import (
+    CONTENT_TYPES,
+    FORMAT_BY_CONTENT_TYPE,
+    MODERN_FORMATS,
+    SNIFF_BYTES,
+    ImageFit,
+    ImageFormat,
+    configure_decoder,
+    render_variant,
+    sniff_content_type,
+    variant_key,
+)
+
+
+class RangeNotSatisfiable(Exception):
+    """El rango pedido está fuera del archivo (HTTP 416)"""
+
+
+class UploadTooLarge(Exception):
+    """La subida supera el tamaño máximo permitido"""
+
+
+class UnsupportedImageType(Exception):
+    """El contenido no es una imagen de un tipo permitido (según magic bytes)"""
+
+
+async def find_file(oid: ObjectId) -> Optional[dict]:
+    """Obtener el documento de fs.files (sin abrir el stream)"""
+    return await get_database().fs.files.find_one({"_id": oid})
+
+
+def iter_file(file_doc: dict, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Generador asíncrono que entrega el archivo por bloques desde su backend
+
+    Args:
+        file_doc: Documento de fs.files ya leído (sin otra consulta)
+        start: Primer byte a enviar
+        end: Último byte a enviar (inclusive); None hasta el final
+    """
+    return store_for(file_doc).iter_range(file_doc, start, end)
+
+
+async def read_file(file_doc: dict) -> bytes:
+    """Leer un archivo completo (procesamiento de imágenes)"""
+    return await store_for(file_doc).read(file_doc)
+
+
+async def delete_files(file_docs: List[dict]):
+    """
+    Borrar archivos: primero de fs.files (dejan de ser visibles) y después
+    sus bytes en el backend de cada uno
+    """
+    if not file_docs:
+        return
+    await get_database().fs.files.delete_many({"_id": {"$in": [doc["_id"] for doc in file_docs]}})
+    by_backend: Dict[str, List[ObjectId]] = {}
+    for doc in file_docs:
+        by_backend.setdefault(backend_of(doc), []).append(doc["_id"])
+    for backend, ids in by_backend.items():
+        await get_blob_store(backend).delete(ids)
+
+
+async def ensure_image_indexes():
+    """Crear índices de fs.files usados por el servicio (idempotente)"""
+    await get_database().fs.files.create_index(
+        [("metadata.variant_of", 1), ("metadata.variant_key", 1)],
+        name="variant_lookup",
+        unique=True,
+        partialFilterExpression={"metadata.variant_of": {"$exists": True}},
+    )
+    # Deduplicación por contenido de las subidas
+    await get_database().fs.files.create_index(
+        [("metadata.sha256", 1)],
+        name="content_hash",
+        unique=True,
+        partialFilterExpression={"metadata.sha256": {"$exists": True}},
+    )
+
+
+# ============================================
+# VALIDADORES Y PETICIONES CONDICIONALES
+# ============================================
+
+def get_etag(file_doc: dict) -> str:
+    """
+    ETag fuerte del archivo
+
+    Usa el md5 de GridFS (archivos antiguos) o el hash de contenido guardado
+    en metadata; si no hay ninguno, el id del archivo (GridFS es inmutable).
+    """
+    metadata = file_doc.get("metadata") or {}
+    tag = file_doc.get("md5") or metadata.get("sha256") or f"{file_doc['_id']}-{file_doc['length']}"
+    return f'"{tag}"'
+
+
+def get_last_modified(file_doc: dict) -> datetime:
+    """uploadDate en UTC truncado a segundos (resolución de HTTP-date)"""
+    return file_doc["uploadDate"].replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def validator_headers(file_doc: dict) -> dict:
+    """Cabeceras ETag y Last-Modified"""
+    return {
+        "ETag": get_etag(file_doc),
+        "Last-Modified": format_datetime(get_last_modified(file_doc), usegmt=True),
+    }
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (ignora el prefijo W/)"""
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def is_not_modified(headers, file_doc: dict) -> bool:
+    """Evaluar las cabeceras condicionales contra un documento de fs.files"""
+    return is_not_modified_by(headers, get_etag(file_doc), get_last_modified(file_doc))
+
+
+def is_not_modified_by(headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Evaluar If-None-Match / If-Modified-Since (RFC 9110 §13.2.2)
+
+    If-None-Match tiene prioridad; If-Modified-Since solo se evalúa si no
+    viene If-None-Match.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and last_modified <= since
+    return False
+
+
+def cached_not_modified(headers, cached_headers: dict) -> bool:
+    """Evaluar las cabeceras condicionales contra una respuesta guardada"""
+    return is_not_modified_by(
+        headers,
+        cached_headers.get("ETag", ""),
+        _parse_http_date(cached_headers.get("Last-Modified", "")),
+    )
+
+
+def parse_range(headers, file_doc: dict) -> Optional[Tuple[int, int]]:
+    """
+    Interpretar la cabecera Range (un único rango de bytes)
+
+    Returns:
+        (start, end) inclusivo, o None si se debe enviar el archivo completo
+        (sin Range, varios rangos, sintaxis inválida o If-Range que no coincide)
+
+    Raises:
+        RangeNotSatisfiable: Si el rango empieza después del final del archivo
+    """
+    header = headers.get("range")
+    if not header or not header.startswith("bytes="):
+        return None
+
+    if_range = headers.get("if-range")
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            if if_range != get_etag(file_doc):
+                return None
+        else:
+            since = _parse_http_date(if_range)
+            if since is None or get_last_modified(file_doc) > since:
+                return None
+
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+
+    length = file_doc["length"]
+    if length == 0:
+        raise RangeNotSatisfiable()
+    first, _, last = spec.partition("-")
+    try:
+        if not first:
+            # bytes=-N -> últimos N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(length - suffix, 0), length - 1
+        start = int(first)
+        end = int(last) if last else length - 1
+    except ValueError:
+        return None
+
+    if start >= length:
+        raise RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, length - 1)
+
+
+# ============================================
+# POOL DE PROCESOS (CPU)
+# ============================================
+
+# Decodificar / redimensionar / codificar es CPU puro: se ejecuta en otros
+# procesos para no bloquear el event loop ni competir por el GIL.
+# Los workers se crean con spawn: un fork heredaría el event loop y los
+# sockets de Motor del proceso principal.
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def start_process_pool(workers: int):
+    """Crear el pool de procesos de imágenes (startup)"""
+    global _process_pool
+    if _process_pool is None:
+        configure_decoder(settings.IMAGE_MAX_PIXELS)
+        _process_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=configure_decoder,
+            initargs=(settings.IMAGE_MAX_PIXELS,),
+        )
+
+
+def shutdown_process_pool():
+    """Cerrar el pool de procesos (shutdown)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+async def run_cpu(func: Callable, *args):
+    """
+    Ejecutar una función de app.services.image_processing fuera del event loop
+
+    Usa el pool de procesos si está iniciado; si no (scripts), un thread.
+    """
+    if _process_pool is None:
+        return await asyncio.to_thread(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(_process_pool, func, *args)
+
+
+# ============================================
+# SUBIDA EN STREAMING
+# ============================================
+
+async def store_upload(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    uploaded_by: str,
+    max_bytes: int,
+    extra_metadata: Optional[dict] = None,
+) -> dict:
+    """
+    Guardar una subida a medida que llega
+
+    Cada chunk recibido se escribe directamente en el BlobStore configurado
+    llevando la cuenta de bytes y el SHA-256; al superar max_bytes se aborta
+    (se descarta lo ya escrito). El content type se obtiene de los magic
+    bytes del inicio del archivo, no del declarado por el cliente.
+
+    Si ya existe un archivo con el mismo SHA-256 se descarta lo escrito, se
+    incrementa su metadata.refcount y se devuelve ese archivo.
+
+    No se guarda el archivo en memoria: el placeholder de una subida nueva
+    lo calcula después image_pipeline desde el blob guardado (hasta
+    entonces "placeholder" es None).
+
+    Returns:
+        {"_id", "filename", "content_type", "length", "placeholder", "deduplicated"}
+
+    Raises:
+        UploadTooLarge: Si el archivo supera max_bytes
+        UnsupportedImageType: Si los magic bytes no son de un formato permitido
+    """
+    store = get_blob_store()
+    file_id = ObjectId()
+    writer: Optional[BlobWriter] = None
+    committed = False
+    head = b""
+    content_type = None
+    size = 0
+    digest = hashlib.sha256()
+    
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            
+            if writer is None:
+                # Esperar a tener la cabecera completa para validar el tipo
+                head += chunk
+                if len(head) < SNIFF_BYTES:
+                    continue
+                content_type = sniff_content_type(head)
+                if content_type is None:
+                    raise UnsupportedImageType()
+                writer = await store.open_writer(file_id, filename)
+                chunk, head = head, b""
+            
+            await writer.write(chunk)
+            digest.update(chunk)
+        
+        if writer is None:
+            # Archivo más corto que la cabecera
+            content_type = sniff_content_type(head)
+            if content_type is None:
+                raise UnsupportedImageType()
+            writer = await store.open_writer(file_id, filename)
+            await writer.write(head)
+            digest.update(head)
+        
+        sha256 = digest.hexdigest()
+        existing = await acquire_existing(sha256)
+        if existing:
+            return _upload_result(existing, deduplicated=True)
+        
+        try:
+            # Sin "placeholder": image_pipeline lo calcula con los derivados
+            await writer.commit({
+                **(extra_metadata or {}),
+                "content_type": content_type,
+                "uploaded_by": uploaded_by,
+                "sha256": sha256,
+                "refcount": 1,
+                "backend": store.name,
+            })
+            committed = True
+        except DuplicateFile:
+            # Otra subida del mismo contenido terminó primero
+            committed = True  # El writer ya descartó sus bytes
+            existing = await acquire_existing(sha256)
+            if existing is None:
+                raise
+            return _upload_result(existing, deduplicated=True)
+    finally:
+        if writer is not None and not committed:
+            await writer.abort()
+    
+    return {
+        "_id": file_id,
+        "filename": filename,
+        "content_type": content_type,
+        "length": size,
+        "placeholder": None,
+        "deduplicated": False,
+    }
+
+
+def _upload_result(file_doc: dict, deduplicated: bool) -> dict:
+    metadata = file_doc.get("metadata") or {}
+    return {
+        "_id": file_doc["_id"],
+        "filename": file_doc.get("filename"),
+        "content_type": metadata.get("content_type"),
+        "length": file_doc["length"],
+        "placeholder": metadata.get("placeholder"),
+        "deduplicated": deduplicated,
+    }
+
+
+async def acquire_existing(sha256: str) -> Optional[dict]:
+    """
+    Sumar una referencia al archivo con ese contenido, si existe
+
+    Los archivos sin refcount (anteriores a la deduplicación) cuentan como
+    una referencia, así que pasan a 2. metadata.acquired_at protege al
+    archivo reutilizado del GC durante el periodo de gracia, igual que una
+    subida nueva.
+    """
+    return await get_database().fs.files.find_one_and_update(
+        {"metadata.sha256": sha256},
+        [{"$set": {
+            "metadata.refcount": {"$add": [{"$ifNull": ["$metadata.refcount", 1]}, 1]},
+            "metadata.acquired_at": datetime.utcnow(),
+        }}],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def release_image(file_id: ObjectId) -> Optional[bool]:
+    """
+    Quitar una referencia a una imagen original
+
+    Solo se borra el archivo (y sus variantes) cuando era la última
+    referencia; los archivos sin refcount (anteriores a la deduplicación)
+    cuentan como una sola. El borrado es condicional al refcount: si un
+    acquire_existing concurrente sumó una referencia entre medias, no se
+    borra y se vuelve a intentar el decremento.
+
+    Returns:
+        True si se borró, False si sigue referenciada, None si no existe
+    """
+    files = get_database().fs.files
+    while True:
+        released = await files.find_one_and_update(
+            {"_id": file_id, "metadata.refcount": {"$gt": 1}},
+            {"$inc": {"metadata.refcount": -1}},
+        )
+        if released:
+            return False
+        
+        file_doc = await files.find_one_and_delete(
+            {"_id": file_id, "$or": [
+                {"metadata.refcount": {"$lte": 1}},
+                {"metadata.refcount": {"$exists": False}},
+            ]},
+            projection={"metadata.backend": 1},
+        )
+        if file_doc:
+            # El documento ya no es visible: borrar sus bytes y variantes
+            await store_for(file_doc).delete([file_id])
+            await delete_variants(file_id)
+            return True
+        
+        if not await files.count_documents({"_id": file_id}, limit=1):
+            return None
+
+
+# ============================================
+# VARIANTES REDIMENSIONADAS
+# ============================================
+
+# Generaciones en curso en este proceso: (id original, clave) -> Future
+_inflight: Dict[Tuple[ObjectId, str], asyncio.Future] = {}
+
+
+async def find_variant(original_id: ObjectId, key: str) -> Optional[dict]:
+    """Buscar una variante ya generada"""
+    return await get_database().fs.files.find_one(
+        {"metadata.variant_of": original_id, "metadata.variant_key": key}
+    )
+
+
+async def store_variant(original: dict, key: str, data: bytes, content_type: str) -> dict:
+    """
+    Guardar una variante en el BlobStore configurado
+
+    Si otra réplica la guardó primero (índice único), se descartan los
+    bytes propios y se devuelve la existente. La variante queda anotada en
+    metadata.variants del original.
+    """
+    store = get_blob_store()
+    file_id = ObjectId()
+    extension = content_type.split("/")[-1]
+    filename = f"{original.get('filename') or original['_id']}-{key}.{extension}"
+    writer = await store.open_writer(file_id, filename)
+    try:
+        await writer.write(data)
+        await writer.commit({
+            "content_type": content_type,
+            "variant_of": original["_id"],
+            "variant_key": key,
+            "backend": store.name,
+        })
+    except DuplicateFile:
+        # Otra réplica guardó la misma variante primero
+        variant = await find_variant(original["_id"], key)
+    except BaseException:
+        await writer.abort()
+        raise
+    else:
+        variant = await find_file(file_id)
+    
+    await get_database().fs.files.update_one(
+        {"_id": original["_id"]},
+        {"$set": {f"metadata.variants.{key}": {
+            "id": variant["_id"],
+            "length": variant["length"],
+            "content_type": content_type,
+        }}}
+    )
+    return variant
+
+
+async def _create_variant(
+    original: dict,
+    key: str,
+    width: Optional[int],
+    height: Optional[int],
+    fit: ImageFit,
+    fmt: ImageFormat,
+) -> dict:
+    data = await read_file(original)
+    rendered, content_type = await run_cpu(render_variant, data, width, height, fit, fmt)
+    return await store_variant(original, key, rendered, content_type)
+
+
+async def get_or_create_variant(
+    original: dict,
+    width: Optional[int],
+    height: Optional[int],
+    fit: ImageFit,
+    fmt: ImageFormat,
+) -> dict:
+    """
+    Obtener el documento de fs.files de una variante, generándola si no existe
+
+    Las peticiones concurrentes de la misma variante en este proceso
+    comparten una única generación.
+    """
+    key = variant_key(width, height, fit, fmt)
+    existing = await find_variant(original["_id"], key)
+    if existing:
+        return existing
+
+    inflight_key = (original["_id"], key)
+    future = _inflight.get(inflight_key)
+    if future is None:
+        future = asyncio.ensure_future(_create_variant(original, key, width, height, fit, fmt))
+        _inflight[inflight_key] = future
+        future.add_done_callback(lambda _: _inflight.pop(inflight_key, None))
+    return await asyncio.shield(future)
+
+
+def default_format(file_doc: dict) -> ImageFormat:
+    """Formato de salida por defecto: el mismo del original si es posible"""
+    content_type = (file_doc.get("metadata") or {}).get("content_type", "image/jpeg")
+    return FORMAT_BY_CONTENT_TYPE.get(content_type, ImageFormat.JPEG)
+
+
+async def delete_variants(original_id: ObjectId):
+    """Eliminar todas las variantes generadas de un original"""
+    variants = await get_database().fs.files.find(
+        {"metadata.variant_of": original_id}, {"metadata.backend": 1}
+    ).to_list(length=None)
+    await delete_files(variants)
+
+
+# ============================================
+# NEGOCIACIÓN DE FORMATO (Accept)
+# ============================================
+
+def accepted_formats(accept: Optional[str]) -> List[ImageFormat]:
+    """
+    Formatos modernos que el cliente declara explícitamente en Accept
+
+    Los comodines (image/*, */*) no cuentan: navegadores sin soporte de WebP
+    también los envían. Un q=0 excluye el formato.
+    """
+    if not accept:
+        return []
+    accepted = set()
+    for media_range in accept.split(","):
+        media_type, *params = media_range.strip().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(media_type.strip().lower())
+    return [fmt for fmt in MODERN_FORMATS if CONTENT_TYPES[fmt] in accepted]
+
+
+async def negotiate_variant(
+    original: dict,
+    accept: Optional[str],
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: ImageFit = ImageFit.CONTAIN,
+) -> dict:
+    """
+    Elegir la representación más pequeña que acepta el cliente
+
+    Candidatos: las variantes ya generadas (metadata.variants) en formatos
+    aceptados con los mismos w / h / fit. Sin w ni h, el original también
+    es candidato y es el fallback. Con w o h y sin candidatos, se genera la
+    variante en el primer formato moderno aceptado (o el del original).
+    """
+    formats = accepted_formats(accept)
+    variants = (original.get("metadata") or {}).get("variants") or {}
+    sized = width is not None or height is not None
+    
+    candidates = []
+    for fmt in formats + ([default_format(original)] if sized else []):
+        entry = variants.get(variant_key(width, height, fit, fmt))
+        if entry:
+            candidates.append(entry)
+    if not sized:
+        candidates.append({"id": original["_id"], "length": original["length"]})
+    
+    for entry in sorted(candidates, key=lambda item: item["length"]):
+        if entry["id"] == original["_id"]:
+            return original
+        variant = await find_file(entry["id"])
+        if variant:
+            return variant
+    
+    if not sized:
+        return original
+    return await get_or_create_variant(
+        original, width, height, fit, formats[0] if formats else default_format(original)
+    )
+
+
+def representation_key(
+    image_id: str,
+    width: Optional[int],
+    height: Optional[int],
+    fit: Optional[ImageFit],
+    fmt: Optional[ImageFormat],
+    accept: Optional[str],
+) -> str:
+    """
+    Clave de la representación que recibirá una petición, sin consultar la BD
+
+    Con format explícito es la variante; si no, depende de los formatos
+    modernos aceptados (mismo criterio que negotiate_variant).
+    """
+    fit = fit or ImageFit.CONTAIN
+    if fmt is not None:
+        return f"{image_id}:{variant_key(width, height, fit, fmt)}"
+    negotiated = "+".join(f.value for f in accepted_formats(accept)) or "original"
+    return f"{image_id}:w{width or 0}-h{height or 0}-{fit.value}:{negotiated}"
+
+
+def negotiation_complete(
+    original: dict,
+    accept: Optional[str],
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: ImageFit = ImageFit.CONTAIN,
+) -> bool:
+    """
+    Si ya existen todas las variantes candidatas de la negociación
+
+    Mientras falten (derivados aún en la cola), el resultado puede cambiar
+    y no conviene fijarlo en un cache.
+    """
+    variants = (original.get("metadata") or {}).get("variants") or {}
+    return all(
+        variant_key(width, height, fit, fmt) in variants
+        for fmt in accepted_formats(accept)
+    )
@@ -0,0 +1,28 @@
+"""
+Cache de respuestas pre-serializadas de alertas y rutas
+Cada documento se convierte a su respuesta JSON una sola vez
+
+Las alertas usan el canal del broadcaster de alertas (sus avisos ya llevan
+el id como clave); las rutas no tienen broadcaster y anuncian sus
+escrituras en su propio canal.
+"""
+from app.core import mappers
+from app.core.fragments import FragmentCache
+from app.core.responses import dumps
+from app.models.alert import Alert
+from app.models.route import Route
+
+
+def alert_json(doc: dict) -> bytes:
+    """Serializar un documento crudo de alerta como AlertResponse"""
+    return dumps(mappers.alert(doc))
+
+
+def route_json(doc: dict) -> bytes:
+    """Serializar un documento crudo de ruta como RouteResponse"""
+    return dumps(mappers.route(doc))
+
+
+# Instancias globales
+alert_fragments = FragmentCache(Alert, alert_json, channel="alerts")
+route_fragments = FragmentCache(Route, route_json, channel="routes")
@@ -0,0 +1 @@
+# Benchmarks de rendimiento (scripts, no forman parte de la API)
@@ -0,0 +1,135 @@
+"""
+Benchmark - Reparto de mensajes SSE a muchos suscriptores
+
+Compara el broadcaster previo (asyncio.Lock alrededor del reparto y un
+f-string por cliente al entregar) contra app.core.broadcast (frame SSE
+codificado una vez, conjunto de clientes copy-on-write sin lock).
+
+Mide por mensaje:
+    fan-out   -> tiempo de broadcast() (encolar en todos los clientes)
+    entrega   -> desde broadcast() hasta que el último suscriptor lo recibe
+
+Uso (desde backend/):
+    python -m benchmarks.bench_broadcast --subscribers 10000 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import AsyncGenerator, List, Set
+
+from app.core.broadcast import EventBroadcaster
+from app.core.broadcast_transport import InProcessTransport
+
+
+class LegacyBroadcaster:
+    """Broadcaster previo (copiado de app.core.broadcast antes del cambio)"""
+
+    def __init__(self):
+        self.clients: Set[asyncio.Queue] = set()
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        async with self._lock:
+            self.clients.add(queue)
+        try:
+            yield f"data: {json.dumps({'type': 'connected'})}\n\n"
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                yield f"data: {message}\n\n"
+        finally:
+            async with self._lock:
+                self.clients.discard(queue)
+
+    async def broadcast(self, event_type: str, data: dict):
+        if not self.clients:
+            return
+        message = json.dumps({"type": event_type, "data": data})
+        disconnected_clients = []
+        async with self._lock:
+            for queue in self.clients:
+                try:
+                    queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    disconnected_clients.append(queue)
+        if disconnected_clients:
+            async with self._lock:
+                for queue in disconnected_clients:
+                    self.clients.discard(queue)
+
+    def get_active_connections(self) -> int:
+        return len(self.clients)
+
+
+ALERT = {
+    "_id": "65f0c0ffee0000000000beef", "title": "Cierre vial por Festival de Luces",
+    "description": "Cierre de calles del Centro Histórico", "type": "cierre",
+    "location": "Centro", "coordinates": {"lat": -2.8974, "lng": -79.0045},
+    "start_date": "2026-11-02T18:00:00", "end_date": "2026-11-03T02:00:00", "is_active": True,
+}
+
+
+async def run_case(broadcaster, subscribers: int, messages: int):
+    """Devuelve (lista de µs de fan-out, lista de ms de entrega)"""
+    remaining = 0
+    all_received = asyncio.Event()
+
+    async def consume():
+        nonlocal remaining
+        stream = broadcaster.subscribe()
+        await stream.__anext__()  # Frame de conexión
+        ready.release()
+        async for _ in stream:
+            remaining -= 1
+            if remaining == 0:
+                all_received.set()
+
+    ready = asyncio.Semaphore(0)
+    tasks = [asyncio.create_task(consume()) for _ in range(subscribers)]
+    for _ in range(subscribers):
+        await ready.acquire()
+
+    fanout_us: List[float] = []
+    delivery_ms: List[float] = []
+    for _ in range(messages):
+        remaining = subscribers
+        all_received.clear()
+        start = time.perf_counter()
+        await broadcaster.broadcast("update", ALERT)
+        fanout_us.append((time.perf_counter() - start) * 1e6)
+        await all_received.wait()
+        delivery_ms.append((time.perf_counter() - start) * 1e3)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return fanout_us, delivery_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.subscribers} suscriptores, {args.messages} mensajes")
+    print(f"{'broadcaster':<12} {'fan-out p50 µs':>15} {'fan-out p99 µs':>15} {'entrega p50 ms':>15} {'entrega p99 ms':>15}")
+    cases = (
+        ("legacy", LegacyBroadcaster),
+        ("cow", lambda: EventBroadcaster("bench", transport=InProcessTransport())),
+    )
+    for name, factory in cases:
+        fanout, delivery = asyncio.run(run_case(factory(), args.subscribers, args.messages))
+        p99 = max(1, int(len(fanout) * 0.99)) - 1
+        print(
+            f"{name:<12} {statistics.median(fanout):15.0f} {sorted(fanout)[p99]:15.0f}"
+            f" {statistics.median(delivery):15.2f} {sorted(delivery)[p99]:15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark - Throughput de GET /events/ con 100 eventos por respuesta
+
+Compara tres caminos sobre los mismos datos sintéticos (sin MongoDB):
+    1. baseline:  EventSummary + response_model + JSONResponse (stdlib json)
+    2. orjson:    mismo handler con FastJSONResponse como clase por defecto
+    3. catalog:   router real de /events/ servido desde el catálogo en memoria
+
+Uso (desde backend/):
+    python -m benchmarks.bench_events_list --requests 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.core.responses import FastJSONResponse
+from app.models.event import EventCategory
+from app.schemas.event import EventSummary
+from app.services.event_catalog import event_catalog
+
+
+def make_docs(count: int) -> List[dict]:
+    """Documentos crudos de eventos con la forma que devuelve MongoDB"""
+    categories = [category.value for category in EventCategory]
+    base = datetime.utcnow()
+    docs = [
+        {
+            "_id": ObjectId(),
+            "title": f"Evento cultural número {i}",
+            "description": "Descripción del evento con algo de texto para simular el tamaño real",
+            "date": base + timedelta(hours=random.randint(-2000, 2000), minutes=random.randint(0, 59)),
+            "time": f"{random.randint(8, 22):02d}:00",
+            "location": "Centro Histórico",
+            "coordinates": {"type": "Point", "coordinates": [-79.0045, -2.8974]},
+            "category": random.choice(categories),
+            "image_id": ObjectId() if i % 3 else None,
+        }
+        for i in range(count)
+    ]
+    docs.sort(key=lambda doc: doc["date"])
+    return docs
+
+
+def build_legacy_app(docs: List[dict], response_class) -> FastAPI:
+    """App con el handler previo de /events/ (construcción de EventSummary por petición)"""
+    app = FastAPI(default_response_class=response_class)
+    page = docs[-100:][::-1]
+
+    @app.get(f"{settings.API_V1_PREFIX}/events/", response_model=List[EventSummary])
+    async def get_events():
+        return [
+            EventSummary(
+                _id=str(doc["_id"]),
+                title=doc["title"],
+                description=doc["description"],
+                date=doc["date"],
+                time=doc["time"],
+                location=doc["location"],
+                coordinates={"lat": doc["coordinates"]["coordinates"][1], "lng": doc["coordinates"]["coordinates"][0]},
+                category=doc["category"],
+                image_url=f"/api/v1/images/{doc['image_id']}" if doc.get("image_id") else None
+            )
+            for doc in page
+        ]
+
+    return app
+
+
+def build_catalog_app(docs: List[dict]) -> FastAPI:
+    """App con el router real de eventos y el catálogo precargado"""
+    from app.routers import events
+
+    event_catalog._fill(docs)
+    event_catalog.loaded_at = time.monotonic() + 10**9  # nunca se considera viejo
+
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.include_router(events.router, prefix=settings.API_V1_PREFIX)
+    return app
+
+
+async def measure(app: FastAPI, requests: int, concurrency: int) -> float:
+    """Ejecutar `requests` GET /events/?limit=100 y devolver peticiones por segundo"""
+    transport = httpx.ASGITransport(app=app)
+    url = f"{settings.API_V1_PREFIX}/events/?limit=100"
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get(url)
+        response.raise_for_status()
+        assert len(response.json()) == 100
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await client.get(url)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+
+    docs = make_docs(args.events)
+    variants = [
+        ("baseline (JSONResponse)", build_legacy_app(docs, JSONResponse)),
+        ("orjson (FastJSONResponse)", build_legacy_app(docs, FastJSONResponse)),
+        ("catálogo en memoria", build_catalog_app(docs)),
+    ]
+
+    baseline = None
+    print(f"GET /events/?limit=100 — {args.requests} peticiones, concurrencia {args.concurrency}")
+    for name, app in variants:
+        rps = await measure(app, args.requests, args.concurrency)
+        baseline = baseline or rps
+        print(f"  {name:<28} {rps:10.1f} req/s   x{rps / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+Benchmark - Conversión documento crudo -> JSON de respuesta
+
+Compara, por documento, la construcción previa en los routers (schema
+pydantic campo a campo + serialización) contra los mappers de
+app.core.mappers + orjson.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_mappers --docs 100 --rounds 200
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from bson import ObjectId
+
+from app.core import mappers
+from app.core.responses import dumps
+from app.schemas.alert import AlertResponse
+from app.schemas.event import EventResponse, EventSummary
+from app.schemas.route import RouteResponse
+
+
+def make_event(i: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "title": f"Evento {i}",
+        "description": "Descripción del evento con algo de texto",
+        "long_description": "Texto largo " * 20,
+        "date": now + timedelta(days=i),
+        "time": "18:00",
+        "end_time": "23:00",
+        "location": "Centro Histórico",
+        "address": "Parque Calderón",
+        "coordinates": {"type": "Point", "coordinates": [-79.0045, -2.8974]},
+        "category": "cultural",
+        "image_id": ObjectId(),
+        "gallery": [ObjectId() for _ in range(4)],
+        "itinerary": [{"time": "18:00", "activity": "Apertura"}, {"time": "20:00", "activity": "Concierto"}],
+        "closed_streets": ["Benigno Malo", "Simón Bolívar"],
+        "testimonials": [{"user_id": ObjectId(), "name": "Ana", "comment": "Excelente evento", "rating": 5, "created_at": now}],
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def make_alert(i: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(), "title": f"Alerta {i}", "description": "Cierre de calles",
+        "type": "cierre", "location": "Centro", "is_active": True,
+        "coordinates": {"type": "Point", "coordinates": [-79.0045, -2.8974]},
+        "start_date": now, "end_date": now + timedelta(days=1), "image_id": ObjectId(), "created_at": now,
+    }
+
+
+def make_route(i: int) -> dict:
+    return {
+        "_id": ObjectId(), "name": f"Ruta {i}", "description": "Recorrido", "category": "cultural",
+        "duration": "2 horas", "distance": "3 km", "difficulty": "facil", "image_id": ObjectId(),
+        "events": [ObjectId(), ObjectId()], "created_at": datetime.utcnow(),
+        "stops": [{"name": f"Parada {n}", "coordinates": {"type": "Point", "coordinates": [-79.0, -2.9]}} for n in range(5)],
+    }
+
+
+def _lat_lng(point: dict) -> dict:
+    return {"lat": point["coordinates"][1], "lng": point["coordinates"][0]}
+
+
+# Construcción previa (copiada de los routers antes de los mappers)
+def legacy_summary(doc: dict) -> bytes:
+    return EventSummary(
+        _id=str(doc["_id"]), title=doc["title"], description=doc["description"], date=doc["date"],
+        time=doc["time"], location=doc["location"], coordinates=_lat_lng(doc["coordinates"]),
+        category=doc["category"], image_url=f"/api/v1/images/{doc['image_id']}" if doc.get("image_id") else None,
+    ).model_dump_json(by_alias=True).encode()
+
+
+def legacy_detail(doc: dict) -> bytes:
+    return EventResponse(
+        _id=str(doc["_id"]), title=doc["title"], description=doc["description"],
+        long_description=doc.get("long_description"), date=doc["date"], time=doc["time"],
+        end_time=doc.get("end_time"), location=doc["location"], address=doc.get("address"),
+        coordinates=_lat_lng(doc["coordinates"]), category=doc["category"],
+        image_url=f"/api/v1/images/{doc['image_id']}" if doc.get("image_id") else None,
+        gallery=[f"/api/v1/images/{img}" for img in doc["gallery"]], itinerary=doc["itinerary"],
+        closed_streets=doc["closed_streets"],
+        testimonials=[{**t, "user_id": str(t["user_id"])} for t in doc["testimonials"]],
+        created_at=doc["created_at"], updated_at=doc["updated_at"],
+    ).model_dump_json(by_alias=True).encode()
+
+
+def legacy_alert(doc: dict) -> bytes:
+    return AlertResponse(
+        _id=str(doc["_id"]), title=doc["title"], description=doc["description"], type=doc["type"],
+        location=doc["location"], coordinates=_lat_lng(doc["coordinates"]), start_date=doc["start_date"],
+        end_date=doc["end_date"], image_url=f"/api/v1/images/{doc['image_id']}", is_active=doc["is_active"],
+        created_at=doc["created_at"],
+    ).model_dump_json(by_alias=True).encode()
+
+
+def legacy_route(doc: dict) -> bytes:
+    return RouteResponse(
+        _id=str(doc["_id"]), name=doc["name"], description=doc["description"], category=doc["category"],
+        duration=doc["duration"], distance=doc["distance"], difficulty=doc["difficulty"],
+        image_url=f"/api/v1/images/{doc['image_id']}", events=[str(e) for e in doc["events"]],
+        stops=[{"name": s["name"], "coordinates": _lat_lng(s["coordinates"])} for s in doc["stops"]],
+        created_at=doc["created_at"],
+    ).model_dump_json(by_alias=True).encode()
+
+
+def timed(convert: Callable[[dict], bytes], docs: List[dict], rounds: int) -> float:
+    """Microsegundos por documento"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for doc in docs:
+            convert(doc)
+    return (time.perf_counter() - start) / (rounds * len(docs)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = [
+        ("EventSummary", [make_event(i) for i in range(args.docs)], legacy_summary, mappers.event_summary),
+        ("EventResponse", [make_event(i) for i in range(args.docs)], legacy_detail, mappers.event_detail),
+        ("AlertResponse", [make_alert(i) for i in range(args.docs)], legacy_alert, mappers.alert),
+        ("RouteResponse", [make_route(i) for i in range(args.docs)], legacy_route, mappers.route),
+    ]
+
+    print(f"{'recurso':<15} {'pydantic µs/doc':>16} {'mapper µs/doc':>14} {'speedup':>8}")
+    for name, docs, legacy, mapper in cases:
+        before = timed(legacy, docs, args.rounds)
+        after = timed(lambda doc: dumps(mapper(doc)), docs, args.rounds)
+        print(f"{name:<15} {before:16.2f} {after:14.2f} {before / after:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
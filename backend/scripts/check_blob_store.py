@@ -0,0 +1,120 @@
+"""
+Script para comprobar un backend de almacenamiento de imágenes (BlobStore)
+Contra el backend real (p.ej. MinIO) hace el ciclo completo de una imagen:
+preparar el backend (crea el bucket si falta), escribir en streaming, leer
+entera y por rangos, rechazar un duplicado por sha256 descartando sus
+bytes, y borrar. Los documentos de prueba de fs.files se eliminan al final.
+
+Para S3 con el MinIO de docker-compose:
+    docker compose --profile s3 up -d mongodb minio
+
+Uso (desde backend/):
+    MONGODB_URL="mongodb://localhost:27017/?directConnection=true" \\
+    S3_ENDPOINT_URL=http://localhost:9000 S3_REGION=us-east-1 \\
+    S3_ACCESS_KEY_ID=minioadmin S3_SECRET_ACCESS_KEY=minioadmin \\
+        python scripts/check_blob_store.py --backend s3
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+# Permitir importar app.* al ejecutar el script directamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from bson import ObjectId
+
+from app.database import connect_to_mongodb, close_mongodb_connection, get_database
+from app.services.blob_store import STREAM_CHUNK_SIZE, DuplicateFile, get_blob_store
+from app.services.image_service import ensure_image_indexes
+
+
+async def write(store, file_id: ObjectId, data: bytes, sha256: str):
+    """Guardar `data` en bloques como lo hace store_upload"""
+    writer = await store.open_writer(file_id, f"check-{file_id}.bin")
+    for offset in range(0, len(data), STREAM_CHUNK_SIZE):
+        await writer.write(data[offset:offset + STREAM_CHUNK_SIZE])
+    await writer.commit({
+        "content_type": "application/octet-stream",
+        "sha256": sha256,
+        "refcount": 1,
+        "backend": store.name,
+        "blob_store_check": True,
+    })
+
+
+async def is_readable(store, file_doc: dict) -> bool:
+    try:
+        await store.read(file_doc)
+        return True
+    except Exception:
+        return False
+
+
+async def run(backend: str, size: int) -> bool:
+    print("=" * 60)
+    print(f"🗄️  Comprobación del backend de imágenes '{backend}' ({size} bytes)")
+    print("=" * 60)
+
+    await connect_to_mongodb()
+    files = get_database().fs.files
+    results = []
+
+    def check(name: str, ok: bool):
+        results.append(ok)
+        print(f"   {'✅' if ok else '❌'} {name}")
+
+    try:
+        store = get_blob_store(backend)
+        await store.ensure_ready()
+        check("Backend preparado (bucket / directorio)", True)
+        await ensure_image_indexes()
+
+        data = os.urandom(size)
+        sha256 = hashlib.sha256(data).hexdigest()
+        file_id = ObjectId()
+        await write(store, file_id, data, sha256)
+        file_doc = await files.find_one({"_id": file_id})
+        check("Archivo registrado en fs.files", file_doc is not None and file_doc["length"] == size)
+
+        check("Lectura completa", await store.read(file_doc) == data)
+        start, end = size // 3, size // 3 + STREAM_CHUNK_SIZE
+        ranged = b"".join([chunk async for chunk in store.iter_range(file_doc, start, end)])
+        check(f"Lectura del rango {start}-{end}", ranged == data[start:end + 1])
+
+        duplicate_id = ObjectId()
+        try:
+            await write(store, duplicate_id, data, sha256)
+            check("Duplicado rechazado por sha256", False)
+        except DuplicateFile:
+            check("Duplicado rechazado por sha256", True)
+        duplicate_doc = {"_id": duplicate_id, "length": size, "chunkSize": STREAM_CHUNK_SIZE}
+        check("Bytes del duplicado descartados", not await is_readable(store, duplicate_doc))
+
+        await files.delete_one({"_id": file_id})
+        await store.delete([file_id])
+        check("Borrado", not await is_readable(store, file_doc))
+    except Exception as e:
+        check(f"Error inesperado: {type(e).__name__}: {e}", False)
+    finally:
+        await files.delete_many({"metadata.blob_store_check": True})
+        await close_mongodb_connection()
+
+    ok = all(results)
+    print("=" * 60)
+    print("✅ Backend correcto" if ok else "❌ Hay comprobaciones fallidas")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["gridfs", "filesystem", "s3"], default="s3")
+    parser.add_argument("--size", type=int, default=3 * STREAM_CHUNK_SIZE + 1234)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.backend, args.size))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
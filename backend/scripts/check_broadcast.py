@@ -0,0 +1,107 @@
+"""
+Script para comprobar el broadcast entre réplicas por change streams
+Simula varios pods en un mismo proceso: cada uno con su propio transporte
+mongodb y su broadcaster, con un cliente SSE conectado. Publica mensajes
+desde pods distintos y verifica que cada cliente recibe todos exactamente
+una vez, en el mismo orden y con los mismos ids.
+
+Requiere MongoDB con replica set, p.ej. el de docker-compose:
+    docker compose up -d mongodb
+
+Uso (desde backend/):
+    MONGODB_URL="mongodb://localhost:27017/?directConnection=true" \\
+        python scripts/check_broadcast.py --pods 3 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Permitir importar app.* al ejecutar el script directamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.config import settings
+from app.core.broadcast import EventBroadcaster
+from app.core.broadcast_transport import MongoChangeStreamTransport
+from app.database import connect_to_mongodb, close_mongodb_connection
+
+CHANNEL = "broadcast-check"
+
+
+async def collect(stream, expected: int, received: list):
+    """Leer frames de un cliente hasta recibir `expected` mensajes"""
+    async for frame in stream:
+        lines = frame.decode().strip().split("\n")
+        fields = dict(line.split(": ", 1) for line in lines if not line.startswith(":"))
+        message = json.loads(fields["data"])
+        if message["type"] == "check":
+            received.append((int(fields["id"]), message["data"]["n"]))
+            if len(received) == expected:
+                return
+
+
+async def run(pods: int, messages: int, timeout: float):
+    print("=" * 60)
+    print(f"📡 Broadcast entre {pods} réplicas simuladas ({messages} mensajes)")
+    print("=" * 60)
+
+    await connect_to_mongodb()
+    transports = [
+        MongoChangeStreamTransport(settings.BROADCAST_LOG_COLLECTION, settings.BROADCAST_LOG_TTL_SECONDS)
+        for _ in range(pods)
+    ]
+    try:
+        for transport in transports:
+            await transport.start()
+            if transport._local_only:
+                print("❌ El servidor no es un replica set: no hay change streams")
+                return False
+
+        broadcasters = [EventBroadcaster(CHANNEL, transport=transport) for transport in transports]
+        streams = [broadcaster.subscribe() for broadcaster in broadcasters]
+        for stream in streams:
+            await stream.__anext__()  # Frame de conexión
+
+        received = [[] for _ in range(pods)]
+        readers = [
+            asyncio.create_task(collect(stream, messages, got))
+            for stream, got in zip(streams, received)
+        ]
+
+        # Publicar repartiendo los mensajes entre los pods
+        for n in range(messages):
+            await broadcasters[n % pods].broadcast("check", {"n": n})
+
+        done, pending = await asyncio.wait(readers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+    finally:
+        for transport in transports:
+            await transport.stop()
+        await close_mongodb_connection()
+
+    reference = received[0]
+    ok = True
+    for index, got in enumerate(received):
+        numbers = sorted(n for _, n in got)
+        duplicates = len(numbers) - len(set(numbers))
+        same_ids = got == reference
+        status = "✅" if len(got) == messages and not duplicates and same_ids else "❌"
+        ok = ok and status == "✅"
+        print(f"   {status} Pod {index}: {len(got)}/{messages} recibidos, {duplicates} duplicados, ids iguales: {same_ids}")
+    print("=" * 60)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pods", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.pods, args.messages, args.timeout))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
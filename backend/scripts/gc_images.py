@@ -0,0 +1,58 @@
+"""
+Script para borrar imágenes huérfanas de GridFS
+Calcula las imágenes referenciadas por eventos (image_id, gallery), alertas,
+rutas y usuarios (avatar_id) y borra por lotes los originales sin
+referencias más viejos que el periodo de gracia, junto con sus variantes.
+
+Uso (desde backend/):
+    python scripts/gc_images.py --dry-run
+    python scripts/gc_images.py --grace-hours 48 --batch-size 200
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Permitir importar app.* al ejecutar el script directamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.config import settings
+from app.database import connect_to_mongodb, close_mongodb_connection
+from app.services.image_gc import collect_garbage
+
+
+async def run(grace_hours: int, batch_size: int, dry_run: bool):
+    print("=" * 60)
+    print("🧹 Recolección de imágenes huérfanas en GridFS" + (" (dry-run)" if dry_run else ""))
+    print("=" * 60)
+    
+    await connect_to_mongodb()
+    try:
+        report = await collect_garbage(
+            grace_period=timedelta(hours=grace_hours),
+            batch_size=batch_size,
+            dry_run=dry_run,
+        )
+    finally:
+        await close_mongodb_connection()
+    
+    verb = "a borrar" if dry_run else "borrados"
+    print(f"   🔗 Ids referenciados:     {report['live']}")
+    print(f"   🔍 Originales revisados:  {report['scanned']}")
+    print(f"   🗑️  Originales {verb}:   {report['deleted_files']}")
+    print(f"   🖼️  Variantes {verb}:    {report['deleted_variants']}")
+    print(f"   💾 Espacio recuperado:    {report['reclaimed_bytes'] / (1024 * 1024):.2f} MB")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grace-hours", type=int, default=settings.IMAGE_GC_GRACE_HOURS)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true", help="Solo informar, sin borrar")
+    args = parser.parse_args()
+    asyncio.run(run(args.grace_hours, args.batch_size, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
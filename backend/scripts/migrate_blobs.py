@@ -0,0 +1,111 @@
+"""
+Script para mover los bytes de las imágenes entre backends de almacenamiento
+Copia cada archivo de fs.files (originales y variantes) que no esté ya en el
+backend destino, actualiza metadata.backend y borra la copia del origen.
+Los ids no cambian, así que las referencias y URLs siguen siendo válidas.
+
+Uso (desde backend/):
+    python scripts/migrate_blobs.py --to s3 --dry-run
+    python scripts/migrate_blobs.py --to filesystem --batch-size 50
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Permitir importar app.* al ejecutar el script directamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.database import connect_to_mongodb, close_mongodb_connection, get_database
+from app.services.blob_store import DEFAULT_BACKEND, backend_of, get_blob_store, store_for
+
+
+def _pending_query(target: str) -> dict:
+    """Archivos cuyos bytes no están en el backend destino"""
+    if target == DEFAULT_BACKEND:
+        return {"metadata.backend": {"$exists": True, "$ne": DEFAULT_BACKEND}}
+    return {"metadata.backend": {"$ne": target}}
+
+
+async def migrate_file(file_doc: dict, target_name: str):
+    """Copiar un archivo al destino, apuntar fs.files a él y borrar el origen"""
+    db = get_database()
+    source = store_for(file_doc)
+    target = get_blob_store(target_name)
+
+    data = await source.read(file_doc)
+    await target.put(file_doc["_id"], data)
+
+    if file_doc.get("metadata") is None:
+        update = {"$set": {"metadata": {"backend": target_name}}}
+    else:
+        update = {"$set": {"metadata.backend": target_name}}
+    await db.fs.files.update_one({"_id": file_doc["_id"]}, update)
+
+    # Solo después de apuntar al destino: si falla, queda basura en el
+    # origen pero nunca un archivo sin bytes
+    await source.delete([file_doc["_id"]])
+
+
+async def run(target_name: str, batch_size: int, dry_run: bool):
+    print("=" * 60)
+    print(f"📦 Migración de imágenes al backend '{target_name}'" + (" (dry-run)" if dry_run else ""))
+    print("=" * 60)
+
+    await connect_to_mongodb()
+    try:
+        # Validar el destino antes de empezar (ej: boto3 o el bucket)
+        await get_blob_store(target_name).ensure_ready()
+
+        db = get_database()
+        moved = 0
+        moved_bytes = 0
+        failed = 0
+        query = _pending_query(target_name)
+        projection = {"filename": 1, "length": 1, "chunkSize": 1, "metadata": 1}
+
+        if dry_run:
+            async for file_doc in db.fs.files.find(query, projection):
+                print(f"   ➡️  {file_doc['_id']} ({backend_of(file_doc)}, {file_doc['length']} bytes)")
+                moved += 1
+                moved_bytes += file_doc["length"]
+        else:
+            failed_ids = []
+            while True:
+                # Se consulta de nuevo en cada lote: los migrados dejan de
+                # cumplir el filtro y los fallidos se excluyen
+                batch_query = {**query, "_id": {"$nin": failed_ids}}
+                batch = await db.fs.files.find(batch_query, projection).limit(batch_size).to_list(batch_size)
+                if not batch:
+                    break
+                for file_doc in batch:
+                    try:
+                        await migrate_file(file_doc, target_name)
+                    except Exception as e:
+                        print(f"   ❌ {file_doc['_id']}: {e}")
+                        failed_ids.append(file_doc["_id"])
+                        failed += 1
+                        continue
+                    moved += 1
+                    moved_bytes += file_doc["length"]
+                print(f"   ✅ {moved} archivos migrados...")
+    finally:
+        await close_mongodb_connection()
+
+    verb = "a migrar" if dry_run else "migrados"
+    print(f"   🖼️  Archivos {verb}:   {moved}")
+    print(f"   💾 Datos {verb}:       {moved_bytes / (1024 * 1024):.2f} MB")
+    print(f"   ❌ Errores:             {failed}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", required=True, choices=["gridfs", "filesystem", "s3"], help="Backend destino")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true", help="Solo informar, sin mover bytes")
+    args = parser.parse_args()
+    asyncio.run(run(args.to, args.batch_size, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 """
-Script para migrar imágenes del frontend a MongoDB GridFS
+Script para migrar imágenes del frontend al almacenamiento de imágenes
 Actualiza los eventos, alertas y rutas con los IDs de imagen correspondientes
+y calcula el placeholder (metadata.placeholder) de cada imagen, incluidas
+las que ya estaban subidas sin él
 """
 import asyncio
-import os
+import sys
 from pathlib import Path
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
-from bson import ObjectId
 
-# Configuración
-MONGODB_URL = "mongodb://mongodb:27017"
-DATABASE_NAME = "cuenca_eventos"
+# Permitir importar app.* al ejecutar el script directamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.database import connect_to_mongodb, close_mongodb_connection, get_database
+from app.services.image_processing import render_placeholder
+from app.services.image_service import UnsupportedImageType, read_file, store_upload
+
+# Configuración: MONGODB_URL / MONGODB_DB_NAME e IMAGE_STORAGE_BACKEND se
+# leen de app.config (variables de entorno), igual que la API
 
 # Mapeo de archivos a eventos (basado en el código TypeScript)
 IMAGE_MAPPING = {
@@ -37,17 +42,33 @@ IMAGE_MAPPING = {
 IMAGES_DIR = "/app/images_to_migrate"
 
 
-def get_content_type(filename: str) -> str:
-    """Obtener tipo MIME según extensión"""
-    ext = filename.lower().split('.')[-1]
-    types = {
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-        'png': 'image/png',
-        'webp': 'image/webp',
-        'gif': 'image/gif'
-    }
-    return types.get(ext, 'image/jpeg')
+def compute_placeholder(file_data: bytes):
+    """Placeholder de la imagen, o None si no se puede decodificar"""
+    try:
+        return render_placeholder(file_data)
+    except Exception:
+        return None
+
+
+async def _single_chunk(data: bytes):
+    yield data
+
+
+async def backfill_placeholders(db) -> int:
+    """Calcular el placeholder de las imágenes originales que no lo tienen"""
+    updated = 0
+    cursor = db.fs.files.find({
+        "metadata.placeholder": {"$exists": False},
+        "metadata.variant_of": {"$exists": False},
+    })
+    async for file_doc in cursor:
+        placeholder = compute_placeholder(await read_file(file_doc))
+        await db.fs.files.update_one(
+            {"_id": file_doc["_id"]},
+            {"$set": {"metadata.placeholder": placeholder}}
+        )
+        updated += 1
+    return updated
 
 
 async def migrate_images():
@@ -57,9 +78,8 @@ async def migrate_images():
     print("=" * 60)
     
     # Conectar a MongoDB
-    client = AsyncIOMotorClient(MONGODB_URL)
-    db = client[DATABASE_NAME]
-    bucket = AsyncIOMotorGridFSBucket(db)
+    await connect_to_mongodb()
+    db = get_database()
     
     # Verificar directorio de imágenes
     images_path = Path(IMAGES_DIR)
@@ -85,17 +105,23 @@ async def migrate_images():
         with open(filepath, 'rb') as f:
             file_data = f.read()
         
-        # Subir a GridFS
-        content_type = get_content_type(filename)
-        file_id = await bucket.upload_from_stream(
-            filename,
-            file_data,
-            metadata={
-                "content_type": content_type,
-                "source": "migration",
-                "original_path": f"frontend/src/icons/eventos/{filename}"
-            }
-        )
+        # Subir al almacenamiento de imágenes (mismo camino que la API:
+        # tipo por magic bytes, deduplicación y placeholder)
+        try:
+            stored = await store_upload(
+                _single_chunk(file_data),
+                filename,
+                "migration",
+                max_bytes=len(file_data),
+                extra_metadata={
+                    "source": "migration",
+                    "original_path": f"frontend/src/icons/eventos/{filename}",
+                },
+            )
+        except UnsupportedImageType:
+            print(f"   ⚠️  Formato no soportado: {filename}")
+            continue
+        file_id = stored["_id"]
         
         print(f"   ✅ Subida: {filename} -> {file_id}")
         uploaded_count += 1
@@ -128,6 +154,9 @@ async def migrate_images():
                 updated_routes += 1
                 print(f"      🛤️  Ruta actualizada: {mapping['name']}")
     
+    # Placeholders de imágenes subidas antes (por la API o migraciones previas)
+    backfilled = await backfill_placeholders(db)
+    
     # Resumen
     print("\n" + "=" * 60)
     print("✅ MIGRACIÓN DE IMÁGENES COMPLETADA")
@@ -136,10 +165,11 @@ async def migrate_images():
     print(f"   📅 Eventos actualizados: {updated_events}")
     print(f"   ⚠️  Alertas actualizadas: {updated_alerts}")
     print(f"   🛤️  Rutas actualizadas:   {updated_routes}")
+    print(f"   🌫️  Placeholders nuevos:  {backfilled}")
     print("=" * 60)
     
     # Cerrar conexión
-    client.close()
+    await close_mongodb_connection()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+# Tests del backend (python -m pytest desde backend/)
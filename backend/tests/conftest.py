@@ -0,0 +1,47 @@
+"""
+Fixtures compartidas de los tests
+
+Los tests no necesitan MongoDB: trabajan con las estructuras en memoria y,
+donde hace falta la BD, con colecciones falsas (unittest.mock).
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def make_event_doc():
+    """Fábrica de documentos de evento con la proyección de resumen"""
+
+    def make(day: int, category: str = "cultural", hour: str = "10:00", **fields) -> dict:
+        doc = {
+            "_id": ObjectId(),
+            "title": f"Evento {day}",
+            "description": "Descripción",
+            "date": datetime(2030, 1, day),
+            "time": hour,
+            "location": "Cuenca",
+            "coordinates": {"type": "Point", "coordinates": [-79.0, -2.9]},
+            "category": category,
+            "image_id": None,
+        }
+        doc.update(fields)
+        return doc
+
+    return make
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Base de datos en memoria en lugar de Motor para los servicios de imágenes"""
+    from tests.fakes import FakeDatabase
+
+    database = FakeDatabase()
+    for module in ("app.services.image_service", "app.services.image_gc", "app.services.blob_store"):
+        monkeypatch.setattr(f"{module}.get_database", lambda: database)
+    return database
@@ -0,0 +1,186 @@
+"""
+Colecciones de MongoDB en memoria para los tests
+
+Implementan solo lo que usan los servicios probados: filtros por igualdad
+y $gt/$gte/$lt/$lte/$in/$exists/$or, updates con $set/$inc (también en
+forma de pipeline con expresiones $add/$ifNull/$cond/$isArray/$concatArrays)
+y aggregate con $project/$unwind/$group por _id.
+"""
+import copy
+import operator
+from typing import Any, Dict, List, Optional
+
+MISSING = object()
+
+COMPARISONS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def get_path(doc: dict, path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def set_path(doc: dict, path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, option) for option in condition):
+                return False
+            continue
+        value = get_path(doc, key)
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            for op, argument in condition.items():
+                if op == "$exists":
+                    ok = (value is not MISSING) == argument
+                elif op == "$in":
+                    ok = value in argument
+                else:
+                    ok = value is not MISSING and value is not None and COMPARISONS[op](value, argument)
+                if not ok:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def evaluate(expression: Any, doc: dict) -> Any:
+    """Expresión de agregación (el subconjunto que usan los servicios)"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(doc, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if isinstance(expression, dict) and len(expression) == 1:
+        (op, args), = expression.items()
+        if op == "$add":
+            return sum(evaluate(arg, doc) for arg in args)
+        if op == "$ifNull":
+            first = evaluate(args[0], doc)
+            return evaluate(args[1], doc) if first is None else first
+        if op == "$cond":
+            return evaluate(args[1] if evaluate(args[0], doc) else args[2], doc)
+        if op == "$isArray":
+            return isinstance(evaluate(args, doc), list)
+        if op == "$concatArrays":
+            return [item for arg in args for item in evaluate(arg, doc)]
+    return expression
+
+
+class FakeCursor:
+    def __init__(self, docs: List[dict]):
+        self._docs = docs
+
+    def sort(self, field: str, direction: int = 1) -> "FakeCursor":
+        self._docs.sort(key=lambda doc: get_path(doc, field), reverse=direction < 0)
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return self._docs if length is None else self._docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, docs: Optional[List[dict]] = None):
+        self.docs: List[dict] = list(docs or [])
+
+    def _first(self, query: dict) -> Optional[dict]:
+        return next((doc for doc in self.docs if matches(doc, query)), None)
+
+    def _apply(self, doc: dict, update):
+        if isinstance(update, list):
+            for stage in update:
+                for path, expression in stage["$set"].items():
+                    set_path(doc, path, evaluate(expression, doc))
+            return
+        for path, value in update.get("$set", {}).items():
+            set_path(doc, path, value)
+        for path, amount in update.get("$inc", {}).items():
+            current = get_path(doc, path)
+            set_path(doc, path, (0 if current is MISSING else current) + amount)
+
+    async def insert_one(self, doc: dict):
+        self.docs.append(copy.deepcopy(doc))
+
+    async def find_one(self, query: dict, projection=None) -> Optional[dict]:
+        doc = self._first(query)
+        return copy.deepcopy(doc) if doc else None
+
+    def find(self, query: Optional[dict] = None, projection=None, **kwargs) -> FakeCursor:
+        return FakeCursor([copy.deepcopy(doc) for doc in self.docs if matches(doc, query or {})])
+
+    async def find_one_and_update(self, query: dict, update, return_document=False, **kwargs) -> Optional[dict]:
+        doc = self._first(query)
+        if doc is None:
+            return None
+        before = copy.deepcopy(doc)
+        self._apply(doc, update)
+        return copy.deepcopy(doc) if return_document else before
+
+    async def find_one_and_delete(self, query: dict, projection=None) -> Optional[dict]:
+        doc = self._first(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return doc
+
+    async def delete_many(self, query: dict):
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+
+    async def count_documents(self, query: dict, limit: int = 0) -> int:
+        count = sum(1 for doc in self.docs if matches(doc, query))
+        return min(count, limit) if limit else count
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> FakeCursor:
+        docs = copy.deepcopy(self.docs)
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$project":
+                docs = [
+                    {field: evaluate(expression, doc) for field, expression in spec.items() if field != "_id"}
+                    for doc in docs
+                ]
+            elif name == "$unwind":
+                field = spec[1:]
+                docs = [{**doc, field: item} for doc in docs for item in doc[field]]
+            elif name == "$group":
+                keys = []
+                for doc in docs:
+                    key = evaluate(spec["_id"], doc)
+                    if key not in keys:
+                        keys.append(key)
+                docs = [{"_id": key} for key in keys]
+        return FakeCursor(docs)
+
+
+class FakeDatabase:
+    """db["events"] o db.fs.files, como Motor"""
+
+    def __init__(self):
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getattr__(self, name: str):
+        database = self
+
+        class Namespace:
+            def __getattr__(self, sub: str) -> FakeCollection:
+                return database[f"{name}.{sub}"]
+
+        return Namespace()
@@ -0,0 +1,71 @@
+"""Tests de los backends de bytes de imágenes (app.services.blob_store)"""
+import os
+from unittest import mock
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.services import blob_store
+from app.services.blob_store import BlobStore, BlobWriter, FilesystemBlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FilesystemBlobStore(str(tmp_path))
+
+
+@pytest.fixture
+def insert_file_doc(monkeypatch):
+    insert = mock.AsyncMock()
+    monkeypatch.setattr(blob_store, "_insert_file_doc", insert)
+    return insert
+
+
+def test_interfaces_are_abstract():
+    with pytest.raises(TypeError):
+        BlobStore()
+    with pytest.raises(TypeError):
+        BlobWriter()
+
+
+async def test_write_commit_and_read_ranges(store, insert_file_doc):
+    file_id = ObjectId()
+    writer = await store.open_writer(file_id, "foto.jpg")
+    for chunk in (b"0123", b"4567", b"89"):
+        await writer.write(chunk)
+    await writer.commit({"content_type": "image/jpeg"})
+
+    insert_file_doc.assert_awaited_once_with(file_id, "foto.jpg", 10, {"content_type": "image/jpeg"})
+    file_doc = {"_id": file_id, "length": 10}
+    assert await store.read(file_doc) == b"0123456789"
+    assert b"".join([chunk async for chunk in store.iter_range(file_doc, 3, 6)]) == b"3456"
+
+
+async def test_abort_leaves_no_files(store, tmp_path):
+    file_id = ObjectId()
+    writer = await store.open_writer(file_id, "foto.jpg")
+    await writer.write(b"parcial")
+    await writer.abort()
+
+    assert os.listdir(os.path.dirname(store.path_for(file_id))) == []
+
+
+async def test_duplicate_commit_discards_bytes(store, insert_file_doc):
+    insert_file_doc.side_effect = DuplicateKeyError("sha256 duplicado")
+    file_id = ObjectId()
+    writer = await store.open_writer(file_id, "foto.jpg")
+    await writer.write(b"bytes")
+
+    with pytest.raises(DuplicateKeyError):
+        await writer.commit({})
+    assert not os.path.exists(store.path_for(file_id))
+
+
+async def test_put_and_delete(store):
+    file_id = ObjectId()
+    await store.put(file_id, b"migrado")
+    assert await store.read({"_id": file_id, "length": 7}) == b"migrado"
+
+    await store.delete([file_id, ObjectId()])  # Los que no existen se ignoran
+    assert not os.path.exists(store.path_for(file_id))
@@ -0,0 +1,228 @@
+"""Tests del broadcaster (app.core.broadcast)"""
+import asyncio
+from typing import List
+
+import orjson
+import pytest
+
+from app.core.broadcast import (
+    COALESCED,
+    DISCONNECTED,
+    DROPPED,
+    SLOW_CONSUMER_FRAME,
+    EventBroadcaster,
+    SlowConsumerPolicy,
+    Subscriber,
+    TopicSubscription,
+)
+from app.core.broadcast_transport import InProcessTransport
+
+
+def make_broadcaster(**kwargs) -> EventBroadcaster:
+    kwargs.setdefault("heartbeat_seconds", 0)
+    return EventBroadcaster("test", InProcessTransport(), **kwargs)
+
+
+def payloads(subscriber: Subscriber) -> List[dict]:
+    """Mensajes pendientes de un cliente SSE (data de cada frame)"""
+    messages = []
+    for _, frame in subscriber.buffer:
+        for line in frame.decode().splitlines():
+            if line.startswith("data: "):
+                messages.append(orjson.loads(line[len("data: "):]))
+    return messages
+
+
+def message(n: int) -> bytes:
+    return orjson.dumps({"n": n})
+
+
+# ============================================
+# POLÍTICAS DE CLIENTE LENTO
+# ============================================
+
+def test_drop_oldest_keeps_latest_frames():
+    subscriber = Subscriber(2, SlowConsumerPolicy.DROP_OLDEST)
+
+    assert subscriber.push(b"1") is None
+    assert subscriber.push(b"2") is None
+    assert subscriber.push(b"3") == DROPPED
+
+    assert [frame for _, frame in subscriber.buffer] == [b"2", b"3"]
+    assert not subscriber.closed
+
+
+def test_coalesce_replaces_pending_frame_with_same_key():
+    subscriber = Subscriber(2, SlowConsumerPolicy.COALESCE)
+    subscriber.push(b"a1", "a")
+    subscriber.push(b"b1", "b")
+
+    assert subscriber.push(b"a2", "a") == COALESCED
+    assert list(subscriber.buffer) == [("b", b"b1"), ("a", b"a2")]
+
+
+@pytest.mark.parametrize("key", [None, "c"])
+def test_coalesce_without_match_disconnects(key):
+    subscriber = Subscriber(2, SlowConsumerPolicy.COALESCE)
+    subscriber.push(b"a1", "a")
+    subscriber.push(b"b1", "b")
+
+    assert subscriber.push(b"x", key) == DISCONNECTED
+    assert subscriber.closed
+    assert list(subscriber.buffer) == [(None, SLOW_CONSUMER_FRAME)]
+
+
+async def test_disconnect_policy_sends_farewell_and_ends_stream():
+    subscriber = Subscriber(1, SlowConsumerPolicy.DISCONNECT)
+    subscriber.push(b"1")
+
+    assert subscriber.push(b"2") == DISCONNECTED
+    assert subscriber.push(b"3") == DISCONNECTED
+    assert [frame async for frame in subscriber.frames()] == [SLOW_CONSUMER_FRAME]
+
+
+def test_broadcaster_drops_disconnected_clients_and_counts_overflows():
+    broadcaster = make_broadcaster()
+    slow = Subscriber(1, SlowConsumerPolicy.DISCONNECT)
+    fast = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    broadcaster.attach(slow)
+    broadcaster.attach(fast)  # El frame "connected" ya llena el buffer de slow
+
+    assert broadcaster.publish(message(1)) == 1
+
+    assert broadcaster.clients == frozenset({fast})
+    assert slow.closed
+    assert broadcaster.get_stats()["slow_consumers"]["disconnect"][DISCONNECTED] == 1
+    assert [m.get("n") for m in payloads(fast)] == [None, 1]
+
+
+def test_broadcaster_without_coalesce_never_merges():
+    # Con mensajes incrementales la clave no puede reemplazar un pendiente
+    broadcaster = make_broadcaster(coalesce=False)
+    subscriber = Subscriber(2, SlowConsumerPolicy.COALESCE)
+    broadcaster.attach(subscriber)
+    broadcaster.publish(message(1), key="a")
+    broadcaster.publish(message(2), key="a")
+
+    assert subscriber.closed
+
+
+def test_topic_keys_do_not_coalesce_across_topics():
+    connection = Subscriber(2, SlowConsumerPolicy.COALESCE)
+    alerts = TopicSubscription(connection, "alerts")
+    events = TopicSubscription(connection, "events")
+    alerts.push("alerts-a1", "a")
+    events.push("events-a1", "a")
+
+    assert alerts.push("alerts-a2", "a") == COALESCED
+    assert [frame for _, frame in connection.buffer] == ["events-a1", "alerts-a2"]
+
+
+async def test_idle_subscriber_wakes_on_publish():
+    broadcaster = make_broadcaster()
+    received = []
+
+    async def consume():
+        async for frame in broadcaster.subscribe():
+            received.append(frame)
+            if len(received) == 2:
+                return
+
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    broadcaster.publish(message(1))
+    await asyncio.wait_for(task, timeout=1)
+
+    assert b'"connected"' in received[0] and b'{"n":1}' in received[1]
+    assert broadcaster.get_active_connections() == 0
+
+
+# ============================================
+# IDS, REPLAY Y HEARTBEAT
+# ============================================
+
+def reconnect(broadcaster: EventBroadcaster, last_event_id) -> List[dict]:
+    subscriber = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    broadcaster.attach(subscriber, last_event_id)
+    broadcaster.detach(subscriber)
+    return payloads(subscriber)
+
+
+@pytest.fixture
+def replaying():
+    """(broadcaster con buffer de 3 e ids no consecutivos como los del transporte, id inicial)"""
+    broadcaster = make_broadcaster(replay_size=3)
+    seed = broadcaster.last_id
+    for n in (1, 2):
+        broadcaster.publish(message(n), event_id=seed + 10 * n)
+    return broadcaster, seed
+
+
+def test_new_client_gets_connected(replaying):
+    broadcaster, seed = replaying
+    assert reconnect(broadcaster, None) == [{"type": "connected"}]
+    assert reconnect(broadcaster, broadcaster.last_id) == [{"type": "connected"}]
+
+
+def test_replays_only_missed_messages(replaying):
+    broadcaster, seed = replaying
+    assert reconnect(broadcaster, seed + 10) == [{"type": "connected"}, {"n": 2}]
+    # Conectado antes del primer mensaje: recibe todo
+    assert reconnect(broadcaster, seed) == [{"type": "connected"}, {"n": 1}, {"n": 2}]
+
+
+@pytest.mark.parametrize("offset", [15, -5, 10_000])
+def test_unknown_ids_get_reset(replaying, offset):
+    broadcaster, seed = replaying
+    # Dentro del rango pero no emitido aquí (p.ej. de otra réplica), viejo o futuro
+    assert reconnect(broadcaster, seed + offset) == [{"type": "reset"}]
+
+
+def test_evicted_gap_gets_reset_but_floor_replays_all(replaying):
+    broadcaster, seed = replaying
+    for n in (3, 4, 5):
+        broadcaster.publish(message(n), event_id=seed + 10 * n)
+
+    assert reconnect(broadcaster, seed + 10) == [{"type": "reset"}]
+    assert reconnect(broadcaster, seed + 20) == [{"type": "connected"}, {"n": 3}, {"n": 4}, {"n": 5}]
+
+
+def test_transport_ids_must_increase(replaying):
+    broadcaster, seed = replaying
+    assert broadcaster.publish(message(9), event_id=seed + 20) == 0  # Ya entregado
+    assert len(broadcaster.replay) == 2
+
+
+def test_reset_clients_clears_replay(replaying):
+    broadcaster, seed = replaying
+    subscriber = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    broadcaster.attach(subscriber)
+
+    broadcaster.reset_clients()
+
+    assert payloads(subscriber)[-1] == {"type": "reset"}
+    assert reconnect(broadcaster, seed + 10) == [{"type": "reset"}]
+
+
+def test_replay_respects_key_filter():
+    broadcaster = make_broadcaster()
+    start = broadcaster.last_id
+    broadcaster.publish(message(1), key="a")
+    broadcaster.publish(message(2), key="b")
+    connection = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    broadcaster.attach(TopicSubscription(connection, "event:b", key_filter="b"), start)
+
+    messages = [orjson.loads(frame)["message"] for _, frame in connection.buffer]
+    assert messages == [{"type": "connected"}, {"n": 2}]
+
+
+async def test_heartbeat_only_when_idle():
+    broadcaster = make_broadcaster(heartbeat_seconds=0.01)
+    idle = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    broadcaster.attach(idle)
+    idle.buffer.clear()
+
+    await asyncio.sleep(0.05)
+
+    assert [frame for _, frame in idle.buffer] == [b": ping\n\n"]  # Un solo ping pendiente
+    await broadcaster.disconnect_all()
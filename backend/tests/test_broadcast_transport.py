@@ -0,0 +1,126 @@
+"""Tests del relay entre réplicas por change stream (app.core.broadcast_transport)"""
+import asyncio
+from typing import List
+
+import pytest
+from bson import Timestamp
+from pymongo.errors import OperationFailure
+
+from app.core.broadcast import EventBroadcaster, SlowConsumerPolicy, Subscriber
+from app.core.broadcast_transport import (
+    CHANGE_STREAM_HISTORY_LOST,
+    MongoChangeStreamTransport,
+    cluster_time_id,
+)
+
+
+class FakeStream:
+    """Change stream que entrega una lista de cambios y después falla o espera"""
+
+    def __init__(self, changes: List[dict], error: Exception = None):
+        self._changes = changes
+        self._error = error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for n, change in enumerate(self._changes):
+            self.resume_token = {"n": n}
+            yield change
+        if self._error is not None:
+            raise self._error
+        await asyncio.Event().wait()  # Sin más cambios
+
+
+def change(channel: str, key, origin: str, inc: int, payload: bytes = b'{"type":"update"}') -> dict:
+    return {
+        "_id": {"n": inc},
+        "clusterTime": Timestamp(1_900_000_000, inc),
+        "fullDocument": {"channel": channel, "payload": payload, "key": key, "origin": origin, "points": []},
+    }
+
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, *args):
+    """Sin esperas de reintento"""
+    await _real_sleep(0)
+
+
+@pytest.fixture
+def transport():
+    return MongoChangeStreamTransport("broadcast_log", ttl_seconds=60)
+
+
+async def run_watch(transport, *streams):
+    queue = list(streams)
+    transport._open_stream = lambda: queue.pop(0) if queue else FakeStream([])
+    task = asyncio.create_task(transport._watch())
+    for _ in range(20):
+        await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_remote_writes_update_caches_before_fanout(transport):
+    broadcaster = EventBroadcaster("alerts", transport, heartbeat_seconds=0)
+    subscriber = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    broadcaster.attach(subscriber)
+    order = []
+
+    async def listener(payload, key):
+        # El cliente aún no recibió el mensaje cuando se actualiza el cache
+        order.append(("cache", key, len(subscriber.buffer)))
+
+    transport.add_listener("alerts", listener)
+    await run_watch(transport, FakeStream([
+        change("alerts", "a1", "otra-replica", 1),
+        change("alerts", "a2", transport.origin, 2),  # Propio: el cache ya está al día
+        {"_id": {"n": 3}, "fullDocument": {}},         # Malformado: se descarta
+        change("alerts", "a3", "otra-replica", 4),
+    ]))
+
+    assert order == [("cache", "a1", 1), ("cache", "a3", 3)]
+    assert len(subscriber.buffer) == 4  # connected + 3 mensajes
+    assert broadcaster.last_id == cluster_time_id(Timestamp(1_900_000_000, 4))
+
+
+async def test_listener_errors_do_not_stop_delivery(transport):
+    broadcaster = EventBroadcaster("routes", transport, heartbeat_seconds=0)
+
+    async def broken(payload, key):
+        raise RuntimeError("fallo")
+
+    transport.add_listener("routes", broken)
+    await run_watch(transport, FakeStream([change("routes", "r1", "otra-replica", 1)]))
+
+    assert len(broadcaster.replay) == 1
+
+
+async def test_history_lost_reloads_caches_and_resets_clients(transport, monkeypatch):
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+    broadcaster = EventBroadcaster("events", transport, heartbeat_seconds=0)
+    subscriber = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    broadcaster.attach(subscriber)
+    reloads = []
+
+    async def listener(payload, key):
+        reloads.append(key)
+
+    transport.add_listener("events", listener)
+    lost = OperationFailure("history lost", code=CHANGE_STREAM_HISTORY_LOST)
+    await run_watch(transport, FakeStream([change("events", "e1", "otra-replica", 1)], error=lost))
+
+    assert reloads == ["e1", None]  # None: recargar todo
+    assert b'"reset"' in subscriber.buffer[-1][1]
+    assert transport._resume_token is None
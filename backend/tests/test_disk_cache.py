@@ -0,0 +1,106 @@
+"""Tests del cache LRU en disco de imágenes (app.services.disk_cache)"""
+import os
+
+import pytest
+
+from app.services.disk_cache import DiskLRUCache
+
+HEADERS = {"ETag": '"abc"'}
+
+
+async def chunks_of(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def serve(cache: DiskLRUCache, key: str, image_id: str, data: bytes, length: int = None) -> bytes:
+    """Consumir la respuesta completa como lo haría el cliente"""
+    tee = cache.tee(key, chunks_of(data[:3], data[3:]), image_id, "image/webp", HEADERS,
+                    len(data) if length is None else length)
+    return b"".join([chunk async for chunk in tee])
+
+
+def files_in(directory) -> list:
+    return sorted(os.listdir(directory))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=20, max_entry_bytes=10, channel="test-images")
+    cache.open()
+    return cache
+
+
+async def test_full_download_is_cached(cache):
+    assert await serve(cache, "k1", "img1", b"0123456789") == b"0123456789"
+
+    entry = cache.get("k1")
+    assert entry.headers == HEADERS and entry.media_type == "image/webp"
+    with open(entry.path, "rb") as cached:
+        assert cached.read() == b"0123456789"
+
+
+async def test_incomplete_or_oversized_downloads_are_not_cached(cache, tmp_path):
+    assert await serve(cache, "short", "img1", b"01234", length=9) == b"01234"
+    assert await serve(cache, "big", "img1", b"0123456789ABC") == b"0123456789ABC"
+
+    tee = cache.tee("cut", chunks_of(b"012", b"345"), "img1", "image/webp", HEADERS, 6)
+    await tee.__anext__()
+    await tee.aclose()  # El cliente cortó la descarga
+
+    assert cache.get("short") is None and cache.get("big") is None and cache.get("cut") is None
+    assert files_in(tmp_path) == []
+
+
+async def test_lru_eviction_keeps_recently_used(cache):
+    await serve(cache, "a", "img1", b"aaaaaaa")
+    await serve(cache, "b", "img2", b"bbbbbbb")
+    cache.get("a")  # "b" pasa a ser la menos usada
+    await serve(cache, "c", "img3", b"ccccccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.total_bytes == 14
+
+
+async def test_invalidate_image_drops_all_its_keys(cache, tmp_path):
+    await serve(cache, "img1-w160", "img1", b"small")
+    await serve(cache, "img1-w480", "img1", b"larger")
+    await serve(cache, "img2", "img2", b"other")
+
+    await cache.on_remote_delete(b"", "img1")
+
+    assert cache.get("img1-w160") is None and cache.get("img1-w480") is None
+    assert cache.get("img2") is not None
+    assert len(files_in(tmp_path)) == 2  # .bin y .json de img2
+
+    await cache.on_remote_delete(b"", None)  # Sin id: vaciar todo
+    assert files_in(tmp_path) == [] and cache.total_bytes == 0
+
+
+async def test_download_in_flight_during_invalidation_is_discarded(cache, tmp_path):
+    tee = cache.tee("k1", chunks_of(b"012", b"345"), "img1", "image/webp", HEADERS, 6)
+    received = [await tee.__anext__()]
+    await cache.invalidate_image("img1")  # Borrada en otra réplica mientras se descargaba
+    received += [chunk async for chunk in tee]
+
+    assert b"".join(received) == b"012345"
+    assert cache.get("k1") is None
+    assert files_in(tmp_path) == []
+
+
+async def test_open_rebuilds_index_and_removes_temporaries(cache, tmp_path):
+    await serve(cache, "k1", "img1", b"0123456789")
+    (tmp_path / "interrumpida.tmp").write_bytes(b"x")
+
+    reopened = DiskLRUCache(str(tmp_path), max_bytes=20, max_entry_bytes=10, channel="test-images")
+    reopened.open()
+
+    assert reopened.get("k1").size == 10
+    assert not (tmp_path / "interrumpida.tmp").exists()
+
+
+def test_disabled_without_directory():
+    cache = DiskLRUCache("", max_bytes=20, max_entry_bytes=10, channel="test-images")
+    cache.open()
+    assert not cache.enabled and cache.get("k1") is None
@@ -0,0 +1,137 @@
+"""Tests del catálogo columnar de eventos (app.services.event_catalog)"""
+import random
+from datetime import date
+from unittest import mock
+
+import orjson
+import pytest
+
+from app.models.event import EventCategory
+from app.services.event_catalog import CATEGORY_CODES, EventCatalog
+
+
+def assert_bitmaps_consistent(catalog: EventCatalog):
+    """Cada bitmap debe tener exactamente los bits de su categoría"""
+    for code, bitmap in catalog.bitmaps.items():
+        expected = sum(1 << position for position, value in enumerate(catalog.categories) if value == code)
+        assert bitmap == expected, f"bitmap de la categoría {code}"
+    assert len(catalog.ids) == len(catalog.timestamps) == len(catalog.fragments) == len(catalog.docs)
+
+
+def titles(fragments):
+    return [orjson.loads(fragment)["title"] for fragment in fragments]
+
+
+@pytest.fixture
+def catalog():
+    # Registra su listener en el transporte global (memory: nunca se llama)
+    return EventCatalog()
+
+
+def test_fill_builds_bitmaps(catalog, make_event_doc):
+    docs = [make_event_doc(1, "cultural"), make_event_doc(2, "religioso"), make_event_doc(3, "cultural")]
+    catalog._fill(docs)
+
+    assert catalog.bitmaps[CATEGORY_CODES["cultural"]] == 0b101
+    assert catalog.bitmaps[CATEGORY_CODES["religioso"]] == 0b010
+    assert_bitmaps_consistent(catalog)
+
+
+def test_upsert_in_the_middle_shifts_bitmaps(catalog, make_event_doc):
+    catalog._fill([make_event_doc(1, "cultural"), make_event_doc(5, "cultural")])
+    catalog.upsert(make_event_doc(3, "artistico"))
+
+    assert titles(catalog.fragments) == ["Evento 1", "Evento 3", "Evento 5"]
+    assert catalog.bitmaps[CATEGORY_CODES["cultural"]] == 0b101
+    assert catalog.bitmaps[CATEGORY_CODES["artistico"]] == 0b010
+    assert_bitmaps_consistent(catalog)
+
+
+def test_upsert_existing_moves_and_recategorizes(catalog, make_event_doc):
+    doc = make_event_doc(1, "cultural")
+    catalog._fill([doc, make_event_doc(2, "religioso")])
+    catalog.upsert({**doc, "date": doc["date"].replace(day=9), "category": "gastronomico"})
+
+    assert len(catalog) == 2
+    assert catalog.ids[-1] == str(doc["_id"])
+    assert catalog.bitmaps[CATEGORY_CODES["cultural"]] == 0
+    assert catalog.bitmaps[CATEGORY_CODES["gastronomico"]] == 0b10
+    assert_bitmaps_consistent(catalog)
+
+
+def test_remove_shifts_bitmaps(catalog, make_event_doc):
+    docs = [make_event_doc(day, category) for day, category in
+            [(1, "cultural"), (2, "religioso"), (3, "cultural"), (4, "religioso")]]
+    catalog._fill(docs)
+
+    assert catalog.remove(str(docs[1]["_id"])) is True
+    assert catalog.remove(str(docs[1]["_id"])) is False
+    assert catalog.bitmaps[CATEGORY_CODES["cultural"]] == 0b011
+    assert catalog.bitmaps[CATEGORY_CODES["religioso"]] == 0b100
+    assert_bitmaps_consistent(catalog)
+
+
+def test_random_writes_keep_columns_aligned(catalog, make_event_doc):
+    rng = random.Random(7)
+    categories = [category.value for category in EventCategory]
+    catalog._fill([])
+    live = []
+    for _ in range(300):
+        if live and rng.random() < 0.3:
+            doc = live.pop(rng.randrange(len(live)))
+            catalog.remove(str(doc["_id"]))
+        elif live and rng.random() < 0.3:
+            doc = live[rng.randrange(len(live))]
+            doc.update(category=rng.choice(categories), date=doc["date"].replace(day=rng.randint(1, 28)))
+            catalog.upsert(dict(doc))
+        else:
+            doc = make_event_doc(rng.randint(1, 28), rng.choice(categories))
+            live.append(doc)
+            catalog.upsert(dict(doc))
+        assert_bitmaps_consistent(catalog)
+
+    assert sorted(catalog.ids) == sorted(str(doc["_id"]) for doc in live)
+    assert list(catalog.timestamps) == sorted(catalog.timestamps)
+
+
+def test_get_multi_filters_by_category_with_skip_and_limit(catalog, make_event_doc):
+    catalog._fill([make_event_doc(day, "cultural" if day % 2 else "religioso") for day in range(1, 11)])
+
+    cultural = titles(catalog.get_multi(skip=1, limit=2, category=EventCategory.CULTURAL))
+    assert cultural == ["Evento 7", "Evento 5"]  # Descendente por fecha
+    assert titles(catalog.get_multi(limit=3)) == ["Evento 10", "Evento 9", "Evento 8"]
+
+
+def test_get_by_date_orders_by_time(catalog, make_event_doc):
+    catalog._fill([
+        make_event_doc(2, hour="18:00", title="tarde"),
+        make_event_doc(2, hour="09:00", title="mañana"),
+        make_event_doc(3, hour="08:00", title="otro día"),
+    ])
+
+    assert titles(catalog.get_by_date(date(2030, 1, 2))) == ["mañana", "tarde"]
+
+
+async def test_remote_write_rereads_or_removes(catalog, make_event_doc):
+    kept, deleted = make_event_doc(1), make_event_doc(2)
+    catalog._fill([kept, deleted])
+    catalog.loaded_at = 0.0
+    updated = {**kept, "title": "Editado en otra réplica"}
+
+    async def find_one(query, projection):
+        return updated if query["_id"] == kept["_id"] else None
+
+    collection = mock.Mock(find_one=find_one)
+    with mock.patch("app.services.event_catalog.Event.get_motor_collection", return_value=collection):
+        await catalog.on_remote_write(b"", str(kept["_id"]))
+        await catalog.on_remote_write(b"", str(deleted["_id"]))
+
+    assert titles(catalog.fragments) == ["Editado en otra réplica"]
+    assert_bitmaps_consistent(catalog)
+
+
+async def test_remote_write_before_first_load_is_ignored(catalog, make_event_doc):
+    with mock.patch("app.services.event_catalog.Event.get_motor_collection") as collection:
+        await catalog.on_remote_write(b"", str(make_event_doc(1)["_id"]))
+    collection.assert_not_called()
+    assert len(catalog) == 0
@@ -0,0 +1,95 @@
+"""Tests del ranking del feed "para ti" (app.services.feed_service)"""
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from app.config import settings
+from app.services.feed_service import (
+    DISTANCE_SCALE_KM,
+    EARTH_RADIUS_KM,
+    TIME_SCALE_HOURS,
+    EventColumns,
+    FeedService,
+)
+
+CATEGORIES = ["cultural", "religioso", "gastronomico", "artistico", "tradicional", "desconocida"]
+NOW = time.time()
+
+
+def make_docs(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    start = datetime.utcfromtimestamp(NOW)
+    return [
+        {
+            "_id": ObjectId(),
+            "date": start + timedelta(hours=rng.uniform(-48, 24 * 30)),
+            "category": rng.choice(CATEGORIES),
+            "coordinates": {"type": "Point", "coordinates": [-79.0 + rng.uniform(-0.1, 0.1), -2.9 + rng.uniform(-0.1, 0.1)]},
+        }
+        for _ in range(count)
+    ]
+
+
+def reference_score(doc, popularity, preferences, lat, lng) -> float:
+    """Misma fórmula que FeedService.score, evento por evento"""
+    timestamp = (doc["date"] - datetime(1970, 1, 1)).total_seconds()  # naive UTC
+    hours = max(timestamp - NOW, 0.0) / 3600.0
+    score = (
+        settings.FEED_WEIGHT_PREFERENCE * (doc["category"] in preferences)
+        + settings.FEED_WEIGHT_TIME * math.exp(-hours / TIME_SCALE_HOURS)
+        + settings.FEED_WEIGHT_POPULARITY * popularity
+    )
+    event_lng, event_lat = doc["coordinates"]["coordinates"]
+    phi1, phi2 = math.radians(lat), math.radians(event_lat)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(event_lng - lng) / 2) ** 2
+    )
+    distance = 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+    return score + settings.FEED_WEIGHT_DISTANCE * math.exp(-distance / DISTANCE_SCALE_KM)
+
+
+def test_popularity_is_log_normalized():
+    docs = make_docs(3)
+    columns = EventColumns(docs, {docs[0]["_id"]: 9.0, docs[1]["_id"]: 0.5})
+
+    assert columns.popularity[0] == pytest.approx(1.0)
+    assert columns.popularity[1] == pytest.approx(math.log1p(0.5) / math.log1p(9.0))
+    assert columns.popularity[2] == 0.0
+    assert len(EventColumns([], {}).popularity) == 0
+
+
+def test_vectorized_score_matches_reference():
+    docs = make_docs(200)
+    popularity = {doc["_id"]: random.Random(2).uniform(0, 10) for doc in docs}
+    columns = EventColumns(docs, popularity)
+    preferences = ["cultural", "artistico", "no-existe"]
+
+    scores = FeedService.score(columns, preferences, -2.9, -79.0, now=NOW)
+
+    expected = [
+        reference_score(doc, columns.popularity[i], preferences, -2.9, -79.0) for i, doc in enumerate(docs)
+    ]
+    np.testing.assert_allclose(scores, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("limit", [1, 10, 500])
+async def test_feed_returns_top_upcoming_events_in_order(limit):
+    docs = make_docs(300, seed=5)
+    columns = EventColumns(docs, {})
+    service = FeedService()
+    service.get_columns = mock.AsyncMock(return_value=columns)
+
+    with mock.patch("app.services.feed_service.time.time", return_value=NOW):
+        feed = await service.get_feed(["religioso"], -2.9, -79.0, limit=limit)
+
+    scores = FeedService.score(columns, ["religioso"], -2.9, -79.0, now=NOW)
+    upcoming = [i for i in range(len(docs)) if columns.timestamps[i] >= NOW]
+    expected = sorted(upcoming, key=lambda i: -scores[i])[:limit]
+    assert [doc["_id"] for doc in feed] == [docs[i]["_id"] for i in expected]
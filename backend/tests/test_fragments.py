@@ -0,0 +1,106 @@
+"""Tests del cache de fragmentos JSON (app.core.fragments)"""
+import asyncio
+from datetime import datetime
+from unittest import mock
+
+import orjson
+import pytest
+from bson import ObjectId
+
+from app.core.fragments import FragmentCache, json_list_response
+from app.core.responses import dumps
+from tests.fakes import FakeCollection, FakeCursor
+
+
+def serialize(doc: dict) -> bytes:
+    return dumps({"_id": doc["_id"], "title": doc["title"]})
+
+
+def titles(fragments):
+    return [orjson.loads(fragment)["title"] for fragment in fragments]
+
+
+def doc(title: str, day: int, **fields) -> dict:
+    return {"_id": ObjectId(), "title": title, "created_at": datetime(2030, 1, day), **fields}
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection([doc("viejo", 1), doc("nuevo", 3, active=True), doc("medio", 2, active=True)])
+
+
+@pytest.fixture
+def cache(collection):
+    model = mock.Mock(get_motor_collection=mock.Mock(return_value=collection))
+    return FragmentCache(model, serialize, channel="test-fragments")
+
+
+async def test_select_orders_by_created_at_and_filters(cache):
+    await cache.ensure_loaded()
+
+    assert titles(cache.select()) == ["nuevo", "medio", "viejo"]
+    assert titles(cache.select(lambda raw: raw.get("active"))) == ["nuevo", "medio"]
+    assert orjson.loads(json_list_response(cache.select()).body)[0]["title"] == "nuevo"
+
+
+async def test_put_and_remove_keep_order(cache, collection):
+    await cache.load()
+    newest = doc("recién creado", 9)
+
+    cache.put(newest)
+    cache.remove(str(collection.docs[0]["_id"]))
+
+    assert titles(cache.select()) == ["recién creado", "nuevo", "medio"]
+    assert titles([cache.get(str(newest["_id"]))]) == ["recién creado"]
+
+
+async def test_writes_during_reload_are_not_lost(cache, collection):
+    await cache.load()
+    release = asyncio.Event()
+    snapshot = list(collection.docs)
+
+    class SlowCursor(FakeCursor):
+        async def to_list(self, length=None):
+            await release.wait()
+            return snapshot  # Foto tomada antes de las escrituras
+
+    collection.find = lambda *args, **kwargs: SlowCursor([])
+    reload = asyncio.create_task(cache.load())
+    await asyncio.sleep(0)
+    cache.remove(str(snapshot[0]["_id"]))
+    cache.put(doc("escrito durante la recarga", 5))
+    release.set()
+    await reload
+
+    assert titles(cache.select()) == ["escrito durante la recarga", "nuevo", "medio"]
+
+
+async def test_remote_writes_reread_from_db(cache, collection):
+    await cache.load()
+    edited, deleted = collection.docs[0], collection.docs[1]
+    edited["title"] = "editado en otra réplica"
+    collection.docs.remove(deleted)
+
+    await cache.on_remote_write(b"", str(edited["_id"]))
+    await cache.on_remote_write(b"", str(deleted["_id"]))
+
+    assert titles(cache.select()) == ["medio", "editado en otra réplica"]
+
+    collection.docs.append(doc("sin aviso", 7))
+    await cache.on_remote_write(b"", None)  # Historial perdido: recarga completa
+    assert titles(cache.select())[0] == "sin aviso"
+
+
+async def test_remote_write_before_first_load_is_ignored(cache, collection):
+    collection.find_one = mock.AsyncMock()
+    await cache.on_remote_write(b"", str(collection.docs[0]["_id"]))
+    collection.find_one.assert_not_called()
+
+
+async def test_announce_publishes_the_id(cache, monkeypatch):
+    publish = mock.AsyncMock()
+    monkeypatch.setattr("app.core.fragments.broadcast_transport.publish", publish)
+
+    await cache.announce("abc")
+
+    publish.assert_awaited_once_with("test-fragments", b"", "abc")
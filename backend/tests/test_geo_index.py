@@ -0,0 +1,87 @@
+"""Tests del índice espacial de suscripciones (app.core.geo_index)"""
+import random
+
+import pytest
+
+from app.core.broadcast import EventBroadcaster, SlowConsumerPolicy, Subscriber
+from app.core.broadcast_transport import InProcessTransport
+from app.core.geo_index import GeoRegion, SubscriptionGrid
+
+CUENCA = (-2.8974, -79.0045)
+
+
+def test_circle_excludes_bounding_box_corners():
+    region = GeoRegion.circle(*CUENCA, radius_m=1000)
+
+    assert region.contains(CUENCA)
+    assert region.contains((CUENCA[0] + 0.008, CUENCA[1]))       # ~890 m al norte
+    assert not region.contains((region.max_lat, region.max_lng))  # Esquina del rectángulo
+
+
+@pytest.mark.parametrize("value", ["1,2,3", "a,b,c,d", "-79,-2,-80,-3", "-79,-91,-78,-2"])
+def test_parse_bbox_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        GeoRegion.parse_bbox(value)
+
+
+def test_parse_bbox_uses_geojson_order():
+    region = GeoRegion.parse_bbox("-79.1,-3.0,-78.9,-2.8")
+    assert region.contains(CUENCA)
+    assert (region.min_lat, region.min_lng) == (-3.0, -79.1)
+
+
+def test_match_equals_brute_force():
+    rng = random.Random(3)
+    grid = SubscriptionGrid(cell_degrees=0.01, max_cells=64)
+    regions = {}
+    for item in range(300):
+        lat = CUENCA[0] + rng.uniform(-0.2, 0.2)
+        lng = CUENCA[1] + rng.uniform(-0.2, 0.2)
+        if rng.random() < 0.5:
+            region = GeoRegion.circle(lat, lng, rng.uniform(50, 5000))
+        else:
+            size = rng.uniform(0.001, 0.3)  # Algunas superan max_cells
+            region = GeoRegion.bbox(lng, lat, lng + size, lat + size)
+        regions[item] = region
+        grid.add(item, region)
+    assert grid.wide, "el test debe incluir regiones sin indexar"
+
+    for _ in range(200):
+        points = [
+            (CUENCA[0] + rng.uniform(-0.25, 0.25), CUENCA[1] + rng.uniform(-0.25, 0.25))
+            for _ in range(rng.choice([1, 1, 3]))
+        ]
+        matched = list(grid.match(points))
+        expected = {item for item, region in regions.items() if region.contains_any(points)}
+        assert len(matched) == len(set(matched))  # Sin duplicados con varios puntos
+        assert set(matched) == expected
+
+
+def test_remove_frees_cells_and_wide_regions():
+    grid = SubscriptionGrid(cell_degrees=0.01, max_cells=4)
+    grid.add("near", GeoRegion.circle(*CUENCA, radius_m=500))
+    grid.add("wide", GeoRegion.bbox(-80.0, -4.0, -78.0, -2.0))
+
+    grid.remove("near")
+    grid.remove("wide")
+    grid.remove("desconocido")
+
+    assert len(grid) == 0
+    assert grid.cells == {}
+    assert grid.wide == frozenset()
+
+
+def test_broadcaster_delivers_by_region():
+    broadcaster = EventBroadcaster("geo", InProcessTransport(), heartbeat_seconds=0)
+    near = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST, GeoRegion.circle(*CUENCA, radius_m=2000))
+    everywhere = Subscriber(100, SlowConsumerPolicy.DROP_OLDEST)
+    for subscriber in (near, everywhere):
+        broadcaster.attach(subscriber)
+        subscriber.buffer.clear()
+
+    assert broadcaster.publish(b'{"n":1}', points=[CUENCA]) == 2
+    assert broadcaster.publish(b'{"n":2}', points=[(0.0, 0.0)]) == 1  # Fuera de la región
+    assert broadcaster.publish(b'{"n":3}') == 2                        # Sin puntos: a todos
+
+    assert len(near.buffer) == 2
+    assert len(everywhere.buffer) == 3
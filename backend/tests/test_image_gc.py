@@ -0,0 +1,66 @@
+"""Tests del recolector de imágenes huérfanas (app.services.image_gc)"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services.image_gc import collect_garbage, live_image_ids
+
+OLD = datetime.utcnow() - timedelta(days=30)
+RECENT = datetime.utcnow() - timedelta(minutes=5)
+GRACE = timedelta(days=1)
+
+
+def image(upload_date=OLD, length=100, **metadata) -> dict:
+    return {"_id": ObjectId(), "length": length, "uploadDate": upload_date, "metadata": metadata}
+
+
+@pytest.fixture
+def images(fake_db):
+    referenced, in_gallery, as_string, orphan, fresh, reacquired = (
+        image(), image(), image(), image(), image(upload_date=RECENT), image(acquired_at=RECENT)
+    )
+    variant = image(length=10, variant_of=orphan["_id"])
+    fake_db.fs.files.docs.extend([referenced, in_gallery, as_string, orphan, fresh, reacquired, variant])
+    fake_db["events"].docs.extend([
+        {"_id": ObjectId(), "image_id": referenced["_id"], "gallery": [in_gallery["_id"], referenced["_id"]]},
+        {"_id": ObjectId(), "image_id": None},
+    ])
+    fake_db["alerts"].docs.append({"_id": ObjectId(), "image_id": str(as_string["_id"])})
+    fake_db["users"].docs.append({"_id": ObjectId(), "avatar_id": "no-es-un-id"})
+    return {
+        "referenced": referenced, "in_gallery": in_gallery, "as_string": as_string,
+        "orphan": orphan, "fresh": fresh, "reacquired": reacquired, "variant": variant,
+    }
+
+
+def remaining(fake_db):
+    return {doc["_id"] for doc in fake_db.fs.files.docs}
+
+
+async def test_live_ids_cover_scalars_lists_and_string_ids(images):
+    live = await live_image_ids()
+    assert live == {images["referenced"]["_id"], images["in_gallery"]["_id"], images["as_string"]["_id"]}
+
+
+@pytest.mark.parametrize("batch_size", [1, 100])
+async def test_deletes_old_orphans_with_their_variants(fake_db, images, batch_size):
+    report = await collect_garbage(GRACE, batch_size=batch_size)
+
+    assert report["deleted_files"] == 1
+    assert report["deleted_variants"] == 1
+    assert report["reclaimed_bytes"] == 110
+    # Los recientes (subidos o reutilizados en el periodo de gracia) no se tocan
+    assert remaining(fake_db) == {
+        images[name]["_id"] for name in ("referenced", "in_gallery", "as_string", "fresh", "reacquired")
+    }
+
+
+async def test_dry_run_reports_without_deleting(fake_db, images):
+    before = remaining(fake_db)
+
+    report = await collect_garbage(GRACE, dry_run=True)
+
+    assert report["dry_run"] is True
+    assert report["deleted_files"] == 1 and report["reclaimed_bytes"] == 110
+    assert remaining(fake_db) == before
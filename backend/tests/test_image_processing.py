@@ -0,0 +1,114 @@
+"""Tests de la decodificación y los derivados de imágenes (app.services.image_processing)"""
+import io
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.services import image_service
+from app.services.image_processing import (
+    DEFAULT_MAX_PIXELS,
+    EXIF_ORIENTATION,
+    ImageFit,
+    ImageFormat,
+    ImageTooLarge,
+    InvalidImage,
+    VariantSpec,
+    configure_decoder,
+    load_image,
+    render_derivatives,
+    render_variant,
+    sniff_content_type,
+)
+
+
+def jpeg(width: int, height: int, orientation: int = None) -> bytes:
+    image = Image.new("RGB", (width, height), (200, 80, 40))
+    exif = Image.Exif()
+    if orientation:
+        exif[EXIF_ORIENTATION] = orientation
+    output = io.BytesIO()
+    image.save(output, "JPEG", exif=exif)
+    return output.getvalue()
+
+
+def size_of(data: bytes):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+@pytest.fixture
+def max_pixels():
+    """Cambiar el límite de píxeles durante un test"""
+    yield configure_decoder
+    configure_decoder(DEFAULT_MAX_PIXELS)
+
+
+@pytest.mark.parametrize("head, expected", [
+    (b"\xff\xd8\xff\xe0" + b"\0" * 8, "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n" + b"\0" * 4, "image/png"),
+    (b"GIF89a" + b"\0" * 6, "image/gif"),
+    (b"RIFF\0\0\0\0WEBP", "image/webp"),
+    (b"<svg xmlns=", None),
+])
+def test_sniff_content_type(head, expected):
+    assert sniff_content_type(head) == expected
+
+
+def test_jpeg_is_drafted_close_to_the_target():
+    with load_image(jpeg(4000, 3000), 480) as image:
+        assert 480 <= image.width < 1000
+
+
+def test_draft_accounts_for_exif_rotation():
+    # Guardada apaisada y rotada 90°: al mostrarse mide 1000 de ancho
+    data, content_type = render_variant(jpeg(4000, 1000, orientation=6), 900, None, ImageFit.CONTAIN, ImageFormat.JPEG)
+    assert content_type == "image/jpeg"
+    assert size_of(data) == (900, 3600)
+
+
+@pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+def test_too_many_pixels(max_pixels):
+    max_pixels(1_000_000)
+    with pytest.raises(ImageTooLarge):
+        load_image(jpeg(2000, 1000))
+    with load_image(jpeg(1000, 1000)) as image:
+        assert image.size == (1000, 1000)
+
+
+@pytest.mark.parametrize("data", [b"no es una imagen", jpeg(400, 300)[:200]])
+def test_undecodable_data(data):
+    with pytest.raises(InvalidImage):
+        load_image(data)
+
+
+def test_render_derivatives_with_placeholder():
+    specs = [
+        VariantSpec(160, 160, ImageFit.COVER, ImageFormat.JPEG),
+        VariantSpec(480, None, ImageFit.CONTAIN, ImageFormat.WEBP),
+    ]
+    results, placeholder = render_derivatives(jpeg(2000, 1000), specs, with_placeholder=True)
+
+    assert [(key, content_type) for key, _, content_type in results] == [
+        ("w160-h160-cover-jpeg", "image/jpeg"),
+        ("w480-h0-contain-webp", "image/webp"),
+    ]
+    assert size_of(results[0][1]) == (160, 160)
+    assert size_of(results[1][1]) == (480, 240)
+    assert placeholder.startswith("data:image/webp;base64,")
+
+
+@pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+async def test_process_pool_applies_the_pixel_limit(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_MAX_PIXELS", 1_000_000)
+    image_service.start_process_pool(1)
+    try:
+        with pytest.raises(ImageTooLarge):
+            await image_service.run_cpu(load_image, jpeg(2000, 1000))
+        data, _ = await image_service.run_cpu(
+            render_variant, jpeg(800, 600), 100, None, ImageFit.CONTAIN, ImageFormat.WEBP
+        )
+        assert size_of(data) == (100, 75)
+    finally:
+        image_service.shutdown_process_pool()
+        configure_decoder(DEFAULT_MAX_PIXELS)
@@ -0,0 +1,74 @@
+"""Tests de Range / If-Range y peticiones condicionales de imágenes"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.image_service import RangeNotSatisfiable, get_etag, is_not_modified, parse_range
+
+FILE_DOC = {
+    "_id": ObjectId(),
+    "length": 1000,
+    "uploadDate": datetime(2030, 1, 1, 12, 0, 0, 500),
+    "metadata": {"sha256": "abc"},
+}
+LAST_MODIFIED = "Tue, 01 Jan 2030 12:00:00 GMT"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=900-", (900, 999)),
+    ("bytes=900-5000", (900, 999)),   # Se recorta al final del archivo
+    ("bytes=-100", (900, 999)),  # Sufijo: últimos 100 bytes
+    ("bytes=-5000", (0, 999)),
+    ("bytes=999-999", (999, 999)),
+])
+def test_single_range(header, expected):
+    assert parse_range({"range": header}, FILE_DOC) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "items=0-10",
+    "bytes=0-10,20-30",  # Varios rangos: se envía el archivo completo
+    "bytes=abc-10",
+    "bytes=-",
+    "bytes=50-10",
+])
+def test_ignored_ranges_send_full_file(header):
+    headers = {"range": header} if header else {}
+    assert parse_range(headers, FILE_DOC) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range({"range": header}, FILE_DOC)
+
+
+def test_empty_file_is_unsatisfiable():
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range({"range": "bytes=0-"}, {**FILE_DOC, "length": 0})
+
+
+@pytest.mark.parametrize("if_range, expected", [
+    ('"abc"', (0, 9)),                       # ETag actual
+    ('"otro"', None),                        # ETag cambiado: archivo completo
+    ('W/"abc"', None),                       # If-Range exige comparación fuerte
+    (LAST_MODIFIED, (0, 9)),                 # Fecha igual (resolución de segundos)
+    ("Mon, 31 Dec 2029 00:00:00 GMT", None),  # Modificado después
+    ("no es una fecha", None),
+])
+def test_if_range(if_range, expected):
+    assert parse_range({"range": "bytes=0-9", "if-range": if_range}, FILE_DOC) == expected
+
+
+def test_conditional_get():
+    etag = get_etag(FILE_DOC)
+    assert etag == '"abc"'
+    assert is_not_modified({"if-none-match": f'W/{etag}, "x"'}, FILE_DOC)
+    assert is_not_modified({"if-none-match": "*"}, FILE_DOC)
+    assert not is_not_modified({"if-none-match": '"x"'}, FILE_DOC)
+    assert is_not_modified({"if-modified-since": LAST_MODIFIED}, FILE_DOC)
+    # If-None-Match tiene prioridad sobre If-Modified-Since
+    assert not is_not_modified({"if-none-match": '"x"', "if-modified-since": LAST_MODIFIED}, FILE_DOC)
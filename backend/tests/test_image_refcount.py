@@ -0,0 +1,68 @@
+"""Tests de la deduplicación por contenido: acquire / release de referencias"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services.image_service import acquire_existing, release_image
+
+
+def original(refcount=None, **metadata) -> dict:
+    if refcount is not None:
+        metadata["refcount"] = refcount
+    return {"_id": ObjectId(), "length": 10, "uploadDate": datetime(2030, 1, 1), "metadata": metadata}
+
+
+def seed(fake_db, *file_docs):
+    files = fake_db.fs.files
+    files.docs.extend(file_docs)
+    for file_doc in file_docs:
+        fake_db.fs.chunks.docs.append({"files_id": file_doc["_id"], "n": 0, "data": b"x"})
+    return files
+
+
+async def test_release_decrements_until_last_reference(fake_db):
+    file_doc = original(refcount=2)
+    variant = {"_id": ObjectId(), "length": 5, "metadata": {"variant_of": file_doc["_id"]}}
+    files = seed(fake_db, file_doc, variant)
+
+    assert await release_image(file_doc["_id"]) is False
+    assert (await files.find_one({"_id": file_doc["_id"]}))["metadata"]["refcount"] == 1
+
+    assert await release_image(file_doc["_id"]) is True
+    assert files.docs == []  # Original y variante
+    assert fake_db.fs.chunks.docs == []
+
+
+async def test_release_legacy_file_without_refcount(fake_db):
+    file_doc = original()
+    seed(fake_db, file_doc)
+
+    assert await release_image(file_doc["_id"]) is True
+    assert await release_image(file_doc["_id"]) is None
+
+
+async def test_release_retries_when_acquired_concurrently(fake_db):
+    file_doc = original(refcount=1, sha256="abc")
+    files = seed(fake_db, file_doc)
+    delete = files.find_one_and_delete
+
+    async def acquire_first(query, projection=None):
+        # Otra subida con el mismo contenido gana la carrera al borrado
+        files.find_one_and_delete = delete
+        await acquire_existing("abc")
+        return await delete(query, projection)
+
+    files.find_one_and_delete = acquire_first
+
+    assert await release_image(file_doc["_id"]) is False
+    assert (await files.find_one({"_id": file_doc["_id"]}))["metadata"]["refcount"] == 1
+
+
+async def test_acquire_counts_legacy_file_as_one_reference(fake_db):
+    seed(fake_db, original(sha256="abc"))
+
+    acquired = await acquire_existing("abc")
+
+    assert acquired["metadata"]["refcount"] == 2
+    assert isinstance(acquired["metadata"]["acquired_at"], datetime)
+    assert await acquire_existing("otro") is None
@@ -0,0 +1,75 @@
+"""
+Tests de app.core.mappers
+
+Las rutas devuelven Response ya serializadas, así que FastAPI no valida
+contra response_model: estos tests comprueban que cada mapper produce lo
+que el schema documenta, también con documentos antiguos sin timestamps.
+"""
+from datetime import datetime
+
+import orjson
+import pytest
+from bson import ObjectId
+
+from app.core import mappers
+from app.core.responses import dumps
+from app.schemas.agenda import AgendaResponse
+from app.schemas.alert import AlertResponse
+from app.schemas.event import EventResponse, EventSummary
+from app.schemas.route import RouteResponse
+from app.schemas.user import UserResponse
+
+POINT = {"type": "Point", "coordinates": [-79.0045, -2.8974]}
+NOW = datetime(2030, 1, 1, 12, 0)
+
+
+def event_doc(**fields) -> dict:
+    doc = {
+        "_id": ObjectId(), "title": "Pase del Niño", "description": "Desfile",
+        "date": NOW, "time": "10:00", "location": "Centro", "coordinates": POINT,
+        "category": "religioso", "image_id": ObjectId(),
+        "gallery": [ObjectId()],
+        "itinerary": [{"time": "10:00", "activity": "Salida"}],
+        "testimonials": [{"user_id": ObjectId(), "name": "Ana", "comment": "Bonito", "rating": 5}],
+    }
+    doc.update(fields)
+    return doc
+
+
+CASES = [
+    (mappers.event_summary, EventSummary, event_doc()),
+    (mappers.event_detail, EventResponse, event_doc()),
+    (mappers.event_detail, EventResponse, event_doc(created_at=NOW, updated_at=None)),
+    (mappers.alert, AlertResponse, {
+        "_id": ObjectId(), "title": "Cierre", "description": "Calle cerrada", "type": "cierre",
+        "location": "Calle Larga", "coordinates": POINT, "start_date": NOW, "end_date": NOW,
+    }),
+    (mappers.route, RouteResponse, {
+        "_id": ObjectId(), "name": "Ruta", "description": "Paseo", "category": "cultural",
+        "duration": "2h", "distance": "3km", "difficulty": "facil",
+        "events": [ObjectId()], "stops": [{"name": "Parque", "coordinates": POINT}],
+    }),
+    (mappers.user, UserResponse, {"_id": ObjectId(), "name": "Ana", "email": "ana@example.com"}),
+    (mappers.agenda, AgendaResponse, {"_id": ObjectId(), "user_id": ObjectId(), "attending": [ObjectId()]}),
+]
+
+
+@pytest.mark.parametrize("mapper, schema, doc", CASES, ids=lambda value: getattr(value, "__name__", ""))
+def test_mapper_output_matches_schema(mapper, schema, doc):
+    # Como lo recibe el cliente: JSON serializado con dumps
+    body = orjson.loads(dumps(mapper(doc)))
+    schema.model_validate(body)
+
+
+def test_legacy_docs_get_default_timestamps():
+    before = datetime.utcnow()
+    detail = mappers.event_detail(event_doc())
+
+    assert detail["created_at"] >= before
+    assert detail["updated_at"] >= before
+    assert detail["testimonials"][0]["created_at"] >= before
+    assert mappers.user({"_id": ObjectId(), "name": "Ana", "email": "a@b.co"})["member_since"] >= before
+
+
+def test_stored_timestamps_are_kept():
+    assert mappers.event_detail(event_doc(created_at=NOW, updated_at=NOW))["created_at"] == NOW
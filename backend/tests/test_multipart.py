@@ -0,0 +1,95 @@
+"""Tests del parser multipart en streaming (app.core.multipart)"""
+from typing import List
+
+import pytest
+
+from app.core.multipart import MultipartError, MultipartStream
+
+BOUNDARY = "xYzBoundary"
+
+
+class FakeRequest:
+    """Lo mínimo de starlette.Request que usa MultipartStream"""
+
+    def __init__(self, body: bytes, chunk_size: int = 7, content_type: str = f"multipart/form-data; boundary={BOUNDARY}"):
+        self.headers = {"content-type": content_type}
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for offset in range(0, len(self._body), self._chunk_size):
+            yield self._body[offset:offset + self._chunk_size]
+
+
+def build_body(*parts, close: bool = True) -> bytes:
+    """parts: (name, filename o None, contenido)"""
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        headers = f"--{BOUNDARY}\r\n"
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+            headers += f"Content-Disposition: {disposition}\r\nContent-Type: image/png\r\n\r\n"
+        else:
+            headers += f"Content-Disposition: {disposition}\r\n\r\n"
+        body += headers.encode() + content + b"\r\n"
+    if close:
+        body += f"--{BOUNDARY}--\r\n".encode()
+    return body
+
+
+async def read_all(stream: MultipartStream) -> List[tuple]:
+    files = []
+    async for part in stream:
+        data = b"".join([chunk async for chunk in part.chunks()])
+        files.append((part.field_name, part.filename, part.content_type, data))
+    return files
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+async def test_yields_only_file_parts(chunk_size):
+    first, second = b"\x89PNG" + bytes(range(256)) * 4, b"segundo\r\n--no-es-boundary"
+    body = build_body(("title", None, b"ignorado"), ("file", "a.png", first), ("file", "b.png", second))
+
+    files = await read_all(MultipartStream(FakeRequest(body, chunk_size)))
+
+    assert files == [("file", "a.png", "image/png", first), ("file", "b.png", "image/png", second)]
+
+
+async def test_abandoned_parts_are_skipped():
+    body = build_body(("file", "a.png", b"a" * 500), ("file", "b.png", b"b" * 500), ("file", "c.png", b"ccc"))
+    stream = MultipartStream(FakeRequest(body, chunk_size=64))
+
+    first = await stream.__anext__()
+    assert first.filename == "a.png"  # No se lee: se abandona entera
+    second = await stream.__anext__()
+    async for chunk in second.chunks():
+        assert set(chunk) == {ord("b")}
+        break  # Abandonada a medias
+    third = await stream.__anext__()
+    assert third.filename == "c.png"
+    assert b"".join([chunk async for chunk in third.chunks()]) == b"ccc"
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+
+
+async def test_truncated_file_part_raises():
+    body = build_body(("file", "a.png", b"x" * 300), close=False)
+    body = body[:-50]  # Cortado dentro del contenido, sin boundary de cierre
+
+    with pytest.raises(MultipartError):
+        await read_all(MultipartStream(FakeRequest(body)))
+
+
+async def test_malformed_body_raises():
+    body = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a\"\r\n\r\ndata".encode()
+    body += b"\r\n--" + BOUNDARY.encode() + b"XX garbage"
+
+    with pytest.raises(MultipartError):
+        await read_all(MultipartStream(FakeRequest(body)))
+
+
+@pytest.mark.parametrize("content_type", ["application/json", "multipart/form-data"])
+def test_requires_multipart_with_boundary(content_type):
+    with pytest.raises(MultipartError):
+        MultipartStream(FakeRequest(b"", content_type=content_type))
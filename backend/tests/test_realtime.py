@@ -0,0 +1,123 @@
+"""Tests del WebSocket multiplexado /realtime/ws"""
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import settings
+from app.routers import realtime
+
+POLICY_VIOLATION = 1008
+
+
+class FakeUser:
+    def __init__(self, user_id: str):
+        self.id = user_id
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Cliente contra una app solo con el router; el token "<usuario>:<segundos>" caduca en esos segundos"""
+
+    async def authenticate(token: str):
+        user_id, _, ttl = token.partition(":")
+        if user_id == "bad":
+            return None, None
+        return FakeUser(user_id), time.time() + float(ttl or 60)
+
+    monkeypatch.setattr(realtime, "authenticate", authenticate)
+    app = FastAPI()
+    app.include_router(realtime.router)
+    return TestClient(app)
+
+
+def closed_with(ws) -> int:
+    with pytest.raises(WebSocketDisconnect) as info:
+        ws.receive_json()
+    return info.value.code
+
+
+def test_public_topics_without_auth(client):
+    with client.websocket_connect("/realtime/ws") as ws:
+        ws.send_json({"action": "subscribe", "topic": "alerts", "last_event_id": None})
+        assert ws.receive_json()["message"] == {"type": "connected"}
+
+        ws.send_json({"action": "subscribe", "topic": "agenda:me"})
+        assert ws.receive_json() == {"error": "Se requiere autenticación", "topic": "agenda:me"}
+
+
+def test_auth_message_enables_private_topics(client):
+    with client.websocket_connect("/realtime/ws") as ws:
+        ws.send_json({"action": "auth", "token": "u1"})
+        ws.send_json({"action": "subscribe", "topic": "agenda:me"})
+        frame = ws.receive_json()
+
+    assert frame["topic"] == "agenda:me"
+    assert frame["message"] == {"type": "connected"}
+
+
+@pytest.mark.parametrize("tokens", [["bad"], ["u1", "u2"]])
+def test_invalid_or_foreign_token_closes(client, tokens):
+    with client.websocket_connect("/realtime/ws") as ws:
+        for token in tokens:
+            ws.send_json({"action": "auth", "token": token})
+        assert closed_with(ws) == POLICY_VIOLATION
+
+
+def test_expired_token_closes_the_socket(client):
+    with client.websocket_connect("/realtime/ws") as ws:
+        ws.send_json({"action": "auth", "token": "u1:0.2"})
+        assert closed_with(ws) == POLICY_VIOLATION
+
+
+def test_renewed_token_extends_the_connection(client):
+    with client.websocket_connect("/realtime/ws") as ws:
+        ws.send_json({"action": "auth", "token": "u1:0.2"})
+        ws.send_json({"action": "auth", "token": "u1:60"})
+        time.sleep(0.4)
+        ws.send_json({"action": "subscribe", "topic": "agenda:me"})
+        assert ws.receive_json()["message"] == {"type": "connected"}
+
+
+def test_too_many_invalid_messages_close(client, monkeypatch):
+    monkeypatch.setattr(settings, "WS_MAX_INVALID_MESSAGES", 2)
+    with client.websocket_connect("/realtime/ws") as ws:
+        ws.send_json({"action": "auth", "token": 5})
+        assert ws.receive_json() == {"error": "Mensaje inválido", "topic": None}
+        ws.send_json({"action": "subscribe", "topic": "desconocido"})
+        assert ws.receive_json() == {"error": "Topic desconocido", "topic": "desconocido"}
+        ws.send_json(["no", "es", "un", "objeto"])
+        assert closed_with(ws) == POLICY_VIOLATION
+
+
+def test_topic_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "WS_MAX_TOPICS_PER_CONNECTION", 1)
+    with client.websocket_connect("/realtime/ws") as ws:
+        ws.send_json({"action": "subscribe", "topic": "alerts"})
+        ws.receive_json()
+        ws.send_json({"action": "subscribe", "topic": "events"})
+        assert ws.receive_json()["error"] == "Demasiados topics en la conexión"
+
+
+@pytest.mark.parametrize("value, expected", [("123", 123), (123, 123), (None, None), ("x", None), (True, None)])
+def test_parse_event_id(value, expected):
+    assert realtime.parse_event_id(value) == expected
+
+
+async def test_authenticate_reads_user_and_expiry(monkeypatch):
+    from datetime import timedelta
+    from unittest import mock
+
+    from app.core.security import create_access_token, create_refresh_token
+
+    user = FakeUser("u1")
+    monkeypatch.setattr(realtime.User, "get", mock.AsyncMock(return_value=user))
+
+    authenticated, expires_at = await realtime.authenticate(create_access_token({"sub": "u1"}, timedelta(minutes=5)))
+    assert authenticated is user
+    assert 200 < expires_at - time.time() <= 300
+
+    assert await realtime.authenticate(create_access_token({"sub": "u1"}, timedelta(seconds=-1))) == (None, None)
+    assert await realtime.authenticate(create_refresh_token({"sub": "u1"})) == (None, None)
@@ -47,9 +47,11 @@ function PlaceholderPage({ title }: { title: string }) {
 }
 
 import { useAlerts } from './hooks/useAlerts'
+import { useEventFeed } from './hooks/useEventFeed'
 
 function App() {
     useAlerts(); // Listen for real-time alerts
+    useEventFeed(); // Patch cached events with real-time changes
 
     return (
         <ThemeProvider>
@@ -1,12 +1,30 @@
 import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
 import toast from 'react-hot-toast';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:3001/api/v1';
 
-export function useAlerts() {
+// Only receive alerts inside a circle (radius in meters) or a bbox
+export type AlertRegion =
+    | { lat: number; lng: number; radius: number }
+    | { bbox: [number, number, number, number] }; // [minLng, minLat, maxLng, maxLat]
+
+const regionParams = (region?: AlertRegion): Record<string, string> => {
+    if (!region) return {};
+    if ('bbox' in region) return { bbox: region.bbox.join(',') };
+    return { lat: String(region.lat), lng: String(region.lng), radius: String(region.radius) };
+};
+
+export function useAlerts(region?: AlertRegion) {
+    const queryClient = useQueryClient();
+    // Stable dependency for the effect (a new object each render must not reconnect)
+    const regionKey = JSON.stringify(regionParams(region));
+
     useEffect(() => {
         let eventSource: EventSource | null = null;
         let retryTimeout: ReturnType<typeof setTimeout>;
+        // Last event id seen, so a manual reconnect only replays what was missed
+        let lastEventId: string | null = null;
 
         const connect = () => {
             // Close existing connection if any
@@ -14,7 +32,10 @@ export function useAlerts() {
                 eventSource.close();
             }
 
-            eventSource = new EventSource(`${API_URL}/alerts/stream`);
+            const params = new URLSearchParams(JSON.parse(regionKey));
+            if (lastEventId) params.set('last_event_id', lastEventId);
+            const query = params.toString();
+            eventSource = new EventSource(`${API_URL}/alerts/stream${query ? `?${query}` : ''}`);
 
             eventSource.onopen = () => {
                 console.log('🔗 Conectado al sistema de alertas en tiempo real');
@@ -22,11 +43,27 @@ export function useAlerts() {
 
             eventSource.onmessage = (event) => {
                 try {
+                    if (event.lastEventId) lastEventId = event.lastEventId;
                     const data = JSON.parse(event.data);
 
                     // Ignore connection handshake
                     if (data.type === 'connected') return;
 
+                    // Missed more than the server keeps for replay: reload alerts
+                    if (data.type === 'reset') {
+                        queryClient.invalidateQueries({ queryKey: ['alerts-data'] });
+                        return;
+                    }
+
+                    // Server dropped us for falling behind: reconnect right away
+                    if (data.type === 'disconnected') {
+                        eventSource?.close();
+                        lastEventId = null;
+                        queryClient.invalidateQueries({ queryKey: ['alerts-data'] });
+                        retryTimeout = setTimeout(connect, 0);
+                        return;
+                    }
+
                     handleAlert(data);
                 } catch (error) {
                     console.error('Error parsing alert:', error);
@@ -74,5 +111,5 @@ export function useAlerts() {
             if (eventSource) eventSource.close();
             if (retryTimeout) clearTimeout(retryTimeout);
         };
-    }, []);
+    }, [queryClient, regionKey]);
 }
@@ -0,0 +1,44 @@
+/**
+ * useEventFeed - Cambios de eventos en tiempo real
+ * Escucha el topic "events" de /realtime/ws y aplica cada cambio (solo los
+ * campos modificados) a IndexedDB y a la caché de React Query, sin volver
+ * a pedir las listas.
+ */
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { dbService, EventChange } from '../services/db';
+import { subscribe } from '../services/realtime';
+import { eventKeys, Evento } from './useEvents';
+
+export function useEventFeed() {
+    const queryClient = useQueryClient();
+
+    useEffect(() => {
+        return subscribe('events', (message) => {
+            // Mensajes perdidos (o reconexión por lento): recargar
+            if (message.type === 'reset') {
+                queryClient.invalidateQueries({ queryKey: eventKeys.all });
+                return;
+            }
+            if (message.type === 'connected') return;
+
+            const change = message as EventChange;
+            dbService.applyEventChange(change).catch(console.error);
+
+            if (change.type === 'update') {
+                const { _id, changes } = change.data;
+                const patch = <T extends { _id: string }>(event: T) =>
+                    event._id === _id ? { ...event, ...changes } : event;
+                queryClient.setQueryData<Evento>(eventKeys.detail(_id), (event) => event && patch(event));
+                queryClient.setQueriesData<Evento[]>({ queryKey: eventKeys.lists() }, (list) => list?.map(patch));
+            } else {
+                // Altas y bajas cambian qué eventos entran en cada lista/filtro
+                if (change.type === 'delete') {
+                    queryClient.removeQueries({ queryKey: eventKeys.detail(change.data._id) });
+                }
+                queryClient.invalidateQueries({ queryKey: eventKeys.lists() });
+                queryClient.invalidateQueries({ queryKey: eventKeys.upcoming() });
+            }
+        });
+    }, [queryClient]);
+}
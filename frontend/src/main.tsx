@@ -6,6 +6,7 @@ import { ReactQueryDevtools } from '@tanstack/react-query-devtools'
 import { registerSW } from 'virtual:pwa-register'
 import { Toaster } from 'react-hot-toast'
 import App from './App'
+import { precacheImages } from './services/imagePrecache'
 import './index.css' // Assuming there is global css
 
 // Crear cliente de React Query
@@ -31,6 +32,11 @@ const updateSW = registerSW({
     },
 });
 
+// Precarga incremental de imágenes (eventos próximos, alertas y rutas)
+window.addEventListener('load', () => {
+    precacheImages().catch((error) => console.warn('No se pudieron precargar imágenes', error));
+});
+
 createRoot(document.getElementById('root')!).render(
     <StrictMode>
         <QueryClientProvider client={queryClient}>
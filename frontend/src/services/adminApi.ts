@@ -104,6 +104,11 @@ export interface UploadResult {
     url: string;
 }
 
+export interface BatchUploadResult {
+    event_id: string | null;
+    images: UploadResult[];
+}
+
 export interface User {
     _id: string;
     name: string;
@@ -194,6 +199,12 @@ export const adminApi = {
             formData.append('file', file);
             return api.upload<UploadResult>('/images/upload/', formData);
         },
+        uploadBatch: (files: File[], eventId?: string) => {
+            const formData = new FormData();
+            files.forEach((file) => formData.append('files', file));
+            const query = eventId ? `?event_id=${encodeURIComponent(eventId)}` : '';
+            return api.upload<BatchUploadResult>(`/images/upload/batch${query}`, formData);
+        },
         delete: (id: string) => api.delete<void>(`/images/${id}`),
         getUrl: (id: string) => `/api/v1/images/${id}`,
     },
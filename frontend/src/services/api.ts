@@ -118,7 +118,7 @@ const handleResponse = async <T>(response: Response): Promise<T> => {
 /**
  * Refrescar token de acceso
  */
-const refreshAccessToken = async (): Promise<boolean> => {
+export const refreshAccessToken = async (): Promise<boolean> => {
     const refreshToken = getRefreshToken();
     if (!refreshToken) return false;
 
@@ -16,6 +16,12 @@ export interface PendingOperation {
     error?: string;
 }
 
+// Mensaje del topic "events" de /realtime/ws (update solo trae los campos cambiados)
+export type EventChange =
+    | { type: 'create'; data: EventFromAPI }
+    | { type: 'update'; data: { _id: string; changes: Partial<EventFromAPI> } }
+    | { type: 'delete'; data: { _id: string } };
+
 // Reutilizar tipos de adminApi para consistencia total
 export type AlertFromAPI = Alert;
 export type RouteFromAPI = Route;
@@ -145,6 +151,30 @@ export const dbService = {
         await db.put('events', event);
     },
 
+    /**
+     * Aplicar los campos cambiados a un evento guardado
+     * @returns El evento actualizado, o undefined si no estaba en la base local
+     */
+    async patchEvent(id: string, changes: Partial<EventFromAPI>): Promise<EventFromAPI | undefined> {
+        const db = await initDB();
+        const tx = db.transaction('events', 'readwrite');
+        const current = await tx.store.get(id);
+        if (!current) {
+            await tx.done;
+            return undefined;
+        }
+        const patched = { ...current, ...changes };
+        await tx.store.put(patched);
+        await tx.done;
+        return patched;
+    },
+
+    async applyEventChange(change: EventChange) {
+        if (change.type === 'create') return this.saveEvent(change.data);
+        if (change.type === 'delete') return this.deleteEvent(change.data._id);
+        await this.patchEvent(change.data._id, change.data.changes);
+    },
+
     // Alerts Cache
     async saveAlerts(alerts: AlertFromAPI[]) {
         const db = await initDB();
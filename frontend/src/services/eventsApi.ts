@@ -22,6 +22,7 @@ export interface EventFromAPI {
     category: string;
     image_id?: string;
     image_url?: string;  // Added: some endpoints return image_url instead of image_id
+    image_placeholder?: string;  // Data URI diminuto para mostrar mientras carga la imagen
     itinerary?: Array<{ time: string; activity: string }>;
     closed_streets?: string[];
     created_at?: string;
@@ -58,6 +59,7 @@ export interface RouteFromAPI {
     }>;
     image_id?: string;
     image_url?: string;  // Added: some endpoints return image_url instead of image_id
+    image_placeholder?: string;  // Data URI diminuto para mostrar mientras carga la imagen
     events?: string[];
     created_at?: string;
     updated_at?: string;
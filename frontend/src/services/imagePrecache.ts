@@ -0,0 +1,100 @@
+/**
+ * Image Precache - Precarga incremental de imágenes para uso offline
+ * Lee el manifiesto versionado de /images/manifest y guarda en la caché del
+ * service worker (la misma que usa workbox para /api/v1/images) solo las
+ * imágenes nuevas o cambiadas desde la última precarga.
+ */
+import { getImageUrl } from './eventsApi';
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:3001/api/v1';
+
+// Debe coincidir con cacheName de la regla de /api/v1/images en vite.config.ts
+const IMAGE_CACHE_NAME = 'api-images-cache';
+const MAX_PARALLEL = 4;
+
+// Claves de localStorage
+const MANIFEST_ETAG_KEY = 'image_manifest_etag';
+const MANIFEST_HASHES_KEY = 'image_manifest_hashes';
+
+export interface ManifestVariant {
+    url: string;
+    size: number | null;
+    type: string | null;
+}
+
+export interface ManifestImage {
+    id: string;
+    url: string;
+    size: number;
+    hash: string | null;
+    type: string | null;
+    variants: ManifestVariant[];
+}
+
+export interface ImageManifest {
+    version: string;
+    images: ManifestImage[];
+}
+
+const loadHashes = (): Record<string, string> => {
+    try {
+        return JSON.parse(localStorage.getItem(MANIFEST_HASHES_KEY) || '{}');
+    } catch {
+        return {};
+    }
+};
+
+/**
+ * Precargar las imágenes del manifiesto que falten en la caché
+ * Con el manifiesto sin cambios (304) no descarga nada más.
+ */
+export const precacheImages = async (): Promise<void> => {
+    if (typeof window === 'undefined' || !('caches' in window) || !navigator.onLine) return;
+
+    const headers: HeadersInit = {};
+    const etag = localStorage.getItem(MANIFEST_ETAG_KEY);
+    if (etag) headers['If-None-Match'] = etag;
+
+    const response = await fetch(`${API_BASE_URL}/images/manifest`, { headers });
+    if (response.status === 304 || !response.ok) return;
+    const manifest: ImageManifest = await response.json();
+
+    const cache = await caches.open(IMAGE_CACHE_NAME);
+    const previous = loadHashes();
+    const current: Record<string, string> = {};
+
+    // Imágenes nuevas o con contenido distinto (mismo id, otro hash)
+    const pending = manifest.images.filter((image) => {
+        current[image.id] = image.hash || String(image.size);
+        return previous[image.id] !== current[image.id];
+    });
+
+    let failed = 0;
+    for (let i = 0; i < pending.length; i += MAX_PARALLEL) {
+        const batch = pending.slice(i, i + MAX_PARALLEL);
+        const results = await Promise.allSettled(
+            batch.map((image) => cache.add(getImageUrl(image.url)!))
+        );
+        // Reintentar en la próxima precarga las que fallaron
+        results.forEach((result, index) => {
+            if (result.status === 'rejected') {
+                delete current[batch[index].id];
+                failed += 1;
+            }
+        });
+    }
+
+    // Quitar las que ya no están referenciadas
+    await Promise.all(
+        Object.keys(previous)
+            .filter((id) => !(id in current))
+            .map((id) => cache.delete(getImageUrl(id)!))
+    );
+
+    localStorage.setItem(MANIFEST_HASHES_KEY, JSON.stringify(current));
+    // Con fallos no se guarda el ETag: la próxima vez el manifiesto llega
+    // completo (200) y se reintentan solo las que faltan
+    const newEtag = response.headers.get('ETag');
+    if (newEtag && failed === 0) localStorage.setItem(MANIFEST_ETAG_KEY, newEtag);
+    else localStorage.removeItem(MANIFEST_ETAG_KEY);
+};
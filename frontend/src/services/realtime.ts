@@ -0,0 +1,121 @@
+/**
+ * Realtime - Cliente del WebSocket multiplexado /realtime/ws
+ * Una sola conexión para todos los topics (alerts, events, event:<id>,
+ * agenda:me). Reconecta sola y, al reconectar, pide a cada topic solo los
+ * mensajes perdidos desde el último id recibido.
+ *
+ * El token se envía en un mensaje "auth" al abrir (no en la URL). Si el
+ * servidor cierra con 1008 (token caducado) se renueva antes de reconectar.
+ */
+import { getAccessToken, refreshAccessToken } from './api';
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:3001/api/v1';
+const RECONNECT_DELAY_MS = 5000;
+const POLICY_VIOLATION = 1008;
+
+export interface RealtimeMessage {
+    type: string; // connected | reset | create | update | delete
+    data?: any;
+}
+
+type Handler = (message: RealtimeMessage) => void;
+
+interface Topic {
+    handlers: Set<Handler>;
+    // String: los ids pueden superar Number.MAX_SAFE_INTEGER
+    lastEventId: string | null;
+}
+
+const topics = new Map<string, Topic>();
+let socket: WebSocket | null = null;
+let retryTimeout: ReturnType<typeof setTimeout> | undefined;
+// Token enviado en la conexión actual y el último que el servidor rechazó
+let sentToken: string | null = null;
+let rejectedToken: string | null = null;
+
+const socketUrl = (): string => {
+    const url = new URL(`${API_BASE_URL}/realtime/ws`, window.location.href);
+    url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+    return url.toString();
+};
+
+const send = (payload: object) => {
+    if (socket?.readyState === WebSocket.OPEN) socket.send(JSON.stringify(payload));
+};
+
+const sendSubscribe = (name: string, topic: Topic) => {
+    send({ action: 'subscribe', topic: name, last_event_id: topic.lastEventId });
+};
+
+const connect = () => {
+    if (socket || topics.size === 0) return;
+    socket = new WebSocket(socketUrl());
+
+    socket.onopen = () => {
+        // Antes de suscribirse: agenda:me necesita el usuario
+        const token = getAccessToken();
+        sentToken = token && token !== rejectedToken ? token : null;
+        if (sentToken) send({ action: 'auth', token: sentToken });
+        topics.forEach((topic, name) => sendSubscribe(name, topic));
+    };
+
+    socket.onmessage = (event) => {
+        const frame = JSON.parse(event.data);
+        if (frame.error) {
+            console.error(`[realtime] ${frame.topic ?? ''}: ${frame.error}`);
+            return;
+        }
+        // Desconectado por lento: el estado local ya no es fiable
+        if (frame.type === 'disconnected') {
+            topics.forEach((topic) => {
+                topic.lastEventId = null;
+                topic.handlers.forEach((handler) => handler({ type: 'reset' }));
+            });
+            return;
+        }
+        const topic = topics.get(frame.topic);
+        if (!topic) return;
+        if (frame.id !== null) topic.lastEventId = frame.id;
+        topic.handlers.forEach((handler) => handler(frame.message));
+    };
+
+    socket.onclose = (event) => {
+        socket = null;
+        if (topics.size === 0) return;
+        if (event.code === POLICY_VIOLATION && sentToken) {
+            // Token caducado: renovarlo y reconectar (sin renovar, como anónimo)
+            rejectedToken = sentToken;
+            refreshAccessToken().finally(() => {
+                retryTimeout = setTimeout(connect, RECONNECT_DELAY_MS);
+            });
+            return;
+        }
+        retryTimeout = setTimeout(connect, RECONNECT_DELAY_MS);
+    };
+};
+
+/**
+ * Suscribirse a un topic
+ * @returns Función para cancelar la suscripción
+ */
+export const subscribe = (name: string, handler: Handler): (() => void) => {
+    let topic = topics.get(name);
+    if (!topic) {
+        topic = { handlers: new Set(), lastEventId: null };
+        topics.set(name, topic);
+        sendSubscribe(name, topic);
+    }
+    topic.handlers.add(handler);
+    connect();
+
+    return () => {
+        topic!.handlers.delete(handler);
+        if (topic!.handlers.size > 0) return;
+        topics.delete(name);
+        send({ action: 'unsubscribe', topic: name });
+        if (topics.size === 0) {
+            clearTimeout(retryTimeout);
+            socket?.close();
+        }
+    };
+};